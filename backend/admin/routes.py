@@ -0,0 +1,56 @@
+# admin/routes.py
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional
+import logging
+
+from auth.dependencies import get_current_superuser
+from services.export import UserExporter, parse_columns
+from tracing import tracer
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+logger = logging.getLogger(__name__)
+
+# ===== EXPORTAÇÃO DE USUÁRIOS =====
+
+@router.get("/users/export")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    columns: Optional[str] = Query(None, description="Colunas separadas por vírgula"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    email_verified: Optional[bool] = None,
+    current_user = Depends(get_current_superuser),
+):
+    """Exporta usuários em streaming (NDJSON ou CSV)"""
+    try:
+        selected = parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    exporter = UserExporter(
+        selected,
+        fmt=format,
+        created_from=created_from,
+        created_to=created_to,
+        email_verified=email_verified,
+    )
+    logger.info("📤 Exportação de usuários iniciada por %s", current_user.email)
+
+    extension = "csv" if format == "csv" else "ndjson"
+    return StreamingResponse(
+        exporter.iter_chunks(),
+        media_type=exporter.media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{extension}"'},
+    )
+
+# ===== TRACING =====
+
+@router.get("/traces")
+async def recent_traces(
+    limit: int = Query(200, ge=1, le=5000),
+    current_user = Depends(get_current_superuser),
+):
+    """Spans mais recentes deste worker (buffer em memória)"""
+    return {"spans": tracer.recent_spans(limit)}
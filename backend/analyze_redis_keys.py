@@ -0,0 +1,269 @@
+"""
+Relatório de uso de memória do Redis por grupo de chaves da aplicação
+(`register:pending:`, `ratelimit:login:ip:`, `tfa:code:`, ... ver keys.key_group).
+
+Percorre o keyspace com SCAN (nunca KEYS) e mede uma amostra das chaves com
+MEMORY USAGE e PTTL em pipelines sem transação. Para cada grupo mostra quantidade,
+memória total estimada e média, histograma de TTL e chaves sem TTL.
+
+Seguro para produção: só comandos de leitura, lotes pequenos e ritmo limitado por
+--max-ops (comandos/s); se o Redis responder devagar, a varredura desacelera.
+As contagens são aproximadas (SCAN pode repetir chaves e não vê as criadas depois).
+
+Uso: python analyze_redis_keys.py [--sample-rate 0.1] [--max-keys 100000] [--max-ops 500] [--json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, List
+
+# Adiciona o diretório atual ao path do Python
+sys.path.append(str(Path(__file__).parent))
+
+import redis.asyncio as redis
+from redis.asyncio.cluster import RedisCluster
+from config import get_settings
+from services import keys
+from services.redis import create_redis_client
+
+settings = get_settings()
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Faixas do histograma de TTL: (limite superior em segundos, rótulo)
+TTL_BUCKETS = (
+    (60, "<1min"),
+    (300, "1-5min"),
+    (900, "5-15min"),
+    (3600, "15min-1h"),
+    (21600, "1-6h"),
+    (86400, "6-24h"),
+    (float("inf"), ">1d"),
+)
+NO_TTL = "sem TTL"
+
+class GroupStats:
+    """Acumulados de um grupo de chaves"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0          # Chaves vistas pelo SCAN
+        self.sampled = 0        # Chaves medidas
+        self.memory = 0         # Bytes das chaves medidas
+        self.ttl = {label: 0 for _, label in TTL_BUCKETS}
+        self.ttl[NO_TTL] = 0
+        self.persistent_examples: List[str] = []
+
+    def add_sample(self, key: str, memory: int, ttl_ms: int, max_examples: int) -> None:
+        self.sampled += 1
+        self.memory += memory or 0
+        if ttl_ms == -1:
+            self.ttl[NO_TTL] += 1
+            if len(self.persistent_examples) < max_examples:
+                self.persistent_examples.append(key)
+            return
+        seconds = ttl_ms / 1000
+        for limit, label in TTL_BUCKETS:
+            if seconds < limit:
+                self.ttl[label] += 1
+                return
+
+    @property
+    def avg_memory(self) -> float:
+        return self.memory / self.sampled if self.sampled else 0.0
+
+    @property
+    def estimated_memory(self) -> float:
+        """Memória do grupo extrapolada da amostra para todas as chaves vistas"""
+        return self.avg_memory * self.count
+
+    @property
+    def no_ttl_estimate(self) -> int:
+        if not self.sampled:
+            return 0
+        return round(self.ttl[NO_TTL] / self.sampled * self.count)
+
+    def as_dict(self) -> dict:
+        return {
+            "group": self.name,
+            "keys": self.count,
+            "sampled": self.sampled,
+            "memory_bytes_estimated": round(self.estimated_memory),
+            "memory_bytes_avg": round(self.avg_memory, 1),
+            "no_ttl_estimated": self.no_ttl_estimate,
+            "ttl_histogram": self.ttl,
+            "no_ttl_examples": self.persistent_examples,
+        }
+
+class Pacer:
+    """Limita a varredura a `max_ops` comandos/s e desacelera quando o Redis fica lento"""
+
+    def __init__(self, max_ops: float, max_latency: float):
+        self.max_ops = max_ops
+        self.max_latency = max_latency
+        self.started = time.monotonic()
+        self.ops = 0
+
+    async def wait(self, ops: int, latency: float) -> None:
+        self.ops += ops
+        delay = self.ops / self.max_ops - (time.monotonic() - self.started)
+        if latency > self.max_latency:
+            # Resposta lenta: pausa proporcional para não competir com a aplicação
+            delay = max(delay, latency * 10)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def _measure(client, batch: List[bytes], stats: Dict[str, GroupStats], args) -> int:
+    """MEMORY USAGE + PTTL da amostra do lote; retorna o número de comandos enviados"""
+    # Grupos ainda sem nenhuma medida entram sempre (grupos raros também aparecem no relatório)
+    sample = [
+        key for key in batch
+        if random.random() < args.sample_rate
+        or not stats[keys.key_group(key.decode("utf-8", errors="replace"))].sampled
+    ]
+    if not sample:
+        return 0
+    pipe = client.pipeline(transaction=False)
+    for key in sample:
+        pipe.memory_usage(key, samples=args.memory_samples)
+        pipe.pttl(key)
+    replies = await pipe.execute(raise_on_error=False)
+    for i, key in enumerate(sample):
+        memory, ttl_ms = replies[2 * i], replies[2 * i + 1]
+        if isinstance(memory, Exception) or isinstance(ttl_ms, Exception) or ttl_ms == -2:
+            continue  # Expirou durante a varredura
+        name = key.decode("utf-8", errors="replace")
+        stats[keys.key_group(name)].add_sample(name, memory, ttl_ms, args.examples)
+    return 2 * len(sample)
+
+async def scan_pages(client, match: str, count: int) -> AsyncIterator[List[bytes]]:
+    """
+    Uma página por SCAN (nunca scan_iter): quem consome pausa entre as chamadas, inclusive
+    quando um --match seletivo faz o SCAN devolver páginas vazias.
+    No Redis Cluster percorre cada primário com o seu próprio cursor.
+    """
+    if isinstance(client, RedisCluster):
+        for node in client.get_primaries():
+            cursor = 0
+            while True:
+                cursors, page = await client.scan(cursor, match=match, count=count, target_nodes=node)
+                yield page
+                cursor = cursors[node.name]
+                if cursor == 0:
+                    break
+        return
+    cursor = 0
+    while True:
+        cursor, page = await client.scan(cursor, match=match, count=count)
+        yield page
+        if cursor == 0:
+            break
+
+async def analyze(client, args) -> Dict[str, GroupStats]:
+    stats: Dict[str, GroupStats] = {}
+    pacer = Pacer(args.max_ops, args.max_latency_ms / 1000)
+    scanned = 0
+    next_report = args.batch_size * 100
+    batch: List[bytes] = []
+
+    started = time.monotonic()
+    async for page in scan_pages(client, args.match, args.batch_size):
+        ops = 1  # O próprio SCAN
+        for key in page:
+            name = key.decode("utf-8", errors="replace")
+            group = keys.key_group(name)
+            if group not in stats:
+                stats[group] = GroupStats(group)
+            stats[group].count += 1
+            batch.append(key)
+            scanned += 1
+            if args.max_keys and scanned >= args.max_keys:
+                break
+        if len(batch) >= args.batch_size:
+            ops += await _measure(client, batch, stats, args)
+            batch = []
+        # Ritmo aplicado a cada ida ao Redis, mesmo quando o SCAN não encontrou nada
+        await pacer.wait(ops, time.monotonic() - started)
+        if scanned >= next_report:
+            logger.info(f"📦 {scanned} chaves percorridas")
+            next_report += args.batch_size * 100
+        if args.max_keys and scanned >= args.max_keys:
+            break
+        started = time.monotonic()
+    if batch:
+        started = time.monotonic()
+        ops = await _measure(client, batch, stats, args)
+        await pacer.wait(ops, time.monotonic() - started)
+    return stats
+
+def _format_bytes(value: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+def print_report(stats: Dict[str, GroupStats]) -> None:
+    groups = sorted(stats.values(), key=lambda g: g.estimated_memory, reverse=True)
+    header = f"{'grupo':<36} {'chaves':>9} {'amostra':>8} {'memória (est.)':>15} {'média':>11} {'sem TTL':>8}"
+    print(header)
+    print("-" * len(header))
+    for group in groups:
+        print(
+            f"{group.name:<36} {group.count:>9} {group.sampled:>8} "
+            f"{_format_bytes(group.estimated_memory):>15} {_format_bytes(group.avg_memory):>11} "
+            f"{group.no_ttl_estimate:>8}"
+        )
+
+    print("\nHistograma de TTL (chaves da amostra)")
+    labels = [label for _, label in TTL_BUCKETS] + [NO_TTL]
+    print(f"{'grupo':<36} " + " ".join(f"{label:>9}" for label in labels))
+    for group in groups:
+        print(f"{group.name:<36} " + " ".join(f"{group.ttl[label]:>9}" for label in labels))
+
+    persistent = [g for g in groups if g.persistent_examples]
+    if persistent:
+        print("\nExemplos de chaves sem TTL")
+        for group in persistent:
+            for key in group.persistent_examples:
+                print(f"  {key}")
+
+async def main(args):
+    client = redis.from_url(args.url) if args.url else create_redis_client(decode_responses=False)
+    started = time.perf_counter()
+    try:
+        await client.ping()
+        stats = await analyze(client, args)
+        if args.json:
+            print(json.dumps([g.as_dict() for g in stats.values()], ensure_ascii=False, indent=2))
+        else:
+            print_report(stats)
+        total = sum(g.count for g in stats.values())
+        logger.info(f"✅ {total} chaves analisadas em {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        logger.error(f"❌ Erro na análise do keyspace: {e}")
+        raise
+    finally:
+        await client.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Uso de memória e TTL das chaves Redis por grupo")
+    parser.add_argument("--url", help="URL do Redis (padrão: conexão configurada em REDIS_MODE)")
+    parser.add_argument("--match", default="*", help="Padrão do SCAN")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="Fração das chaves medidas com MEMORY USAGE")
+    parser.add_argument("--memory-samples", type=int, default=5, help="SAMPLES do MEMORY USAGE (estruturas agregadas)")
+    parser.add_argument("--max-keys", type=int, default=0, help="Para após N chaves (0 = keyspace inteiro)")
+    parser.add_argument("--batch-size", type=int, default=200, help="COUNT de cada SCAN")
+    parser.add_argument("--max-ops", type=float, default=500, help="Máximo de comandos por segundo")
+    parser.add_argument("--max-latency-ms", type=float, default=50, help="Latência a partir da qual a varredura desacelera")
+    parser.add_argument("--examples", type=int, default=5, help="Exemplos de chaves sem TTL por grupo")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
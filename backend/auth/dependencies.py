@@ -1,15 +1,19 @@
 # auth/dependencies.py
-from fastapi import Request, HTTPException, status, Depends
-from typing import Optional
-from auth.utils import decode_token
+from fastapi import Request, Response, HTTPException, status, Depends
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+import hmac
+from auth.utils import create_access_token, decode_token
 from config import get_settings
+from csrf import set_csrf_cookie
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_db
+from database import AsyncSessionLocal, get_db
 from repositories.user_repository import UserRepository
-from csrf import csrf_protect
+from tracing import traced
 
 settings = get_settings()
 
+@traced("dependency.get_current_user")
 async def get_current_user_from_cookie(
     request: Request,
     db: AsyncSession = Depends(get_db)
@@ -46,6 +50,59 @@ async def get_current_active_user(
         )
     return current_user
 
+async def get_current_superuser(
+    current_user = Depends(get_current_active_user)
+):
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores",
+        )
+    return current_user
+
+def _service_for_token(request: Request, tokens: Dict[str, str]) -> Optional[str]:
+    """Nome do serviço cujo token veio em `Authorization: Bearer <token>` (None se nenhum)"""
+    scheme, _, credential = request.headers.get("authorization", "").partition(" ")
+    service = None
+    if scheme.lower() == "bearer" and credential:
+        presented = credential.strip().encode("utf-8")
+        # Compara com todos os tokens (tempo constante, sem parar no primeiro)
+        for name, token in tokens.items():
+            if hmac.compare_digest(presented, token.encode("utf-8")):
+                service = name
+    return service
+
+async def get_internal_service(request: Request) -> str:
+    """
+    Autenticação serviço-a-serviço: `Authorization: Bearer <token>` com um dos tokens de
+    INTROSPECTION_TOKENS. Retorna o nome do serviço.
+    """
+    service = _service_for_token(request, settings.INTROSPECTION_TOKENS)
+    if service is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Serviço não autorizado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return service
+
+async def get_metrics_reader(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+) -> str:
+    """Acesso a /metrics: coletor com token de METRICS_TOKENS ou superusuário logado"""
+    service = _service_for_token(request, settings.METRICS_TOKENS)
+    if service is not None:
+        return service
+    user = await get_current_user_from_cookie(request, db)
+    if user is not None and user.is_superuser:
+        return f"user:{user.id}"
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Não autenticado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 def set_auth_cookie(response, access_token: str):
     response.set_cookie(
         key=settings.COOKIE_NAME,
@@ -59,13 +116,21 @@ def set_auth_cookie(response, access_token: str):
         expires=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
     )
 
-async def validate_csrf(
-    request: Request,
-    csrf_protect_instance = Depends(lambda: csrf_protect)
-):
+async def reissue_session(user_id: int) -> Optional[List[Tuple[bytes, bytes]]]:
     """
-    Valida o token CSRF para métodos não seguros.
-    Usa lambda para evitar problema de callable.
+    Headers Set-Cookie (sessão + CSRF) de uma sessão nova para `user_id`.
+    Usado pelo IdempotencyMiddleware ao repetir um login: o cookie original nunca é
+    guardado. None se o usuário não existe mais ou foi desativado.
     """
-    await csrf_protect_instance.validate_csrf(request)
-    return True
\ No newline at end of file
+    async with AsyncSessionLocal() as db:
+        user = await UserRepository(db).get_user_by_id(user_id)
+    if not user:
+        return None
+
+    response = Response()
+    set_auth_cookie(response, create_access_token(
+        data={"sub": str(user.id)},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    ))
+    set_csrf_cookie(response)
+    return [(name, value) for name, value in response.raw_headers if name == b"set-cookie"]
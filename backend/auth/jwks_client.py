@@ -0,0 +1,165 @@
+"""
+Verificação local de tokens de sessão por outros serviços Python.
+
+Em vez de chamar /auth/me a cada requisição, o serviço busca as chaves públicas em
+/.well-known/jwks.json, guarda em cache e verifica a assinatura e a expiração no próprio
+processo. Sem dependência da configuração desta aplicação: copie auth/jws.py e este
+arquivo (dependências: cryptography e httpx).
+
+    verifier = JWKSClient("https://login.interno/.well-known/jwks.json")
+    claims = await verifier.verify(token)      # TokenError se inválido
+    user_id = int(claims["sub"])
+
+Cache e rotação:
+- as chaves valem pelo max-age do Cache-Control da resposta (ou `default_ttl`);
+- um kid desconhecido força a releitura (chave nova recém-publicada), no máximo uma
+  vez a cada `min_refresh_interval` segundos, para que tokens forjados com kids
+  aleatórios não virem uma enxurrada de requisições ao JWKS;
+- se o JWKS estiver fora do ar, as chaves em cache continuam valendo.
+
+Tokens HS256 (emitidos antes da migração para EdDSA/ES256) não são verificáveis aqui.
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+import httpx
+from auth.jws import ALGORITHMS, TYPE_NAMES, TokenError, b64url_decode
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+class JWKSClient:
+    """Cache de chaves públicas + verificação de tokens"""
+
+    def __init__(
+        self,
+        jwks_url: str,
+        algorithms: Iterable[str] = ("EdDSA", "ES256"),
+        token_type: Optional[str] = "access",
+        leeway: float = 0.0,
+        default_ttl: float = 300.0,
+        min_refresh_interval: float = 30.0,
+        timeout: float = 2.0,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.jwks_url = jwks_url
+        self.algorithms = frozenset(a for a in algorithms if a in ALGORITHMS and ALGORITHMS[a].asymmetric)
+        self.token_type = token_type
+        self.leeway = leeway
+        self.default_ttl = default_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._http = http_client
+        self._keys: Dict[str, Tuple[str, Any]] = {}   # kid -> (alg, chave pública)
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._etag: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _fetch(self) -> None:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout)
+        headers = {"If-None-Match": self._etag} if self._etag else {}
+        response = await self._http.get(self.jwks_url, headers=headers)
+        now = time.monotonic()
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        ttl = float(match.group(1)) if match else self.default_ttl
+        self._fetched_at = now
+        if response.status_code == 304:
+            self._expires_at = now + ttl
+            return
+        response.raise_for_status()
+
+        keys: Dict[str, Tuple[str, Any]] = {}
+        for jwk in response.json().get("keys", []):
+            alg, kid = jwk.get("alg"), jwk.get("kid")
+            if alg not in self.algorithms or not kid:
+                continue
+            try:
+                keys[kid] = (alg, ALGORITHMS[alg].from_jwk(jwk))
+            except (TokenError, KeyError, ValueError) as e:
+                logger.warning("JWK %s ignorada: %s", kid, e)
+        self._keys = keys
+        self._etag = response.headers.get("etag")
+        self._expires_at = now + ttl
+
+    async def refresh(self, force: bool = False) -> None:
+        """Relê o JWKS se o cache venceu (ou `force`, respeitando min_refresh_interval)"""
+        started = time.monotonic()
+        async with self._lock:
+            # Outra tarefa já atualizou enquanto esperávamos o lock
+            if self._fetched_at >= started:
+                return
+            now = time.monotonic()
+            if not force and now < self._expires_at:
+                return
+            if force and now - self._fetched_at < self.min_refresh_interval:
+                return
+            try:
+                await self._fetch()
+            except (httpx.HTTPError, ValueError) as e:
+                if not self._keys:
+                    raise TokenError(f"JWKS indisponível: {e}") from None
+                # Mantém as chaves em cache e tenta de novo depois
+                self._fetched_at = now
+                self._expires_at = now + self.min_refresh_interval
+                logger.warning("Falha ao atualizar JWKS, usando cache: %s", e)
+
+    async def get_key(self, kid: str) -> Tuple[str, Any]:
+        if time.monotonic() >= self._expires_at:
+            await self.refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            # Chave nova (rotação) ainda não vista
+            await self.refresh(force=True)
+            key = self._keys.get(kid)
+            if key is None:
+                raise TokenError(f"kid desconhecido: {kid}")
+        return key
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Claims do token (com `type` por extenso); TokenError se inválido ou expirado"""
+        try:
+            header_segment, payload_segment, signature_segment = token.encode("ascii").split(b".")
+            header = json.loads(b64url_decode(header_segment))
+            signature = b64url_decode(signature_segment)
+        except (ValueError, UnicodeEncodeError, AttributeError):
+            raise TokenError("Token malformado") from None
+        if not isinstance(header, dict) or not isinstance(header.get("kid"), str):
+            raise TokenError("Header inválido")
+        if not isinstance(header.get("alg"), str) or header["alg"] not in self.algorithms:
+            raise TokenError(f"Algoritmo não aceito: {header.get('alg')}")
+
+        alg, key = await self.get_key(header["kid"])
+        if alg != header["alg"]:
+            raise TokenError("Algoritmo não corresponde à chave")
+        if not ALGORITHMS[alg].verify(key, header_segment + b"." + payload_segment, signature):
+            raise TokenError("Assinatura inválida")
+
+        try:
+            claims = json.loads(b64url_decode(payload_segment))
+        except ValueError:
+            raise TokenError("Payload inválido") from None
+        if not isinstance(claims, dict):
+            raise TokenError("Payload inválido")
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+            raise TokenError("Token sem exp")
+        if exp + self.leeway <= time.time():
+            raise TokenError("Token expirado")
+
+        code = claims.pop("t", None)
+        if code is not None:
+            claims["type"] = TYPE_NAMES.get(code, code)
+        if self.token_type is not None and claims.get("type") != self.token_type:
+            raise TokenError(f"Tipo de token inesperado: {claims.get('type')}")
+        return claims
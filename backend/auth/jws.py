@@ -0,0 +1,168 @@
+"""
+Primitivas de JWS compacto compartilhadas pelo emissor (auth/tokens.py) e pelo
+verificador usado por outros serviços (auth/jwks_client.py).
+
+Não depende da configuração da aplicação: outros serviços podem copiar este arquivo
+junto com jwks_client.py (dependências: cryptography e httpx).
+"""
+import base64
+import hashlib
+import hmac
+from typing import Any, Dict
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature, encode_dss_signature
+
+# Tipo do token -> código curto no claim `t`
+TYPE_CODES = {"access": "a", "refresh": "r", "tfa_temp": "2"}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+class TokenError(Exception):
+    """Token malformado, com assinatura inválida ou expirado"""
+
+def b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+# Alfabeto url-safe -> padrão; "+" e "/" viram "-" e "_", que b64decode(validate=True) recusa
+_FROM_URLSAFE = bytes.maketrans(b"-_+/", b"+/-_")
+
+def b64url_decode(data: bytes) -> bytes:
+    """
+    Base64url sem padding, estrito: rejeita "=", caracteres fora do alfabeto e bits de
+    sobra no último caractere (cada valor tem uma única codificação aceita).
+    ValueError se inválido.
+    """
+    decoded = base64.b64decode(data.translate(_FROM_URLSAFE) + b"=" * (-len(data) % 4), validate=True)
+    if b64url_encode(decoded) != data:
+        raise ValueError("base64url não canônico")
+    return decoded
+
+def _b64url_str(data: bytes) -> str:
+    return b64url_encode(data).decode("ascii")
+
+class Algorithm:
+    """Assinatura de um `alg` do JWS"""
+
+    name = ""
+    asymmetric = True
+
+    def sign(self, key: Any, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def verify(self, key: Any, data: bytes, signature: bytes) -> bool:
+        raise NotImplementedError
+
+    def can_sign(self, key: Any) -> bool:
+        return True
+
+    def can_verify(self, key: Any) -> bool:
+        return True
+
+    def public_key(self, key: Any) -> Any:
+        """Chave de verificação (a pública, se `key` for privada)"""
+        return key.public_key() if hasattr(key, "public_key") else key
+
+    def public_jwk(self, key: Any, kid: str) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def from_jwk(self, jwk: Dict[str, str]) -> Any:
+        raise NotImplementedError
+
+class HS256(Algorithm):
+    """HMAC-SHA256 (chave simétrica: nunca publicada no JWKS)"""
+
+    name = "HS256"
+    asymmetric = False
+
+    def sign(self, key: bytes, data: bytes) -> bytes:
+        return hmac.new(key, data, hashlib.sha256).digest()
+
+    def verify(self, key: bytes, data: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(hmac.new(key, data, hashlib.sha256).digest(), signature)
+
+    def public_key(self, key: bytes) -> bytes:
+        return key
+
+class EdDSA(Algorithm):
+    """Ed25519 (RFC 8037): assinatura de 64 bytes, verificação rápida"""
+
+    name = "EdDSA"
+
+    def sign(self, key: Ed25519PrivateKey, data: bytes) -> bytes:
+        return key.sign(data)
+
+    def verify(self, key: Ed25519PublicKey, data: bytes, signature: bytes) -> bool:
+        try:
+            key.verify(signature, data)
+            return True
+        except InvalidSignature:
+            return False
+
+    def can_sign(self, key: Any) -> bool:
+        return isinstance(key, Ed25519PrivateKey)
+
+    def can_verify(self, key: Any) -> bool:
+        return isinstance(self.public_key(key), Ed25519PublicKey)
+
+    def public_jwk(self, key: Any, kid: str) -> Dict[str, str]:
+        raw = self.public_key(key).public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return {"kty": "OKP", "crv": "Ed25519", "x": _b64url_str(raw), "kid": kid, "alg": self.name, "use": "sig"}
+
+    def from_jwk(self, jwk: Dict[str, str]) -> Ed25519PublicKey:
+        if jwk.get("kty") != "OKP" or jwk.get("crv") != "Ed25519":
+            raise TokenError("JWK Ed25519 inválida")
+        return Ed25519PublicKey.from_public_bytes(b64url_decode(jwk["x"].encode("ascii")))
+
+class ES256(Algorithm):
+    """ECDSA P-256 com SHA-256; assinatura em r||s (64 bytes), como pede o JWS"""
+
+    name = "ES256"
+
+    def sign(self, key: ec.EllipticCurvePrivateKey, data: bytes) -> bytes:
+        r, s = decode_dss_signature(key.sign(data, ec.ECDSA(hashes.SHA256())))
+        return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+
+    def verify(self, key: ec.EllipticCurvePublicKey, data: bytes, signature: bytes) -> bool:
+        if len(signature) != 64:
+            return False
+        r, s = int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big")
+        try:
+            key.verify(encode_dss_signature(r, s), data, ec.ECDSA(hashes.SHA256()))
+            return True
+        except InvalidSignature:
+            return False
+
+    def can_sign(self, key: Any) -> bool:
+        return isinstance(key, ec.EllipticCurvePrivateKey) and isinstance(key.curve, ec.SECP256R1)
+
+    def can_verify(self, key: Any) -> bool:
+        public = self.public_key(key)
+        return isinstance(public, ec.EllipticCurvePublicKey) and isinstance(public.curve, ec.SECP256R1)
+
+    def public_jwk(self, key: Any, kid: str) -> Dict[str, str]:
+        numbers = self.public_key(key).public_numbers()
+        return {
+            "kty": "EC", "crv": "P-256",
+            "x": _b64url_str(numbers.x.to_bytes(32, "big")),
+            "y": _b64url_str(numbers.y.to_bytes(32, "big")),
+            "kid": kid, "alg": self.name, "use": "sig",
+        }
+
+    def from_jwk(self, jwk: Dict[str, str]) -> ec.EllipticCurvePublicKey:
+        if jwk.get("kty") != "EC" or jwk.get("crv") != "P-256":
+            raise TokenError("JWK P-256 inválida")
+        x = int.from_bytes(b64url_decode(jwk["x"].encode("ascii")), "big")
+        y = int.from_bytes(b64url_decode(jwk["y"].encode("ascii")), "big")
+        return ec.EllipticCurvePublicNumbers(x, y, ec.SECP256R1()).public_key()
+
+ALGORITHMS: Dict[str, Algorithm] = {alg.name: alg for alg in (HS256(), EdDSA(), ES256())}
+
+def load_pem_key(path: str) -> Any:
+    """Chave privada (ou só a pública, para kids aposentados) de um arquivo PEM"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if b"PRIVATE KEY" in data:
+        return serialization.load_pem_private_key(data, password=None)
+    return serialization.load_pem_public_key(data)
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, delete, and_
 from datetime import timedelta, datetime
 from typing import Any, List, Optional
 from pydantic import EmailStr
@@ -14,22 +14,41 @@ from models.user import (
     User, UserCreate, UserResponse, TFAEnableRequest, 
     TFAVerifyRequest, TFASetupResponse, TFALoginResponse,
     TFACompleteLoginRequest, TFABackupCode, TFAAttempt,
-    RegisterRequest, VerifyEmailRequest, ResendCodeRequest
+    RegisterRequest, VerifyEmailRequest, ResendCodeRequest, IntrospectRequest
+)
+from auth.utils import create_access_token, get_password_hash_async, verify_password_async
+from auth.dependencies import set_auth_cookie, get_current_active_user, get_internal_service
+from auth.tokens import token_codec, TokenError
+from auth.serializers import (
+    json_response, serialize_user, serialize_user_summary, serialize_tfa_login
 )
-from auth.utils import create_access_token, get_password_hash, verify_password
-from auth.dependencies import set_auth_cookie, get_current_active_user, validate_csrf
 from config import get_settings
 from database import get_db
 from repositories.user_repository import UserRepository
-from csrf import csrf_protect
-from services.email import EmailService
+from csrf import set_csrf_cookie
 from services.tfa import TFAService
 from services.redis import redis_service
+from services import keys
+from services.email_dispatcher import email_dispatcher
+from services.rate_limiter import ip_rate_limiter, resolve_client_ip
+from services.metrics import metrics
+import logging
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 settings = get_settings()
+logger = logging.getLogger(__name__)
 tfa_service = TFAService()
-email_service = EmailService()
+
+# ===== CSRF =====
+
+@router.get("/csrf")
+async def get_csrf_token(response: Response):
+    """
+    Emite o cookie CSRF (double-submit).
+    O frontend envia o valor do cookie no header em requisições que alteram dados.
+    """
+    token = set_csrf_cookie(response)
+    return {"csrf_token": token}
 
 # ===== REGISTRO COM VERIFICAÇÃO DE EMAIL =====
 
@@ -42,12 +61,10 @@ async def register(
     """
     Primeira etapa do registro: salva dados temporariamente e envia código
     """
-    client_ip = request.client.host
+    client_ip = resolve_client_ip(request)
     
-    # Rate limiting
-    register_key = f"register:attempt:{client_ip}"
-    attempts = await redis_service.get(register_key)
-    if attempts and int(attempts) >= 3:
+    # Rate limiting (endereço e redes do IP)
+    if await ip_rate_limiter.check("register", client_ip):
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Muitas tentativas. Tente novamente em 1 hora."
@@ -67,15 +84,12 @@ async def register(
             # Usuário já existe mas não verificou email
             # Atualiza os dados e reenvia código
             existing_user.full_name = user_data.full_name
-            existing_user.hashed_password = get_password_hash(user_data.password)
+            existing_user.hashed_password = await get_password_hash_async(user_data.password)
             await db.commit()
             
-            # Gera novo código
-            code = email_service.generate_verification_code()
-            
             # Salva no Redis
             await redis_service.set(
-                f"register:pending:{user_data.email}",
+                keys.register_pending(user_data.email),
                 {
                     "user_id": existing_user.id,
                     "full_name": user_data.full_name,
@@ -84,17 +98,17 @@ async def register(
                 expire=timedelta(minutes=15)
             )
             
-            # Envia email
-            await email_service.send_verification_code(
-                user_data.email, 
-                code, 
+            # Envia código (reaproveita o código válido e respeita o cooldown)
+            await email_dispatcher.send_code(
+                "verification",
+                user_data.email,
+                keys.register_code(user_data.email),
+                timedelta(minutes=15),
                 user_data.full_name
             )
             
-            # Incrementa contador
-            await redis_service.increment(register_key)
-            if not attempts:
-                await redis_service.expire(register_key, 3600)
+            # Incrementa contadores
+            await ip_rate_limiter.hit("register", client_ip)
             
             return {
                 "message": "Código de verificação enviado para seu email",
@@ -103,22 +117,19 @@ async def register(
             }
     
     # Verifica se já existe um registro pendente para este email
-    pending = await redis_service.get(f"register:pending:{user_data.email}")
+    pending = await redis_service.get(keys.register_pending(user_data.email))
     if pending:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Já existe um cadastro em andamento para este email. Verifique seu email ou solicite um novo código."
         )
     
-    # Gera código de 6 dígitos
-    code = email_service.generate_verification_code()
-    
     # Hash da senha para armazenamento temporário
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     
     # Salva dados temporários no Redis
     await redis_service.set(
-        f"register:pending:{user_data.email}",
+        keys.register_pending(user_data.email),
         {
             "email": user_data.email,
             "hashed_password": hashed_password,
@@ -128,22 +139,15 @@ async def register(
         expire=timedelta(minutes=15)
     )
     
-    # Salva o código separadamente para facilitar verificação
-    await redis_service.set(
-        f"register:code:{user_data.email}",
-        code,
-        expire=timedelta(minutes=15)
-    )
-    
-    # Incrementa contador de tentativas
-    await redis_service.increment(register_key)
-    if not attempts:
-        await redis_service.expire(register_key, 3600)
+    # Incrementa contadores de tentativas
+    await ip_rate_limiter.hit("register", client_ip)
     
-    # Envia email
-    await email_service.send_verification_code(
-        user_data.email, 
-        code, 
+    # Gera, salva (separado para facilitar verificação) e envia o código
+    await email_dispatcher.send_code(
+        "verification",
+        user_data.email,
+        keys.register_code(user_data.email),
+        timedelta(minutes=15),
         user_data.full_name
     )
     
@@ -157,15 +161,14 @@ async def verify_email(
     request: Request,
     verify_data: VerifyEmailRequest,
     db: AsyncSession = Depends(get_db),
-    # _: bool = Depends(validate_csrf)
 ):
     """
     Segunda etapa: verifica código e cria usuário definitivamente
     """
-    client_ip = request.client.host
+    client_ip = resolve_client_ip(request)
     
     # Rate limiting
-    verify_key = f"register:verify:{client_ip}"
+    verify_key = keys.register_verify(client_ip)
     attempts = await redis_service.get(verify_key)
     if attempts and int(attempts) >= 5:
         raise HTTPException(
@@ -174,7 +177,7 @@ async def verify_email(
         )
     
     # Busca código no Redis
-    stored_code = await redis_service.get(f"register:code:{verify_data.email}")
+    stored_code = await redis_service.get(keys.register_code(verify_data.email))
     if not stored_code:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -189,11 +192,11 @@ async def verify_email(
             await redis_service.expire(verify_key, 3600)
         
         # Incrementa tentativas no registro pendente
-        pending = await redis_service.get(f"register:pending:{verify_data.email}")
+        pending = await redis_service.get(keys.register_pending(verify_data.email))
         if pending:
             pending["attempts"] = pending.get("attempts", 0) + 1
             await redis_service.set(
-                f"register:pending:{verify_data.email}",
+                keys.register_pending(verify_data.email),
                 pending,
                 expire=timedelta(minutes=15)
             )
@@ -204,7 +207,7 @@ async def verify_email(
         )
     
     # Código válido - busca dados pendentes
-    pending = await redis_service.get(f"register:pending:{verify_data.email}")
+    pending = await redis_service.get(keys.register_pending(verify_data.email))
     if not pending:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -228,20 +231,21 @@ async def verify_email(
             email=verify_data.email.lower().strip(),
             hashed_password=pending["hashed_password"],
             full_name=pending.get("full_name"),
-            email_verified=True
+            email_verified=True,
+            signup_source="register"
         )
         db.add(user)
         await db.commit()
         await db.refresh(user)
     
     # Remove dados temporários do Redis
-    await redis_service.delete(f"register:code:{verify_data.email}")
-    await redis_service.delete(f"register:pending:{verify_data.email}")
+    await redis_service.delete(keys.register_code(verify_data.email))
+    await redis_service.delete(keys.register_pending(verify_data.email))
     
     # Faz login automático
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id), "email": user.email},
+        data={"sub": str(user.id)},
         expires_delta=access_token_expires
     )
     
@@ -249,32 +253,29 @@ async def verify_email(
     set_auth_cookie(response, access_token)
     
     # Gera CSRF
-    csrf_token, signed_token = csrf_protect.generate_csrf_tokens()
-    csrf_protect.set_csrf_cookie(signed_token, response)
+    set_csrf_cookie(response)
     
-    return {
-        "message": "Email verificado e cadastro concluído com sucesso",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "full_name": user.full_name
-        }
-    }
+    return json_response(
+        {
+            "message": "Email verificado e cadastro concluído com sucesso",
+            "user": serialize_user_summary(user)
+        },
+        response
+    )
 
 @router.post("/register/resend")
 async def resend_code(
     request: Request,
     resend_data: ResendCodeRequest,
-    db: AsyncSession = Depends(get_db),
-    _: bool = Depends(validate_csrf)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Reenvia código de verificação
     """
-    client_ip = request.client.host
+    client_ip = resolve_client_ip(request)
     
     # Rate limiting
-    resend_key = f"register:resend:{client_ip}"
+    resend_key = keys.register_resend(client_ip)
     resend_count = await redis_service.get(resend_key)
     if resend_count and int(resend_count) >= 3:
         raise HTTPException(
@@ -283,7 +284,7 @@ async def resend_code(
         )
     
     # Verifica se existe registro pendente
-    pending = await redis_service.get(f"register:pending:{resend_data.email}")
+    pending = await redis_service.get(keys.register_pending(resend_data.email))
     if not pending:
         # Verifica se é um usuário não verificado
         repo = UserRepository(db)
@@ -296,7 +297,7 @@ async def resend_code(
                 "attempts": 0
             }
             await redis_service.set(
-                f"register:pending:{resend_data.email}",
+                keys.register_pending(resend_data.email),
                 pending,
                 expire=timedelta(minutes=15)
             )
@@ -306,25 +307,17 @@ async def resend_code(
                 detail="Nenhum registro em andamento para este email"
             )
     
-    # Gera novo código
-    code = email_service.generate_verification_code()
-    
-    # Salva novo código
-    await redis_service.set(
-        f"register:code:{resend_data.email}",
-        code,
-        expire=timedelta(minutes=15)
-    )
-    
     # Incrementa contador
     await redis_service.increment(resend_key)
     if not resend_count:
         await redis_service.expire(resend_key, 3600)
     
-    # Envia email
-    await email_service.send_verification_code(
+    # Reenvia o código ainda válido (ou um novo), respeitando o cooldown
+    await email_dispatcher.send_code(
+        "verification",
         resend_data.email,
-        code,
+        keys.register_code(resend_data.email),
+        timedelta(minutes=15),
         pending.get("full_name")
     )
     
@@ -339,7 +332,7 @@ async def check_registration_status(
     Verifica status do registro para um email
     """
     # Verifica se existe registro pendente
-    pending = await redis_service.get(f"register:pending:{email}")
+    pending = await redis_service.get(keys.register_pending(email))
     
     # Verifica se usuário já existe
     repo = UserRepository(db)
@@ -371,7 +364,7 @@ async def check_registration_status(
 
 # ===== LOGIN COM VERIFICAÇÃO DE EMAIL =====
 
-@router.post("/login")
+@router.post("/login", response_model=TFALoginResponse)
 async def login(
     request: Request,
     response: Response,
@@ -381,11 +374,10 @@ async def login(
     """
     Login com verificação de email
     """
-    client_ip = request.client.host
+    client_ip = resolve_client_ip(request)
     
-    # Rate limiting
-    attempts = await redis_service.get(f"login:attempts:{client_ip}")
-    if attempts and int(attempts) >= 5:
+    # Rate limiting (endereço e redes do IP)
+    if await ip_rate_limiter.check("login", client_ip):
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Muitas tentativas de login. Tente novamente em 15 minutos."
@@ -394,11 +386,9 @@ async def login(
     repo = UserRepository(db)
     user = await repo.get_user_by_email(form_data.username)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        # Incrementa contador
-        current = await redis_service.increment(f"login:attempts:{client_ip}")
-        if current == 1:
-            await redis_service.expire(f"login:attempts:{client_ip}", 900)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
+        # Incrementa contadores
+        await ip_rate_limiter.hit("login", client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos",
@@ -408,77 +398,77 @@ async def login(
     # Verifica se email foi verificado
     if not user.email_verified:
         # Gera novo código se necessário
-        pending = await redis_service.get(f"register:pending:{user.email}")
+        pending = await redis_service.get(keys.register_pending(user.email))
         if not pending:
-            code = email_service.generate_verification_code()
             await redis_service.set(
-                f"register:code:{user.email}",
-                code,
-                expire=timedelta(minutes=15)
-            )
-            await redis_service.set(
-                f"register:pending:{user.email}",
+                keys.register_pending(user.email),
                 {"user_id": user.id, "full_name": user.full_name},
                 expire=timedelta(minutes=15)
             )
-            await email_service.send_verification_code(
-                user.email,
-                code,
-                user.full_name
-            )
+        await email_dispatcher.send_code(
+            "verification",
+            user.email,
+            keys.register_code(user.email),
+            timedelta(minutes=15),
+            user.full_name
+        )
         
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Email não verificado. Um novo código foi enviado para seu email."
         )
     
-    # Reset contador
-    await redis_service.delete(f"login:attempts:{client_ip}")
+    # Reset do contador do endereço (os das redes continuam valendo)
+    await ip_rate_limiter.reset("login", client_ip)
     
     # Verifica 2FA
     if user.tfa_enabled:
-        if await redis_service.exists(f"tfa:block:{user.id}"):
+        if await redis_service.exists(keys.tfa_block(user.id)):
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail="Muitas tentativas de 2FA. Tente novamente em 30 minutos."
             )
         
-        tfa_token = tfa_service.create_tfa_token(user.id, user.email)
-        code = tfa_service.generate_email_code()
+        tfa_token = tfa_service.create_tfa_token(user.id)
         
-        await redis_service.set(
-            f"tfa:code:{user.id}",
-            code,
-            expire=timedelta(minutes=settings.TFA_TOKEN_EXPIRE_MINUTES)
+        await email_dispatcher.send_code(
+            "tfa",
+            user.email,
+            keys.tfa_code(user.id),
+            timedelta(minutes=settings.TFA_TOKEN_EXPIRE_MINUTES),
+            user.full_name
         )
         
-        await email_service.send_tfa_code(user.email, code, user.full_name)
-        
-        return TFALoginResponse(
-            tfa_required=True,
-            tfa_token=tfa_token,
-            message="Código de verificação 2FA enviado para seu email"
+        return json_response(
+            serialize_tfa_login(
+                tfa_required=True,
+                tfa_token=tfa_token,
+                message="Código de verificação 2FA enviado para seu email"
+            ),
+            response
         )
     
     # Login normal
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id), "email": user.email},
+        data={"sub": str(user.id)},
         expires_delta=access_token_expires
     )
     
     set_auth_cookie(response, access_token)
     
-    csrf_token, signed_token = csrf_protect.generate_csrf_tokens()
-    csrf_protect.set_csrf_cookie(signed_token, response)
+    set_csrf_cookie(response)
     
     user.last_login = datetime.utcnow()
     await db.commit()
     
-    return TFALoginResponse(
-        tfa_required=False,
-        message="Login realizado com sucesso",
-        user=user
+    return json_response(
+        serialize_tfa_login(
+            tfa_required=False,
+            message="Login realizado com sucesso",
+            user=user
+        ),
+        response
     )
 
 # ===== 2FA SETUP =====
@@ -487,8 +477,7 @@ async def login(
 async def setup_tfa(
     request: Request,
     current_user = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db),
-    _: bool = Depends(validate_csrf)
+    db: AsyncSession = Depends(get_db)
 ):
     """Inicia configuração do 2FA"""
     if current_user.tfa_enabled:
@@ -500,11 +489,12 @@ async def setup_tfa(
     if not current_user.tfa_secret:
         secret = tfa_service.generate_secret()
         current_user.tfa_secret = secret
-        await db.commit()
     
     qr_uri = tfa_service.generate_qr_uri(current_user.tfa_secret, current_user.email)
     backup_codes = tfa_service.generate_backup_codes(8)
     
+    # Um novo setup invalida os códigos anteriores (mesma transação dos novos)
+    await db.execute(delete(TFABackupCode).where(TFABackupCode.user_id == current_user.id))
     for code in backup_codes:
         backup_code = TFABackupCode(
             user_id=current_user.id,
@@ -525,8 +515,7 @@ async def enable_tfa(
     request: Request,
     tfa_data: TFAEnableRequest,
     current_user = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db),
-    _: bool = Depends(validate_csrf)
+    db: AsyncSession = Depends(get_db)
 ):
     """Ativa 2FA após verificar primeiro código"""
     if current_user.tfa_enabled:
@@ -545,7 +534,7 @@ async def enable_tfa(
     if tfa_data.method == "authenticator":
         valid = tfa_service.verify_totp(current_user.tfa_secret, tfa_data.code)
     else:
-        stored_code = await redis_service.get(f"tfa:setup:{current_user.id}")
+        stored_code = await redis_service.get(keys.tfa_setup(current_user.id))
         valid = stored_code == tfa_data.code
     
     if not valid:
@@ -556,7 +545,7 @@ async def enable_tfa(
     
     current_user.tfa_enabled = True
     await db.commit()
-    await redis_service.delete(f"tfa:setup:{current_user.id}")
+    await redis_service.delete(keys.tfa_setup(current_user.id))
     
     return {"message": "2FA ativado com sucesso"}
 
@@ -565,11 +554,10 @@ async def disable_tfa(
     request: Request,
     password: str,
     current_user = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db),
-    _: bool = Depends(validate_csrf)
+    db: AsyncSession = Depends(get_db)
 ):
     """Desativa 2FA (requer senha)"""
-    if not verify_password(password, current_user.hashed_password):
+    if not await verify_password_async(password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Senha incorreta"
@@ -590,7 +578,7 @@ async def complete_tfa_login(
     db: AsyncSession = Depends(get_db)
 ):
     """Segunda etapa do login 2FA"""
-    client_ip = request.client.host
+    client_ip = resolve_client_ip(request)
     
     payload = tfa_service.verify_tfa_token(tfa_data.tfa_token)
     if not payload:
@@ -601,20 +589,20 @@ async def complete_tfa_login(
     
     user_id = int(payload.get("sub"))
     
-    if await redis_service.exists(f"tfa:block:{user_id}"):
+    if await redis_service.exists(keys.tfa_block(user_id)):
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Muitas tentativas. Tente novamente em 30 minutos."
         )
     
-    stored_code = await redis_service.get(f"tfa:code:{user_id}")
+    stored_code = await redis_service.get(keys.tfa_code(user_id))
     if not stored_code:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Código expirado. Solicite um novo."
         )
     
-    attempts_key = f"tfa:attempts:{user_id}"
+    attempts_key = keys.tfa_attempts(user_id)
     attempts = await redis_service.increment(attempts_key)
     if attempts == 1:
         await redis_service.expire(attempts_key, 3600)
@@ -622,7 +610,7 @@ async def complete_tfa_login(
     if stored_code != tfa_data.code:
         if attempts >= 5:
             await redis_service.set(
-                f"tfa:block:{user_id}",
+                keys.tfa_block(user_id),
                 "blocked",
                 expire=timedelta(minutes=30)
             )
@@ -645,7 +633,7 @@ async def complete_tfa_login(
             detail=f"Código inválido. Tentativas restantes: {5 - attempts}"
         )
     
-    await redis_service.delete(f"tfa:code:{user_id}")
+    await redis_service.delete(keys.tfa_code(user_id))
     await redis_service.delete(attempts_key)
     
     repo = UserRepository(db)
@@ -667,34 +655,33 @@ async def complete_tfa_login(
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id), "email": user.email},
+        data={"sub": str(user.id)},
         expires_delta=access_token_expires
     )
     
     set_auth_cookie(response, access_token)
     
-    csrf_token, signed_token = csrf_protect.generate_csrf_tokens()
-    csrf_protect.set_csrf_cookie(signed_token, response)
+    set_csrf_cookie(response)
+    # Repetições com Idempotency-Key recebem uma sessão nova para este usuário
+    request.state.session_user_id = user.id
     
     user.last_login = datetime.utcnow()
     await db.commit()
     
-    return {
-        "message": "Login 2FA concluído com sucesso",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "full_name": user.full_name
-        }
-    }
+    return json_response(
+        {
+            "message": "Login 2FA concluído com sucesso",
+            "user": serialize_user_summary(user)
+        },
+        response
+    )
 
 # ===== LOGOUT =====
 
 @router.post("/logout")
 async def logout(
     response: Response,
-    current_user = Depends(get_current_active_user),
-    _: bool = Depends(validate_csrf)
+    current_user = Depends(get_current_active_user)
 ):
     """Remove os cookies de autenticação e CSRF"""
     response.delete_cookie(
@@ -718,4 +705,56 @@ async def get_current_user_info(
     current_user = Depends(get_current_active_user)
 ):
     """Retorna informações do usuário atual"""
-    return current_user
\ No newline at end of file
+    return json_response(serialize_user(current_user))
+
+# ===== INTROSPECÇÃO (serviços internos) =====
+
+@router.post("/introspect")
+async def introspect_tokens(
+    body: IntrospectRequest,
+    service: str = Depends(get_internal_service),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Valida um lote de tokens de sessão para gateways e serviços internos
+    (em vez de um /auth/me por token).
+    Verifica todos os tokens, carrega os usuários distintos em uma única consulta e
+    retorna, na ordem recebida, {"active": false} ou os claims com o usuário.
+    """
+    if len(body.tokens) > settings.INTROSPECTION_MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo de {settings.INTROSPECTION_MAX_BATCH} tokens por requisição",
+        )
+    
+    # Tokens repetidos no lote são verificados uma vez; só tokens de acesso são sessões.
+    # Qualquer falha ao decodificar um token o torna inativo sem derrubar o lote.
+    claims_by_token = {}
+    for token in set(body.tokens):
+        try:
+            claims = token_codec.decode(token)
+        except TokenError:
+            continue
+        except Exception:
+            logger.warning("Token inválido na introspecção", exc_info=True, extra={"event": "introspect.decode_error"})
+            continue
+        sub = claims.get("sub")
+        if claims.get("type") == "access" and isinstance(sub, str) and sub.isascii() and sub.isdigit():
+            claims_by_token[token] = claims
+    
+    repo = UserRepository(db)
+    users = await repo.get_users_by_ids(int(claims["sub"]) for claims in claims_by_token.values())
+    
+    results = []
+    for token in body.tokens:
+        claims = claims_by_token.get(token)
+        user = users.get(int(claims["sub"])) if claims else None
+        if user is None:
+            results.append({"active": False})
+        else:
+            results.append({"active": True, **claims, "user": serialize_user(user)})
+    
+    active = sum(1 for result in results if result["active"])
+    metrics.increment("introspected_tokens_total", active, service=service, outcome="active")
+    metrics.increment("introspected_tokens_total", len(results) - active, service=service, outcome="inactive")
+    return json_response({"results": results})
@@ -0,0 +1,48 @@
+# auth/serializers.py
+from operator import attrgetter
+from typing import Any, Dict, Optional
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from models.user import UserResponse
+
+# Serializadores pré-compilados para dados gerados pelo próprio servidor.
+# Os objetos já vêm do banco validados, então não passam de novo pelo
+# from_attributes do Pydantic nem pelo jsonable_encoder.
+
+USER_RESPONSE_FIELDS = tuple(UserResponse.model_fields)
+_user_getter = attrgetter(*USER_RESPONSE_FIELDS)
+
+def serialize_user(user) -> Dict[str, Any]:
+    """User (ORM) -> dict no formato de UserResponse"""
+    return dict(zip(USER_RESPONSE_FIELDS, _user_getter(user)))
+
+def serialize_user_summary(user) -> Dict[str, Any]:
+    """Resumo do usuário retornado ao concluir registro/login"""
+    return {"id": user.id, "email": user.email, "full_name": user.full_name}
+
+def serialize_tfa_login(
+    tfa_required: bool,
+    message: str,
+    tfa_token: Optional[str] = None,
+    user=None,
+) -> Dict[str, Any]:
+    """Payload no formato de TFALoginResponse"""
+    return {
+        "tfa_required": tfa_required,
+        "tfa_token": tfa_token,
+        "message": message,
+        "user": serialize_user(user) if user is not None else None,
+    }
+
+def json_response(content: Any, sub_response: Optional[Response] = None, status_code: int = 200) -> ORJSONResponse:
+    """
+    Cria a resposta JSON diretamente (orjson).
+    Copia os headers (ex: Set-Cookie) definidos no `Response` injetado na rota,
+    que o FastAPI descarta quando a rota retorna uma Response própria.
+    """
+    response = ORJSONResponse(content, status_code=status_code)
+    if sub_response is not None:
+        response.raw_headers.extend(
+            header for header in sub_response.raw_headers if header[0] != b"content-length"
+        )
+    return response
@@ -0,0 +1,194 @@
+"""
+Codec de tokens (JWS compacto: header.payload.assinatura).
+
+Substitui o python-jose nos tokens de sessão e de 2FA:
+- Só o algoritmo configurado é aceito (sem negociação pelo header, sem "none").
+- Claims compactos: `sub`, `exp` e `t` (tipo abreviado); nada de email no cookie.
+- O header leva `kid`, para trocar a chave sem derrubar sessões: tokens são assinados
+  com TOKEN_ACTIVE_KID e verificados com qualquer chave configurada.
+- Tokens antigos (emitidos pelo jose, sem `kid`) continuam válidos com SECRET_KEY até
+  expirarem.
+
+Com ALGORITHM=EdDSA ou ES256 os tokens são assinados com as chaves privadas de
+TOKEN_KEY_FILES e as públicas ficam em /.well-known/jwks.json, para que outros
+serviços verifiquem localmente (auth/jwks_client.py). Rotação:
+  1. adicione o kid novo em TOKEN_KEY_FILES e espere JWKS_MAX_AGE_SECONDS;
+  2. torne-o TOKEN_ACTIVE_KID;
+  3. remova o antigo (ou deixe só a pública) depois que os tokens dele expirarem.
+Ao migrar de HS256, os tokens HS256 ainda em circulação continuam aceitos aqui
+(TOKEN_ACCEPT_LEGACY), mas não pelos outros serviços.
+
+decode() devolve os claims com `type` por extenso, como nos tokens antigos.
+"""
+import hashlib
+import time
+from typing import Any, Dict, Iterable, Optional
+import orjson
+from config import get_settings
+from auth.jws import (
+    ALGORITHMS, TYPE_CODES, TYPE_NAMES, TokenError,
+    b64url_decode, b64url_encode, load_pem_key,
+)
+
+settings = get_settings()
+
+# Headers distintos guardados já decodificados (há um por kid/algoritmo)
+MAX_CACHED_HEADERS = 64
+
+class TokenCodec:
+    """
+    JWS compacto de um algoritmo. `keys` mapeia kid -> chave (privada para assinar;
+    kids só com a pública apenas verificam); `legacy_key` verifica tokens sem kid;
+    `fallbacks` verificam tokens de outros algoritmos durante uma migração.
+    """
+
+    def __init__(
+        self,
+        alg: str,
+        keys: Dict[str, Any],
+        active_kid: str,
+        legacy_key: Any = None,
+        fallbacks: Iterable["TokenCodec"] = (),
+    ):
+        self.algorithm = ALGORITHMS[alg]
+        if active_kid not in keys:
+            raise ValueError(f"Chave ativa '{active_kid}' não está entre as chaves de token")
+        if not self.algorithm.can_sign(keys[active_kid]):
+            raise ValueError(f"Chave ativa '{active_kid}' não assina {alg}")
+        for kid, key in keys.items():
+            if not self.algorithm.can_verify(key):
+                raise ValueError(f"Chave '{kid}' não é do tipo {alg}")
+        self.keys = keys
+        self.active_kid = active_kid
+        self.legacy_key = legacy_key
+        self._verify_keys = {kid: self.algorithm.public_key(key) for kid, key in keys.items()}
+        self._fallbacks = {codec.algorithm.name: codec for codec in fallbacks}
+        self._header_segment = b64url_encode(orjson.dumps({"alg": alg, "kid": active_kid}))
+        self._headers: Dict[bytes, dict] = {}
+
+    @property
+    def alg(self) -> str:
+        return self.algorithm.name
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """Assina os claims com a chave ativa (`exp` em segundos epoch)"""
+        signing_input = self._header_segment + b"." + b64url_encode(orjson.dumps(claims))
+        signature = self.algorithm.sign(self.keys[self.active_kid], signing_input)
+        return (signing_input + b"." + b64url_encode(signature)).decode("ascii")
+
+    def _header(self, segment: bytes) -> dict:
+        header = self._headers.get(segment)
+        if header is None:
+            try:
+                header = orjson.loads(b64url_decode(segment))
+            except (ValueError, orjson.JSONDecodeError):
+                raise TokenError("Header inválido") from None
+            if not isinstance(header, dict):
+                raise TokenError("Header inválido")
+            # kid/alg viram chaves de dicionário: listas ou objetos não podem chegar lá
+            if not isinstance(header.get("alg"), str) or not isinstance(header.get("kid", ""), str):
+                raise TokenError("Header inválido")
+            if len(self._headers) < MAX_CACHED_HEADERS and header.get("kid") in self._verify_keys:
+                self._headers[segment] = header
+        return header
+
+    def _key_for(self, header: dict) -> Any:
+        kid = header.get("kid")
+        if kid is None:
+            if self.legacy_key is None:
+                raise TokenError("Token sem kid")
+            return self.legacy_key
+        key = self._verify_keys.get(kid)
+        if key is None:
+            raise TokenError(f"kid desconhecido: {kid}")
+        return key
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verifica assinatura e expiração; retorna os claims"""
+        try:
+            raw = token.encode("ascii")
+        except (UnicodeEncodeError, AttributeError):
+            raise TokenError("Token malformado") from None
+        parts = raw.split(b".")
+        if len(parts) != 3:
+            raise TokenError("Token malformado")
+        header_segment, payload_segment, signature_segment = parts
+
+        header = self._header(header_segment)
+        alg = header.get("alg")
+        codec = self if alg == self.alg else self._fallbacks.get(alg)
+        if codec is None:
+            raise TokenError(f"Algoritmo não aceito: {alg}")
+        key = codec._key_for(header)
+        try:
+            signature = b64url_decode(signature_segment)
+        except ValueError:
+            raise TokenError("Assinatura malformada") from None
+        if not codec.algorithm.verify(key, header_segment + b"." + payload_segment, signature):
+            raise TokenError("Assinatura inválida")
+
+        try:
+            claims = orjson.loads(b64url_decode(payload_segment))
+        except (ValueError, orjson.JSONDecodeError):
+            raise TokenError("Payload inválido") from None
+        if not isinstance(claims, dict):
+            raise TokenError("Payload inválido")
+
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+            raise TokenError("Token sem exp")
+        if exp <= time.time():
+            raise TokenError("Token expirado")
+
+        code = claims.pop("t", None)
+        if code is not None:
+            claims["type"] = TYPE_NAMES.get(code, code)
+        return claims
+
+    def jwks(self) -> Dict[str, list]:
+        """Chaves públicas (JWK Set); vazio para HS256"""
+        if not self.algorithm.asymmetric:
+            return {"keys": []}
+        return {"keys": [self.algorithm.public_jwk(key, kid) for kid, key in self.keys.items()]}
+
+def _hs256_codec(legacy_key: Optional[bytes]) -> TokenCodec:
+    """Sem TOKEN_KEYS, usa SECRET_KEY com o kid "k0" """
+    secrets = settings.TOKEN_KEYS or {"k0": settings.SECRET_KEY}
+    keys = {kid: secret.encode("utf-8") for kid, secret in secrets.items()}
+    active_kid = settings.TOKEN_ACTIVE_KID if settings.ALGORITHM == "HS256" else None
+    return TokenCodec("HS256", keys, active_kid or next(iter(keys)), legacy_key=legacy_key)
+
+def build_codec() -> TokenCodec:
+    """Codec de ALGORITHM (HS256, EdDSA ou ES256)"""
+    if settings.ALGORITHM not in ALGORITHMS:
+        raise ValueError(f"ALGORITHM não suportado: {settings.ALGORITHM}")
+    legacy_key = settings.SECRET_KEY.encode("utf-8") if settings.TOKEN_ACCEPT_LEGACY else None
+    if settings.ALGORITHM == "HS256":
+        return _hs256_codec(legacy_key)
+
+    if not settings.TOKEN_KEY_FILES:
+        raise ValueError(f"ALGORITHM={settings.ALGORITHM} exige TOKEN_KEY_FILES")
+    keys = {kid: load_pem_key(path) for kid, path in settings.TOKEN_KEY_FILES.items()}
+    fallbacks = [_hs256_codec(legacy_key)] if settings.TOKEN_ACCEPT_LEGACY else []
+    return TokenCodec(
+        settings.ALGORITHM,
+        keys,
+        settings.TOKEN_ACTIVE_KID or next(iter(keys)),
+        fallbacks=fallbacks,
+    )
+
+def issue(token_type: str, subject: str, expires_in_seconds: float, **extra: Any) -> str:
+    """Token compacto: {"sub", "exp", "t"} e claims extras"""
+    claims = {"sub": subject, "exp": int(time.time() + expires_in_seconds), "t": TYPE_CODES[token_type]}
+    claims.update(extra)
+    return token_codec.encode(claims)
+
+def jwks_document() -> bytes:
+    """JWK Set serializado (servido em /.well-known/jwks.json)"""
+    return orjson.dumps(token_codec.jwks())
+
+def jwks_etag(document: bytes) -> str:
+    return '"' + hashlib.sha256(document).hexdigest()[:32] + '"'
+
+# Instância global
+token_codec = build_codec()
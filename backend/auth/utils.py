@@ -1,8 +1,10 @@
+import asyncio
 import bcrypt
-from jose import jwt
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 from typing import Optional
 from config import get_settings
+from tracing import traced
+from auth.tokens import TokenError, issue, token_codec
 import logging
 
 settings = get_settings()
@@ -10,6 +12,7 @@ logger = logging.getLogger(__name__)
 
 # ⚠️ REMOVER: from passlib.context import CryptContext
 
+@traced("auth.verify_password")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifica se a senha fornecida corresponde ao hash armazenado.
@@ -24,7 +27,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         
         return bcrypt.checkpw(plain_password, hashed_password)
     except Exception as e:
-        logger.error(f"Erro ao verificar senha: {e}")
+        logger.error("Erro ao verificar senha: %s", e, extra={"event": "auth.password_check_error"})
         return False
 
 def get_password_hash(password: str) -> str:
@@ -46,32 +49,34 @@ def get_password_hash(password: str) -> str:
     # Retorna o hash como string
     return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
 
-# As funções de JWT permanecem iguais
+# bcrypt libera o GIL: em thread, um hash não congela o event loop (as outras
+# requisições seguem atendidas enquanto ele roda). O AdmissionMiddleware limita
+# quantos rodam ao mesmo tempo (classe "bcrypt").
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password fora do event loop"""
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash fora do event loop"""
+    return await asyncio.to_thread(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """Cria JWT token de acesso"""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    """Cria token de acesso (claims compactos: sub, exp, tipo)"""
+    expires = expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    extra = {k: v for k, v in data.items() if k != "sub"}
+    return issue("access", str(data["sub"]), expires.total_seconds(), **extra)
 
 def create_refresh_token(data: dict) -> str:
     """Cria refresh token"""
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    extra = {k: v for k, v in data.items() if k != "sub"}
+    return issue("refresh", str(data["sub"]), timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS).total_seconds(), **extra)
 
+@traced("auth.decode_token")
 def decode_token(token: str) -> Optional[dict]:
-    """Decodifica e valida JWT token"""
+    """Decodifica e valida token (aceita também os emitidos antes do codec)"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except jwt.JWTError as e:
-        logger.error(f"Erro ao decodificar token: {e}")
-        return None
\ No newline at end of file
+        return token_codec.decode(token)
+    except TokenError as e:
+        logger.warning("Erro ao decodificar token: %s", e, extra={"event": "auth.invalid_token"})
+        return None
@@ -0,0 +1,91 @@
+"""
+Compara o custo de ida e volta das consultas get_user_by_id / get_user_by_email
+entre os drivers async de MySQL suportados, contra um MySQL local (configuração do .env).
+
+Uso: python benchmarks/bench_db_drivers.py --iterations 2000 --concurrency 10
+"""
+import argparse
+import asyncio
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório do backend ao path do Python
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from config import get_settings, SUPPORTED_MYSQL_DRIVERS
+from database import Base, build_connect_args
+from models.user import User
+from repositories.user_repository import UserRepository
+
+settings = get_settings()
+BENCH_EMAIL = "bench-driver@voyeluxone.local"
+
+def driver_url(driver: str) -> str:
+    return settings.DATABASE_URL.replace(f"mysql+{settings.MYSQL_DRIVER}://", f"mysql+{driver}://", 1)
+
+async def ensure_user(factory) -> int:
+    async with factory() as session:
+        result = await session.execute(select(User.id).where(User.email == BENCH_EMAIL))
+        user_id = result.scalar_one_or_none()
+        if user_id is None:
+            user = User(email=BENCH_EMAIL, hashed_password="x", full_name="Bench")
+            session.add(user)
+            await session.commit()
+            user_id = user.id
+        return user_id
+
+async def measure(factory, label: str, op, iterations: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            async with factory() as session:
+                await op(UserRepository(session))
+
+    # Aquecimento (abre as conexões do pool)
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(iterations)))
+    elapsed = time.perf_counter() - started
+    print(f"  {label:18s} {iterations / elapsed:8.0f} ops/s  {elapsed / iterations * concurrency * 1e6:8.0f} µs/op")
+
+async def bench_driver(driver: str, args):
+    engine = create_async_engine(
+        driver_url(driver),
+        connect_args=build_connect_args(),
+        pool_size=args.concurrency,
+        max_overflow=0,
+    )
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        user_id = await ensure_user(factory)
+
+        print(f"{driver}:")
+        await measure(factory, "get_user_by_id", lambda repo: repo.get_user_by_id(user_id), args.iterations, args.concurrency)
+        await measure(factory, "get_user_by_email", lambda repo: repo.get_user_by_email(BENCH_EMAIL), args.iterations, args.concurrency)
+    finally:
+        await engine.dispose()
+
+async def main(args):
+    for driver in args.drivers:
+        if importlib.util.find_spec(driver) is None:
+            print(f"{driver}: não instalado, ignorado")
+            continue
+        await bench_driver(driver, args)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark dos drivers async de MySQL")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--drivers", nargs="+", default=list(SUPPORTED_MYSQL_DRIVERS), choices=SUPPORTED_MYSQL_DRIVERS)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
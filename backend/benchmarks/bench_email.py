@@ -0,0 +1,122 @@
+"""
+Benchmark de envio de emails pelo ResendClient contra um servidor HTTP local
+que imita a API do Resend (sem rede externa).
+
+Uso: python benchmarks/bench_email.py --requests 2000 --concurrency 50 --fail-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório do backend ao path do Python
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.resend_client import ResendClient
+
+class StandInResendServer:
+    """Servidor HTTP/1.1 keep-alive mínimo que responde como a API do Resend"""
+
+    def __init__(self, fail_rate: float = 0.0):
+        self.fail_rate = fail_rate
+        self.connections = 0
+        self.requests = 0
+        self.failures = 0
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode().split(" ", 2)
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value.strip())
+                payload = json.loads(await reader.readexactly(length)) if length else None
+                self.requests += 1
+
+                if random.random() < self.fail_rate:
+                    self.failures += 1
+                    status, body, extra = "429 Too Many Requests", b'{"message":"rate limited"}', "Retry-After: 0\r\n"
+                elif path.endswith("/batch"):
+                    status, extra = "200 OK", ""
+                    body = json.dumps({"data": [{"id": f"bench-{self.requests}-{i}"} for i in range(len(payload))]}).encode()
+                else:
+                    status, body, extra = "200 OK", json.dumps({"id": f"bench-{self.requests}"}).encode(), ""
+
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n{extra}"
+                    f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+def message(i: int) -> dict:
+    return {
+        "from": "Bench <bench@example.com>",
+        "to": [f"user{i}@example.com"],
+        "subject": "Benchmark",
+        "html": "<p>123456</p>",
+        "text": "123456",
+    }
+
+async def run(args):
+    server = StandInResendServer(args.fail_rate)
+    base_url = await server.start()
+    client = ResendClient(api_key="bench", base_url=base_url, max_connections=args.concurrency)
+    await client.start()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send_one(i: int):
+        async with semaphore:
+            result = await client.send(message(i))
+            assert result["id"].startswith("bench-")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send_one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    print(f"send:       {args.requests / elapsed:8.0f} emails/s  ({elapsed:.2f}s, "
+          f"{server.connections} conexões, {server.failures} respostas 429 re-tentadas)")
+
+    batch_started = time.perf_counter()
+    results = await client.send_batch([message(i) for i in range(args.requests)])
+    batch_elapsed = time.perf_counter() - batch_started
+    assert len(results) == args.requests
+    print(f"send_batch: {args.requests / batch_elapsed:8.0f} emails/s  ({batch_elapsed:.2f}s)")
+
+    await client.close()
+    await server.stop()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark do ResendClient")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fração de respostas 429 simuladas")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
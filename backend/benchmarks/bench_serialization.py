@@ -0,0 +1,60 @@
+"""
+Microbenchmark do custo de serialização por resposta de /auth/login e /auth/me:
+caminho genérico (Pydantic from_attributes + jsonable_encoder + JSONResponse)
+contra o caminho rápido (serializador pré-compilado + ORJSONResponse).
+
+Uso: python benchmarks/bench_serialization.py --iterations 50000
+"""
+import argparse
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+# Adiciona o diretório do backend ao path do Python
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from models.user import User, UserResponse, TFALoginResponse
+from auth.serializers import json_response, serialize_user, serialize_tfa_login
+
+def make_user() -> User:
+    return User(
+        id=42,
+        email="viajante@voyeluxone.com",
+        full_name="Viajante Exemplo",
+        hashed_password="$2b$12$" + "x" * 53,
+        is_active=True,
+        is_superuser=False,
+        email_verified=True,
+        tfa_enabled=False,
+        created_at=datetime(2024, 1, 1, 12, 0, 0),
+        last_login=datetime.utcnow(),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialização de respostas")
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+    user = make_user()
+
+    cases = {
+        "login (antes)": lambda: JSONResponse(jsonable_encoder(
+            TFALoginResponse(tfa_required=False, message="Login realizado com sucesso", user=user)
+        )),
+        "login (depois)": lambda: json_response(
+            serialize_tfa_login(tfa_required=False, message="Login realizado com sucesso", user=user)
+        ),
+        "me (antes)": lambda: JSONResponse(jsonable_encoder(
+            UserResponse.model_validate(user)
+        )),
+        "me (depois)": lambda: json_response(serialize_user(user)),
+    }
+
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=args.iterations, repeat=3))
+        print(f"{name:16s} {seconds / args.iterations * 1e6:8.2f} µs/resposta")
+
+if __name__ == "__main__":
+    main()
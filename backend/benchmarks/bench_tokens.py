@@ -0,0 +1,59 @@
+"""
+Microbenchmark de emissão e verificação de tokens de sessão:
+python-jose (caminho antigo, claims com email) contra o codec de auth/tokens.py.
+Mostra também o tamanho do token (vai no cookie de toda requisição).
+
+Uso: python benchmarks/bench_tokens.py --iterations 50000
+"""
+import argparse
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Adiciona o diretório do backend ao path do Python
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import get_settings
+from auth.tokens import token_codec
+from auth.utils import create_access_token, decode_token
+
+settings = get_settings()
+
+try:
+    from jose import jwt
+except ImportError:
+    jwt = None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do codec de tokens")
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    def jose_encode():
+        expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        claims = {"sub": "42", "email": "viajante@voyeluxone.com", "exp": expire, "type": "access"}
+        return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+    def codec_encode():
+        return create_access_token({"sub": "42"})
+
+    cases = {"codec encode": codec_encode}
+    codec_token = codec_encode()
+    cases["codec decode"] = lambda: decode_token(codec_token)
+    if jwt is not None:
+        jose_token = jose_encode()
+        cases["jose encode"] = jose_encode
+        cases["jose decode"] = lambda: jwt.decode(jose_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        # Token antigo verificado pelo codec (compatibilidade durante a migração)
+        cases["codec decode (token jose)"] = lambda: token_codec.decode(jose_token)
+        print(f"tamanho: jose {len(jose_token)} bytes, codec {len(codec_token)} bytes")
+    else:
+        print(f"tamanho: codec {len(codec_token)} bytes (python-jose não instalado: sem comparação)")
+
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=args.iterations, repeat=3))
+        print(f"{name:28s} {args.iterations / seconds:12,.0f} op/s  {seconds / args.iterations * 1e6:8.2f} µs/op")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+# Adiciona o diretório atual ao path do Python
+sys.path.append(str(Path(__file__).parent))
+
+from services.breached_passwords import BloomFilterWriter, password_digest
+
+SHA1_SIZE = 20
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def count_lines(path: str) -> int:
+    with open(path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+# Linhas inválidas listadas no log (as demais só entram na contagem)
+MAX_LOGGED_INVALID = 10
+
+def iter_digests(path: str, plain: bool, stats: Dict[str, int]):
+    """
+    Lê a lista de senhas vazadas.
+    Formato padrão: SHA-1 em hex por linha, opcionalmente "HASH:CONTAGEM" (formato HIBP).
+    Com --plain: uma senha em texto por linha.
+    Linhas que não são um SHA-1 válido são puladas e contadas em stats["invalid"].
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if not line:
+                continue
+            if plain:
+                yield password_digest(line)
+                continue
+            try:
+                digest = bytes.fromhex(line.split(":", 1)[0].strip())
+            except ValueError:
+                digest = b""
+            if len(digest) != SHA1_SIZE:
+                stats["invalid"] += 1
+                if stats["invalid"] <= MAX_LOGGED_INVALID:
+                    logger.warning("⚠️ Linha %d ignorada (não é um SHA-1): %.60r", number, line)
+                continue
+            yield digest
+
+def build_filter(args):
+    """Compila a lista de hashes em um filtro de Bloom no disco"""
+    expected = args.expected or count_lines(args.source)
+    writer = BloomFilterWriter(args.output, expected, args.fp_rate)
+    logger.info(
+        f"🧱 Criando filtro: {expected} itens, {writer.num_bits // 8 // 1024} KB, "
+        f"k={writer.num_hashes}, falso positivo={args.fp_rate}"
+    )
+
+    started = time.perf_counter()
+    added = 0
+    stats = {"invalid": 0}
+    try:
+        for digest in iter_digests(args.source, args.plain, stats):
+            writer.add_digest(digest)
+            added += 1
+            if added % 1_000_000 == 0:
+                logger.info(f"📦 {added} hashes adicionados")
+    finally:
+        writer.close()
+
+    logger.info(f"✅ Filtro gravado em {args.output}: {added} hashes em {time.perf_counter() - started:.1f}s")
+    if stats["invalid"]:
+        logger.warning(f"⚠️ {stats['invalid']} linhas inválidas ignoradas")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compila lista de senhas vazadas em filtro de Bloom")
+    parser.add_argument("source", help="Arquivo com SHA-1 (hex ou HASH:CONTAGEM) por linha")
+    parser.add_argument("output", help="Arquivo do filtro (use em BREACHED_PASSWORDS_FILTER_PATH)")
+    parser.add_argument("--fp-rate", type=float, default=0.001, help="Taxa de falso positivo desejada")
+    parser.add_argument("--expected", type=int, help="Número de itens (padrão: conta as linhas)")
+    parser.add_argument("--plain", action="store_true", help="Entrada com senhas em texto puro")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    build_filter(parse_args())
@@ -1,14 +1,27 @@
 from pydantic_settings import BaseSettings
+from pydantic import field_validator, model_validator
 from functools import lru_cache
-from typing import Optional
+from typing import Optional, Dict, List
+
+# Dialetos async de MySQL suportados pelo SQLAlchemy
+SUPPORTED_MYSQL_DRIVERS = ("aiomysql", "asyncmy")
+SUPPORTED_REDIS_MODES = ("standalone", "cluster", "sentinel")
 
 class Settings(BaseSettings):
     # JWT Settings
     SECRET_KEY: str
-    ALGORITHM: str = "HS256"
+    ALGORITHM: str = "HS256"                # "HS256", "EdDSA" (Ed25519) ou "ES256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
-    ENVIRONMENT: str = "development"
+    TOKEN_KEYS: Dict[str, str] = {}       # kid -> segredo (vazio = SECRET_KEY com kid "k0"); ver auth/tokens.py
+    TOKEN_ACTIVE_KID: Optional[str] = None  # kid que assina os tokens novos (padrão: o primeiro)
+    TOKEN_ACCEPT_LEGACY: bool = True      # Aceita tokens sem kid (emitidos antes do codec) e HS256 após migrar
+    TOKEN_KEY_FILES: Dict[str, str] = {}  # kid -> PEM (EdDSA/ES256); gere com generate_token_key.py
+    JWKS_MAX_AGE_SECONDS: int = 300       # Cache de /.well-known/jwks.json nos outros serviços
+    INTROSPECTION_TOKENS: Dict[str, str] = {}  # serviço -> token de /auth/introspect (vazio = desativado)
+    INTROSPECTION_MAX_BATCH: int = 500    # Tokens por requisição de /auth/introspect
+    METRICS_TOKENS: Dict[str, str] = {}   # coletor -> token de /metrics (superusuários também acessam)
+    ENVIRONMENT: str = "development"  # "inmemory" = SQLite, Redis em processo e emails capturados
     
     # Cookie Settings
     COOKIE_NAME: str = "auth_token"
@@ -25,11 +38,37 @@ class Settings(BaseSettings):
     CSRF_COOKIE_HTTPONLY: bool = False  # JavaScript precisa ler o token
     CSRF_COOKIE_SAMESITE: str = "lax"
     CSRF_HEADER_NAME: str = "X-CSRFToken"
+    CSRF_TOKEN_MAX_AGE: int = 3600  # 1 hora
+    CSRF_PROTECTED_PREFIXES: List[str] = ["/auth/", "/admin/"]
+    CSRF_EXEMPT_PATHS: List[str] = [  # Etapas anteriores à sessão (não há cookie CSRF ainda)
+        "/auth/register",
+        "/auth/login",
+        "/auth/login/complete",
+        "/auth/introspect",           # Chamada entre serviços, sem cookie (autenticada por token)
+    ]
+
+    # Idempotency-Key (repetições de clientes móveis recebem a resposta guardada)
+    IDEMPOTENCY_HEADER: str = "Idempotency-Key"
+    IDEMPOTENCY_PATHS: List[str] = [  # Set-Cookie nunca é guardado; logins repetidos recebem sessão nova
+        "/auth/register",
+        "/auth/register/resend",
+        "/auth/login/complete",
+        "/auth/tfa/setup",
+    ]
+    IDEMPOTENCY_TTL_SECONDS: int = 86400       # Até 24 horas, limitado à duração do token de acesso
+    IDEMPOTENCY_LOCK_SECONDS: int = 30         # Marca de "em andamento" (maior que a rota mais lenta)
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0     # Espera máxima de uma duplicata simultânea
 
     # Resend Settings
-    RESEND_API_KEY: str
+    RESEND_API_KEY: Optional[str] = None      # Obrigatório fora de ENVIRONMENT=inmemory
     RESEND_FROM_EMAIL: str = "noreply@voyeluxone.com"
     RESEND_FROM_NAME: str = "VoyeluxOne"
+    RESEND_API_URL: str = "https://api.resend.com"
+    RESEND_TIMEOUT_SECONDS: float = 10.0
+    RESEND_MAX_RETRIES: int = 3              # Retentativas em 429/5xx
+    RESEND_MAX_BACKOFF_SECONDS: float = 5.0
+    RESEND_MAX_CONNECTIONS: int = 20
+    EMAIL_COOLDOWN_SECONDS: int = 60         # Intervalo mínimo entre reenvios por destinatário
     
     # 2FA Settings
     TFA_TOKEN_EXPIRE_MINUTES: int = 10  # Código expira em 10 minutos
@@ -37,15 +76,53 @@ class Settings(BaseSettings):
 
     
     
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"                 # "json" ou "text"
+    LOG_RATE_LIMIT_PER_SECOND: float = 5.0   # Por chave de mensagem/evento
+    LOG_RATE_LIMIT_BURST: int = 20
+    LOG_RATE_LIMIT_MAX_KEYS: int = 10000     # Chaves guardadas pelo limitador (LRU)
+    LOG_SAMPLE_RATES: Dict[str, float] = {   # Fração dos eventos ruidosos que é registrada
+        "auth.login_failed": 0.1,
+        "auth.login_unknown_email": 0.1,
+        "auth.invalid_token": 0.1,
+        "redis.error": 0.1,
+    }
+    
+    # Tracing (spans exportados para arquivo local ou buffer em memória)
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 0.01        # Fração das requisições rastreadas
+    TRACING_EXPORTER: str = "memory"         # "memory" ou "file"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_BUFFER_SIZE: int = 10000         # Spans mantidos no buffer circular
+    
+    # Profiler por requisição (amostrado ou via header assinado)
+    PROFILER_ENABLED: bool = False
+    PROFILER_SAMPLE_RATE: float = 0.0        # Fração das requisições perfiladas
+    PROFILER_HEADER: str = "X-Profile-Request"  # Valor gerado por `python profiler.py`
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_MAX_PER_MINUTE: int = 6
+    PROFILER_OUTPUT_DIR: str = "profiles"
+    PROFILER_FORMAT: str = "speedscope"      # "speedscope" ou "collapsed"
+    
     # MySQL Settings
-    MYSQL_USER: str
-    MYSQL_PASSWORD: str
-    MYSQL_HOST: str
+    MYSQL_USER: Optional[str] = None          # Obrigatórios fora de ENVIRONMENT=inmemory
+    MYSQL_PASSWORD: Optional[str] = None
+    MYSQL_HOST: Optional[str] = None
     MYSQL_PORT: int = 3306
-    MYSQL_DATABASE: str
+    MYSQL_DATABASE: Optional[str] = None
     MYSQL_POOL_SIZE: int = 10
     MYSQL_POOL_RECYCLE: int = 3600
+    MYSQL_POOL_TIMEOUT: float = 5.0           # Espera máxima por uma conexão do pool
     MYSQL_ECHO: bool = False
+    MYSQL_DRIVER: str = "aiomysql"           # Dialeto async do SQLAlchemy: "aiomysql" ou "asyncmy"
+    MYSQL_SSL_ENABLED: Optional[bool] = None  # None = TLS ligado fora de development
+    MYSQL_SSL_CA: Optional[str] = "/etc/ssl/certs/ca-certificates.crt"
+    DB_RELEASE_AFTER_READ: bool = True  # Devolve a conexão ao pool logo após leituras
+    
+    # Sharding (vazio = banco único acima; ver sharding.py)
+    SHARD_URLS: List[str] = []               # URLs SQLAlchemy completas, uma por shard (shard0, shard1, ...)
+    SHARD_MAP_PATH: Optional[str] = None     # JSON com slots movidos por rebalance_shards.py
 
         # Redis Settings
     REDIS_HOST: str = "localhost"
@@ -53,11 +130,65 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
     REDIS_URL: Optional[str] = None
+    REDIS_MODE: str = "standalone"            # "standalone", "cluster" ou "sentinel"
+    REDIS_CLUSTER_NODES: List[str] = []       # host:port dos nós iniciais (vazio = REDIS_HOST:REDIS_PORT)
+    REDIS_SENTINELS: List[str] = []           # host:port dos sentinels
+    REDIS_SENTINEL_MASTER: str = "mymaster"
     
     # Rate Limiting
     RATE_LIMIT_LOGIN: str = "5/minute"  # 5 tentativas por minuto
     RATE_LIMIT_TFA: str = "3/minute"     # 3 tentativas de código por minuto
     RATE_LIMIT_REGISTER: str = "2/hour"  # 2 registros por hora por IP
+    TRUSTED_PROXIES: List[str] = []     # IPs/CIDRs dos proxies cujo X-Forwarded-For é aceito
+    # Limites por IP em níveis (ver services/rate_limiter.py); janela em segundos
+    IP_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+        "login": {"window_seconds": 900, "ip": 5, "ipv4_24": 50, "ipv6_64": 10, "ipv6_48": 100},
+        "register": {"window_seconds": 3600, "ip": 3, "ipv4_24": 30, "ipv6_64": 6, "ipv6_48": 60},
+    }
+    
+    # Scheduler (jobs em background com eleição de líder via Redis)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_LOCK_TTL_SECONDS: int = 30
+    
+    # Retenção de dados
+    RETENTION_INTERVAL_SECONDS: int = 3600        # Executa os expurgos a cada 1 hora
+    RETENTION_TFA_ATTEMPTS_DAYS: int = 90
+    RETENTION_BACKUP_CODES_DAYS: int = 30         # Códigos usados
+    RETENTION_UNVERIFIED_USERS_DAYS: int = 7
+    RETENTION_BATCH_SIZE: int = 500               # Registros por lote
+    RETENTION_THROTTLE_SECONDS: float = 0.2       # Pausa entre lotes
+    RETENTION_MAX_ROWS_PER_RUN: int = 100000
+    
+    # Deadlines: orçamento de latência por requisição, em segundos (0 = sem prazo)
+    REQUEST_BUDGET_SECONDS: float = 5.0
+    ROUTE_BUDGETS: Dict[str, float] = {
+        "/health": 1.0,
+        "/auth/csrf": 1.0,
+        "/auth/me": 1.0,
+        "/auth/introspect": 2.0,
+        "/auth/login": 3.0,
+        "/auth/login/complete": 2.0,
+        "/auth/register": 5.0,
+        "/auth/register/verify": 3.0,
+        "/admin/users/export": 0,  # Streaming longo
+    }
+    
+    # Controle de admissão: concorrência por classe de rota (por worker)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_CLASSES: Dict[str, Dict[str, int]] = {
+        "bcrypt": {"max_in_flight": 4, "max_queue": 32},     # Rotas que executam bcrypt
+        "default": {"max_in_flight": 100, "max_queue": 200},
+    }
+    ADMISSION_ROUTES: Dict[str, str] = {
+        "/auth/login": "bcrypt",
+        "/auth/register": "bcrypt",
+        "/auth/tfa/disable": "bcrypt",
+    }
+    ADMISSION_EXEMPT_PATHS: List[str] = ["/health", "/metrics"]
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    
+    # Senhas vazadas (filtro de Bloom gerado por build_breached_filter.py)
+    BREACHED_PASSWORDS_FILTER_PATH: Optional[str] = None
     
     @property
     def REDIS_CONNECTION_URL(self) -> str:
@@ -67,14 +198,50 @@ class Settings(BaseSettings):
             return f"redis://:{self.REDIS_PASSWORD}@{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
     
+    @field_validator("MYSQL_DRIVER")
+    @classmethod
+    def validate_mysql_driver(cls, v: str) -> str:
+        if v not in SUPPORTED_MYSQL_DRIVERS:
+            raise ValueError(f"MYSQL_DRIVER deve ser um de: {', '.join(SUPPORTED_MYSQL_DRIVERS)}")
+        return v
+    
+    @field_validator("REDIS_MODE")
+    @classmethod
+    def validate_redis_mode(cls, v: str) -> str:
+        if v not in SUPPORTED_REDIS_MODES:
+            raise ValueError(f"REDIS_MODE deve ser um de: {', '.join(SUPPORTED_REDIS_MODES)}")
+        return v
+    
+    @model_validator(mode="after")
+    def validate_external_services(self) -> "Settings":
+        # Perfil inmemory: SQLite, Redis em processo e emails capturados (sem serviços externos)
+        if self.IN_MEMORY:
+            return self
+        missing = [
+            name
+            for name in ("MYSQL_USER", "MYSQL_PASSWORD", "MYSQL_HOST", "MYSQL_DATABASE", "RESEND_API_KEY")
+            if getattr(self, name) is None
+        ]
+        if missing:
+            raise ValueError(f"Configurações obrigatórias ausentes: {', '.join(missing)}")
+        return self
+    
+    @property
+    def IN_MEMORY(self) -> bool:
+        return self.ENVIRONMENT == "inmemory"
+    
+    @property
+    def MYSQL_SSL_ACTIVE(self) -> bool:
+        if self.MYSQL_SSL_ENABLED is not None:
+            return self.MYSQL_SSL_ENABLED
+        return self.ENVIRONMENT not in ("development", "inmemory")
+    
     @property
     def DATABASE_URL(self) -> str:
-        # Para desenvolvimento, use URL sem SSL
-        if self.ENVIRONMENT == "development":
-            return f"mysql+aiomysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
-        else:
-            # Produção com SSL
-            return f"mysql+aiomysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}?ssl_ca=/etc/ssl/certs/ca-certificates.crt"
+        if self.IN_MEMORY:
+            return "sqlite+aiosqlite://"
+        # TLS é configurado em database.build_connect_args, não na URL
+        return f"mysql+{self.MYSQL_DRIVER}://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
     
     class Config:
         env_file = ".env"
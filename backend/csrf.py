@@ -1,25 +1,49 @@
 # backend/csrf.py
-from fastapi_csrf_protect import CsrfProtect
-from pydantic import BaseModel
+import hashlib
+import hmac
+import secrets
+from typing import Optional
 from config import get_settings
 
 settings = get_settings()
 
-class CsrfSettings(BaseModel):
-    """Configuração do CSRF Protection"""
-    secret_key: str = settings.SECRET_KEY
-    cookie_samesite: str = settings.CSRF_COOKIE_SAMESITE
-    cookie_secure: bool = settings.CSRF_COOKIE_SECURE
-    cookie_httponly: bool = settings.CSRF_COOKIE_HTTPONLY
-    cookie_name: str = settings.CSRF_COOKIE_NAME
-    header_name: str = settings.CSRF_HEADER_NAME
-    token_location: str = "header"
-    max_age: int = 3600  # 1 hora
+# Double-submit com HMAC: o token é "nonce.assinatura" e fica em um cookie
+# legível pelo JavaScript, que o devolve no header. A chave é derivada uma
+# única vez e o estado HMAC inicial é pré-computado (só é copiado por token).
+_CSRF_KEY = hashlib.sha256(b"csrf:" + settings.SECRET_KEY.encode("utf-8")).digest()
+_HMAC_BASE = hmac.new(_CSRF_KEY, digestmod=hashlib.sha256)
 
-@CsrfProtect.load_config
-def get_csrf_config():
-    """Carrega configuração do CSRF"""
-    return CsrfSettings()
+def _sign(nonce: str) -> str:
+    mac = _HMAC_BASE.copy()
+    mac.update(nonce.encode("ascii"))
+    return mac.hexdigest()
 
-# Instância global do CSRF Protect
-csrf_protect = CsrfProtect()
\ No newline at end of file
+def generate_csrf_token() -> str:
+    """Gera um novo token CSRF assinado"""
+    nonce = secrets.token_urlsafe(18)
+    return f"{nonce}.{_sign(nonce)}"
+
+def verify_csrf_token(token: str) -> bool:
+    """Verifica a assinatura do token em tempo constante"""
+    nonce, sep, signature = token.partition(".")
+    if not sep or not nonce:
+        return False
+    try:
+        return hmac.compare_digest(_sign(nonce), signature)
+    except (UnicodeEncodeError, TypeError):
+        return False
+
+def set_csrf_cookie(response, token: Optional[str] = None) -> str:
+    """Define o cookie CSRF na resposta e retorna o token"""
+    token = token or generate_csrf_token()
+    response.set_cookie(
+        key=settings.CSRF_COOKIE_NAME,
+        value=token,
+        httponly=settings.CSRF_COOKIE_HTTPONLY,
+        secure=settings.CSRF_COOKIE_SECURE,
+        samesite=settings.CSRF_COOKIE_SAMESITE,
+        domain=settings.COOKIE_DOMAIN,
+        path=settings.COOKIE_PATH,
+        max_age=settings.CSRF_TOKEN_MAX_AGE,
+    )
+    return token
@@ -1,8 +1,16 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base, declared_attr
+from sqlalchemy.ext.horizontal_shard import ShardedSession
 from sqlalchemy import MetaData
+from sqlalchemy.pool import StaticPool
 from config import get_settings
+from services.metrics import metrics
+from typing import Optional, Dict
+from tracing import instrument_engine
+from deadline import DeadlineExceeded, bounded
+from sharding import shard_router, install_id_slot_reset
 import logging
+import ssl
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -18,24 +26,88 @@ convention = {
 
 metadata = MetaData(naming_convention=convention)
 
-# Engine assíncrona
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.MYSQL_ECHO,
-    pool_size=settings.MYSQL_POOL_SIZE,
-    max_overflow=20,
-    pool_recycle=settings.MYSQL_POOL_RECYCLE,
-    pool_pre_ping=True,
-)
+def build_connect_args() -> dict:
+    """
+    connect_args com TLS (verificação do certificado do servidor).
+    aiomysql e asyncmy recebem o mesmo SSLContext em `ssl`.
+    """
+    if not settings.MYSQL_SSL_ACTIVE:
+        return {}
+    return {"ssl": ssl.create_default_context(cafile=settings.MYSQL_SSL_CA or None)}
+
+def _create_engine(url: str):
+    if settings.IN_MEMORY:
+        # SQLite em memória: uma única conexão compartilhada, senão cada sessão veria um banco vazio
+        return create_async_engine(
+            url,
+            echo=settings.MYSQL_ECHO,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+    return create_async_engine(
+        url,
+        connect_args=build_connect_args(),
+        echo=settings.MYSQL_ECHO,
+        pool_size=settings.MYSQL_POOL_SIZE,
+        max_overflow=20,
+        pool_recycle=settings.MYSQL_POOL_RECYCLE,
+        pool_timeout=settings.MYSQL_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
+# Engines assíncronas (uma por shard; sem sharding, apenas o banco de DATABASE_URL)
+if shard_router is not None:
+    engines: Dict[str, AsyncEngine] = {
+        shard_id: _create_engine(url)
+        for shard_id, url in zip(shard_router.shard_ids, settings.SHARD_URLS)
+    }
+    for _engine in engines.values():
+        install_id_slot_reset(_engine)
+else:
+    engines = {"default": _create_engine(settings.DATABASE_URL)}
+
+# Engine principal (primeiro shard): health checks, scripts e dispose
+engine = next(iter(engines.values()))
+
+# Spans por statement SQL (somente com tracing habilitado)
+if settings.TRACING_ENABLED:
+    for _engine in engines.values():
+        instrument_engine(_engine)
 
 # Fábrica de sessões
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+if shard_router is not None:
+    # Sessão roteada: escolhe o shard por email/id do usuário (ver sharding.py)
+    AsyncSessionLocal = async_sessionmaker(
+        class_=AsyncSession,
+        sync_session_class=ShardedSession,
+        shards={shard_id: eng.sync_engine for shard_id, eng in engines.items()},
+        shard_chooser=shard_router.shard_chooser,
+        identity_chooser=shard_router.identity_chooser,
+        execute_chooser=shard_router.execute_chooser,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+else:
+    AsyncSessionLocal = async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+def shard_session_factories() -> Dict[str, async_sessionmaker]:
+    """
+    Uma fábrica de sessão simples por shard, para varreduras que paginam por id
+    (exportação, retenção): cada shard é percorrido em separado.
+    """
+    if shard_router is None:
+        return {"default": AsyncSessionLocal}
+    return {
+        shard_id: async_sessionmaker(eng, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+        for shard_id, eng in engines.items()
+    }
 
 # Base para modelos - CORRIGIDO: não use metadata aqui ainda
 Base = declarative_base()
@@ -45,14 +117,98 @@ def get_metadata():
     """Retorna metadata com naming convention"""
     return metadata
 
-# Dependência para obter sessão do banco
-async def get_db() -> AsyncSession:
-    """Dependência do FastAPI para obter sessão do banco"""
-    async with AsyncSessionLocal() as session:
+class LazyAsyncSession:
+    """
+    Proxy de AsyncSession criado sob demanda.
+    - A sessão só é criada no primeiro uso real; rotas que rejeitam a requisição
+      antes (rate limit, bloqueio, código inválido) nunca tocam no pool.
+    - Após uma leitura sem escritas pendentes, a transação é encerrada e a conexão
+      volta ao pool imediatamente (expire_on_commit=False mantém os objetos válidos),
+      em vez de ficar presa durante bcrypt, Redis e envio de email.
+    """
+
+    def __init__(self, factory: async_sessionmaker):
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+        self._has_writes = False
+        self._timed_out = False
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    @property
+    def touched(self) -> bool:
+        """True se a requisição chegou a usar o banco"""
+        return self._session is not None
+
+    def _can_release(self) -> bool:
+        session = self._session
+        return (
+            settings.DB_RELEASE_AFTER_READ
+            and not self._has_writes
+            and session.in_transaction()
+            and not (session.new or session.dirty or session.deleted)
+        )
+
+    async def _bounded(self, awaitable, operation: str):
+        """Aplica o prazo da requisição (checkout do pool + consulta)"""
         try:
-            yield session
-        finally:
-            await session.close()
+            return await bounded(awaitable, operation)
+        except DeadlineExceeded:
+            # A conexão foi interrompida no meio da operação: não pode voltar ao pool
+            self._timed_out = True
+            raise
+
+    async def execute(self, statement, *args, **kwargs):
+        result = await self._bounded(self.session.execute(statement, *args, **kwargs), "db.execute")
+        if not getattr(statement, "is_select", False):
+            self._has_writes = True
+        elif self._can_release():
+            # Resultados do AsyncSession já vêm pré-carregados; é seguro encerrar a transação
+            await self._bounded(self._session.commit(), "db.commit")
+        return result
+    
+    async def refresh(self, instance, *args, **kwargs):
+        await self._bounded(self.session.refresh(instance, *args, **kwargs), "db.refresh")
+        if self._can_release():
+            await self._bounded(self._session.commit(), "db.commit")
+
+    async def flush(self, *args, **kwargs):
+        self._has_writes = True
+        return await self._bounded(self.session.flush(*args, **kwargs), "db.flush")
+
+    async def commit(self):
+        await self._bounded(self.session.commit(), "db.commit")
+        self._has_writes = False
+
+    async def rollback(self):
+        if self._session is not None:
+            await self._session.rollback()
+        self._has_writes = False
+
+    async def close(self):
+        if self._session is None:
+            return
+        if self._timed_out:
+            await self._session.invalidate()
+        else:
+            await self._session.close()
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+# Dependência para obter sessão do banco
+async def get_db() -> LazyAsyncSession:
+    """Dependência do FastAPI para obter sessão do banco (criada só no primeiro uso)"""
+    db = LazyAsyncSession(AsyncSessionLocal)
+    try:
+        yield db
+    finally:
+        await db.close()
+        metrics.increment("db_requests_total", session="used" if db.touched else "skipped")
 
 # Função para criar tabelas
 async def create_tables():
@@ -60,7 +216,13 @@ async def create_tables():
     # Importa os modelos aqui para evitar importação circular
     from models.user import User
     
-    async with engine.begin() as conn:
-        # Cria as tabelas apenas para os modelos que herdam de Base
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("✅ Tabelas criadas/verificadas com sucesso")
\ No newline at end of file
+    for eng in engines.values():
+        async with eng.begin() as conn:
+            # Cria as tabelas apenas para os modelos que herdam de Base
+            await conn.run_sync(Base.metadata.create_all)
+    logger.info(f"✅ Tabelas criadas/verificadas com sucesso ({len(engines)} banco(s))")
+
+async def dispose_engines():
+    """Fecha os pools de todos os shards"""
+    for eng in engines.values():
+        await eng.dispose()
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""
+Orçamento de latência por requisição.
+
+O DeadlineMiddleware grava no contexto o instante limite da requisição (ROUTE_BUDGETS ou
+REQUEST_BUDGET_SECONDS). Cada chamada a Redis, MySQL e Resend usa como timeout o tempo
+que ainda resta; estourado o prazo, DeadlineExceeded vira 504 em vez de a requisição
+ficar presa esperando uma dependência lenta. Fora de requisições (jobs, scripts) não há
+prazo e nada muda.
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+from config import get_settings
+from services.metrics import metrics
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+# Instante limite (time.monotonic) da requisição atual
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """O orçamento de latência da requisição acabou"""
+
+    def __init__(self, operation: str):
+        super().__init__(f"Prazo da requisição esgotado em {operation}")
+        self.operation = operation
+
+def budget_for(path: str) -> Optional[float]:
+    """Orçamento (segundos) da rota; None = sem prazo"""
+    budget = settings.ROUTE_BUDGETS.get(path.rstrip("/") or "/", settings.REQUEST_BUDGET_SECONDS)
+    return budget if budget and budget > 0 else None
+
+def start(budget: Optional[float]):
+    """Define o prazo do contexto atual; retorna o token para reset()"""
+    return _deadline.set(time.monotonic() + budget if budget else None)
+
+def reset(token) -> None:
+    _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Segundos restantes (None = sem prazo)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def timeout_for(operation: str, cap: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout de uma operação: o menor entre o tempo restante e `cap`.
+    Se o prazo já acabou, falha antes de chamar a dependência.
+    """
+    left = remaining()
+    if left is None:
+        return cap
+    if left <= 0:
+        raise exceeded(operation)
+    return left if cap is None else min(left, cap)
+
+def exceeded(operation: str) -> DeadlineExceeded:
+    metrics.increment("deadline_exceeded_total", operation=operation)
+    return DeadlineExceeded(operation)
+
+async def bounded(awaitable: Awaitable[T], operation: str) -> T:
+    """Aguarda `awaitable` respeitando o prazo da requisição"""
+    timeout = timeout_for(operation)
+    if timeout is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise exceeded(operation) from None
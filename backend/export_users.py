@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Adiciona o diretório atual ao path do Python
+sys.path.append(str(Path(__file__).parent))
+
+from database import dispose_engines
+from services.export import UserExporter, parse_columns
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def parse_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "sim")
+
+async def export_users(args):
+    """Exporta a tabela users para NDJSON/CSV em streaming"""
+    exporter = UserExporter(
+        parse_columns(args.columns),
+        fmt=args.format,
+        created_from=args.created_from,
+        created_to=args.created_to,
+        email_verified=args.email_verified,
+        batch_size=args.batch_size,
+    )
+    started = time.perf_counter()
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        async for chunk in exporter.iter_chunks():
+            out.write(chunk)
+        out.flush()
+        logger.info(f"✅ Exportação concluída em {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        logger.error(f"❌ Erro na exportação: {e}")
+        raise
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        await dispose_engines()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exportação de usuários em streaming")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--output", "-o", help="Arquivo de saída (padrão: stdout)")
+    parser.add_argument("--columns", help="Colunas separadas por vírgula (padrão: todas exportáveis)")
+    parser.add_argument("--created-from", type=datetime.fromisoformat, help="created_at >= (ISO 8601)")
+    parser.add_argument("--created-to", type=datetime.fromisoformat, help="created_at < (ISO 8601)")
+    parser.add_argument("--email-verified", type=parse_bool, help="Filtra por email_verified (true/false)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(export_users(parse_args()))
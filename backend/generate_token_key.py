@@ -0,0 +1,48 @@
+"""
+Gera a chave privada de assinatura de tokens (ALGORITHM=EdDSA ou ES256).
+
+Uso: python generate_token_key.py --alg EdDSA --out keys/token-2025-01.pem
+Depois: TOKEN_KEY_FILES={"2025-01": "keys/token-2025-01.pem"} (ver auth/tokens.py para rotação)
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Adiciona o diretório atual ao path do Python
+sys.path.append(str(Path(__file__).parent))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GENERATORS = {
+    "EdDSA": Ed25519PrivateKey.generate,
+    "ES256": lambda: ec.generate_private_key(ec.SECP256R1()),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera chave privada para assinar tokens")
+    parser.add_argument("--alg", choices=sorted(GENERATORS), default="EdDSA")
+    parser.add_argument("--out", required=True, help="Arquivo PEM de saída (não sobrescreve)")
+    args = parser.parse_args()
+
+    key = GENERATORS[args.alg]()
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    # Somente o dono lê a chave privada
+    fd = os.open(args.out, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+    logger.info(f"✅ Chave {args.alg} gravada em {args.out}")
+
+if __name__ == "__main__":
+    main()
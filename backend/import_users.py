@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Adiciona o diretório atual ao path do Python
+sys.path.append(str(Path(__file__).parent))
+
+from database import AsyncSessionLocal, dispose_engines
+from repositories.user_repository import UserRepository
+from auth.utils import get_password_hash
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _hash_passwords(passwords: List[str]) -> List[Optional[str]]:
+    """Executado nos processos do pool: gera hash bcrypt de cada senha"""
+    hashes = []
+    for password in passwords:
+        try:
+            hashes.append(get_password_hash(password))
+        except ValueError:
+            hashes.append(None)
+    return hashes
+
+def read_rows(path: Path, fmt: str) -> Iterator[Dict]:
+    """Lê usuários do arquivo em streaming (CSV com cabeçalho ou NDJSON)"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+def load_checkpoint(path: Path) -> Dict:
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"rows_done": 0, "inserted": 0, "invalid": 0}
+
+def save_checkpoint(path: Path, state: Dict) -> None:
+    """Grava o checkpoint de forma atômica"""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+class UserImporter:
+    """Importa usuários em lotes: hash em paralelo (processos) e INSERT multi-linha"""
+
+    def __init__(self, args):
+        self.args = args
+        self.pool = ProcessPoolExecutor(max_workers=args.workers)
+        self.checkpoint_path = Path(args.checkpoint or f"{args.file}.checkpoint")
+        self.state = load_checkpoint(self.checkpoint_path) if args.resume else {"rows_done": 0, "inserted": 0, "invalid": 0}
+
+    def _batches(self) -> Iterator[List[Dict]]:
+        batch = []
+        for index, row in enumerate(read_rows(Path(self.args.file), self.args.format)):
+            if index < self.state["rows_done"]:
+                continue
+            batch.append(row)
+            if len(batch) >= self.args.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _hash_batch(self, batch: List[Dict]) -> asyncio.Future:
+        """Distribui o hash das senhas do lote entre os processos do pool"""
+        loop = asyncio.get_running_loop()
+        passwords = [str(row.get("password") or "") for row in batch]
+        chunk = max(1, len(passwords) // self.args.workers + 1)
+        futures = [
+            loop.run_in_executor(self.pool, _hash_passwords, passwords[i:i + chunk])
+            for i in range(0, len(passwords), chunk)
+        ]
+        return asyncio.gather(*futures)
+
+    def _build_rows(self, batch: List[Dict], hashes: List[Optional[str]]) -> List[Dict]:
+        rows = {}
+        for row, hashed in zip(batch, hashes):
+            email = (row.get("email") or "").lower().strip()
+            if not email or not row.get("password") or not hashed:
+                self.state["invalid"] += 1
+                continue
+            full_name = (row.get("full_name") or "").strip() or None
+            # Emails repetidos no mesmo lote: mantém a última ocorrência
+            rows[email] = {
+                "email": email,
+                "hashed_password": hashed,
+                "full_name": full_name,
+                "email_verified": self.args.verified,
+                "signup_source": "import",
+            }
+        return list(rows.values())
+
+    async def run(self):
+        started = time.perf_counter()
+        processed = 0
+        batches = self._batches()
+
+        current = next(batches, None)
+        pending_hash = self._hash_batch(current) if current else None
+
+        try:
+            while current:
+                hashes = [h for chunk in await pending_hash for h in chunk]
+
+                # Pipeline: começa o hash do próximo lote enquanto insere o atual
+                upcoming = next(batches, None)
+                pending_hash = self._hash_batch(upcoming) if upcoming else None
+
+                rows = self._build_rows(current, hashes)
+                async with AsyncSessionLocal() as session:
+                    affected = await UserRepository(session).bulk_insert_users(rows, self.args.on_duplicate)
+
+                self.state["rows_done"] += len(current)
+                self.state["inserted"] += affected
+                save_checkpoint(self.checkpoint_path, self.state)
+
+                processed += len(current)
+                elapsed = time.perf_counter() - started
+                logger.info(
+                    f"📦 {self.state['rows_done']} linhas processadas "
+                    f"({processed / elapsed:.0f} linhas/s, {self.state['inserted']} afetadas, "
+                    f"{self.state['invalid']} inválidas)"
+                )
+                current = upcoming
+        finally:
+            self.pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"✅ Importação concluída: {processed} linhas em {elapsed:.1f}s "
+            f"({processed / elapsed if elapsed else 0:.0f} linhas/s)"
+        )
+
+async def import_users(args):
+    """Importa usuários de CSV/NDJSON para o MySQL"""
+    try:
+        await UserImporter(args).run()
+    except Exception as e:
+        logger.error(f"❌ Erro na importação: {e}")
+        raise
+    finally:
+        await dispose_engines()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Importação em massa de usuários")
+    parser.add_argument("file", help="Arquivo CSV (com cabeçalho) ou NDJSON com email, password, full_name")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Formato do arquivo (padrão: pela extensão)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Usuários por INSERT")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Processos para hash de senha")
+    parser.add_argument("--on-duplicate", choices=["skip", "update"], default="skip", help="O que fazer com emails já cadastrados")
+    # Sem padrão: o login exige email verificado, então a escolha precisa ser explícita
+    verified = parser.add_mutually_exclusive_group(required=True)
+    verified.add_argument("--verified", dest="verified", action="store_true", help="Marca os emails importados como verificados")
+    verified.add_argument("--unverified", dest="verified", action="store_false", help="Exige verificação do email no primeiro login")
+    parser.add_argument("--checkpoint", help="Arquivo de checkpoint (padrão: <arquivo>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="Continua a partir do checkpoint")
+    args = parser.parse_args()
+    if not args.format:
+        args.format = "csv" if args.file.lower().endswith(".csv") else "ndjson"
+    return args
+
+if __name__ == "__main__":
+    asyncio.run(import_users(parse_args()))
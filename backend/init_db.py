@@ -6,7 +6,7 @@ from pathlib import Path
 # Adiciona o diretório atual ao path do Python
 sys.path.append(str(Path(__file__).parent))
 
-from database import engine, create_tables
+from database import engine, create_tables, dispose_engines
 from sqlalchemy import text
 
 logging.basicConfig(level=logging.INFO)
@@ -38,7 +38,7 @@ async def init_database():
         logger.error(f"❌ Erro ao inicializar banco: {e}")
         raise
     finally:
-        await engine.dispose()
+        await dispose_engines()
 
 if __name__ == "__main__":
     asyncio.run(init_database())
\ No newline at end of file
@@ -0,0 +1,131 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+from config import get_settings
+
+settings = get_settings()
+
+_listener: Optional[QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """Formata registros como JSON de uma linha"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limita e amostra mensagens repetitivas.
+    A chave é o atributo `event` (extra={"event": ...}) ou o template da mensagem,
+    então logs com argumentos (%s) de um mesmo ponto compartilham o limite.
+    Mensagens já formatadas (f-strings) geram uma chave por valor: o mapa guarda no
+    máximo `max_keys` chaves e descarta as usadas há mais tempo.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, sample_rates: Dict[str, float], max_keys: int = 10000):
+        super().__init__()
+        self.rate = rate_per_second
+        self.burst = burst
+        self.sample_rates = sample_rates
+        self.max_keys = max_keys
+        # chave -> (tokens, último instante, suprimidos desde o último emitido), em ordem de uso
+        self._buckets: "OrderedDict[Tuple, Tuple[float, float, int]]" = OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        key = event or (record.name, record.msg)
+
+        if event and event in self.sample_rates and random.random() >= self.sample_rates[event]:
+            self._suppress(key)
+            return False
+
+        now = time.monotonic()
+        tokens, last, suppressed = self._buckets.get(key, (self.burst, now, 0))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._store(key, (tokens, now, suppressed + 1))
+            return False
+
+        self._store(key, (tokens - 1, now, 0))
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _suppress(self, key) -> None:
+        tokens, last, suppressed = self._buckets.get(key, (self.burst, time.monotonic(), 0))
+        self._store(key, (tokens, last, suppressed + 1))
+
+    def _store(self, key, bucket: Tuple[float, float, int]) -> None:
+        self._buckets[key] = bucket
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enfileira o registro sem formatá-lo: a formatação (JSON) e a escrita
+    acontecem na thread do QueueListener, fora do event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def setup_logging() -> None:
+    """Configura o logging da aplicação (fila + listener em thread separada)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(
+        RateLimitFilter(
+            settings.LOG_RATE_LIMIT_PER_SECOND,
+            settings.LOG_RATE_LIMIT_BURST,
+            settings.LOG_SAMPLE_RATES,
+            settings.LOG_RATE_LIMIT_MAX_KEYS,
+        )
+    )
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Esvazia a fila e para o listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
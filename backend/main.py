@@ -1,17 +1,33 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 
+from logging_config import setup_logging
+
 from auth.routes import router as auth_router
+from auth.dependencies import get_metrics_reader, reissue_session
+from admin.routes import router as admin_router
 from config import get_settings
-from database import engine, create_tables
+from database import engines, create_tables, dispose_engines
 from middleware.security import SecurityHeadersMiddleware
-from csrf import csrf_protect  # ✅ Import correto
+from middleware.csrf import CSRFMiddleware
+from middleware.idempotency import IdempotencyMiddleware
+from middleware.deadline import DeadlineMiddleware
+from middleware.admission import AdmissionMiddleware
+from deadline import DeadlineExceeded, bounded
+from middleware.tracing import TracingMiddleware
+from middleware.profiler import ProfilerMiddleware
 from services.redis import redis_service
+from services.resend_client import resend_client
+from services.metrics import metrics
+from services.scheduler import scheduler
+from services.retention import register_retention_jobs
+from auth.tokens import jwks_document, jwks_etag
 
 settings = get_settings()
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
@@ -26,25 +42,69 @@ async def lifespan(app: FastAPI):
         await redis_service.connect()
         logger.info("✅ Redis conectado")
         
+        await resend_client.start()
+        
+        # Jobs em background (retenção)
+        register_retention_jobs(scheduler)
+        await scheduler.start()
+        
     except Exception as e:
         logger.error(f"❌ Erro na inicialização: {e}")
         raise
     
-    yield
-    
-    # Shutdown
-    logger.info("🛑 Finalizando aplicação...")
-    await engine.dispose()
-    await redis_service.disconnect()
-    logger.info("✅ Conexões fechadas")
+    try:
+        yield
+    finally:
+        # Shutdown (também quando o corpo da aplicação termina com erro)
+        logger.info("🛑 Finalizando aplicação...")
+        await scheduler.stop()
+        await dispose_engines()
+        await redis_service.disconnect()
+        await resend_client.close()
+        logger.info("✅ Conexões fechadas")
 
 app = FastAPI(
     title="Secure Login System",
     description="Sistema de login com MySQL, bcrypt, Redis e 2FA",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# Idempotency-Key nas rotas que clientes repetem após timeout (dentro do CSRF)
+app.add_middleware(
+    IdempotencyMiddleware,
+    header_name=settings.IDEMPOTENCY_HEADER,
+    paths=settings.IDEMPOTENCY_PATHS,
+    auth_cookie_name=settings.COOKIE_NAME,
+    # Respostas guardadas não sobrevivem à sessão que as criou
+    ttl_seconds=min(settings.IDEMPOTENCY_TTL_SECONDS, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+    lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+    # Repetições de um login recebem uma sessão nova (o cookie original não é guardado)
+    session_issuer=reissue_session,
+)
+
+# Proteção CSRF (double-submit com HMAC), aplicada por prefixo de caminho.
+# Adicionada antes do CORS para que as respostas 403 também recebam os headers CORS.
+app.add_middleware(
+    CSRFMiddleware,
+    cookie_name=settings.CSRF_COOKIE_NAME,
+    header_name=settings.CSRF_HEADER_NAME,
+    protected_prefixes=settings.CSRF_PROTECTED_PREFIXES,
+    exempt_paths=settings.CSRF_EXEMPT_PATHS,
+)
+
+# Controle de admissão por classe de rota (dentro do CORS: o 503 também recebe os headers)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware,
+        classes=settings.ADMISSION_CLASSES,
+        routes=settings.ADMISSION_ROUTES,
+        exempt_paths=settings.ADMISSION_EXEMPT_PATHS,
+        retry_after_seconds=settings.ADMISSION_RETRY_AFTER_SECONDS,
+    )
+
 # Configuração CORS
 app.add_middleware(
     CORSMiddleware,
@@ -62,10 +122,34 @@ app.add_middleware(
 # Middleware de segurança
 app.add_middleware(SecurityHeadersMiddleware)
 
-# ✅ NÃO precisa de csrf_protect.init_app(app) - remova esta linha
+# Prazo (orçamento de latência) de cada requisição
+app.add_middleware(DeadlineMiddleware)
+
+# Profiler por requisição (não é instalado quando desabilitado)
+if settings.PROFILER_ENABLED:
+    app.add_middleware(
+        ProfilerMiddleware,
+        sample_rate=settings.PROFILER_SAMPLE_RATE,
+        header_name=settings.PROFILER_HEADER,
+        interval_ms=settings.PROFILER_INTERVAL_MS,
+    )
+
+# Tracing (mais externo, para medir a requisição inteira)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """Prazo esgotado em Redis, MySQL ou Resend: falha rápida com 504"""
+    logger.warning(
+        "Prazo esgotado em %s (%s)", request.url.path, exc.operation,
+        extra={"event": "deadline.exceeded"},
+    )
+    return ORJSONResponse(status_code=504, content={"detail": "Tempo limite da requisição excedido"})
 
 # Inclui rotas
 app.include_router(auth_router)
+app.include_router(admin_router)
 
 @app.get("/")
 async def root():
@@ -86,8 +170,9 @@ async def health_check():
     # Verifica MySQL
     try:
         from sqlalchemy import text
-        async with engine.connect() as conn:
-            await conn.execute(text("SELECT 1"))
+        for eng in engines.values():
+            async with eng.connect() as conn:
+                await bounded(conn.execute(text("SELECT 1")), "db.health")
         db_status = "connected"
     except:
         db_status = "disconnected"
@@ -99,4 +184,25 @@ async def health_check():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+# JWK Set fixo durante a vida do processo (as chaves só mudam com restart)
+JWKS_BODY = jwks_document()
+JWKS_ETAG = jwks_etag(JWKS_BODY)
+JWKS_CACHE_CONTROL = (
+    f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}, "
+    f"stale-while-revalidate={settings.JWKS_MAX_AGE_SECONDS}, stale-if-error=86400"
+)
+
+@app.get("/.well-known/jwks.json")
+async def jwks(request: Request):
+    """Chaves públicas para outros serviços verificarem tokens localmente (auth/jwks_client.py)"""
+    headers = {"Cache-Control": JWKS_CACHE_CONTROL, "ETag": JWKS_ETAG}
+    if request.headers.get("if-none-match") == JWKS_ETAG:
+        return Response(status_code=304, headers=headers)
+    return Response(content=JWKS_BODY, media_type="application/json", headers=headers)
+
+@app.get("/metrics")
+async def get_metrics(reader: str = Depends(get_metrics_reader)):
+    """Métricas internas em memória deste worker (coletores com METRICS_TOKENS ou superusuários)"""
+    return metrics.snapshot()
+
 from datetime import datetime
\ No newline at end of file
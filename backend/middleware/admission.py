@@ -0,0 +1,117 @@
+# middleware/admission.py
+import asyncio
+import time
+from typing import Dict, Iterable
+from starlette.types import ASGIApp, Receive, Scope, Send
+import deadline
+from services.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RouteClass:
+    """Limite de concorrência de um grupo de rotas: N em andamento e uma fila limitada"""
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    def _publish(self) -> None:
+        metrics.gauge("admission_in_flight", self.in_flight, route_class=self.name)
+        metrics.gauge("admission_queued", self.waiting, route_class=self.name)
+
+    async def acquire(self) -> bool:
+        """Entra na classe; False se a fila está cheia (a requisição deve ser rejeitada)"""
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                metrics.increment("admission_rejections_total", route_class=self.name)
+                return False
+            self.waiting += 1
+            self._publish()
+            started = time.perf_counter()
+            try:
+                # A espera na fila consome o prazo da requisição
+                await deadline.bounded(self._semaphore.acquire(), f"admission.{self.name}")
+            finally:
+                self.waiting -= 1
+                metrics.observe("admission_queue_wait_seconds", time.perf_counter() - started, route_class=self.name)
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        self._publish()
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+        self._publish()
+
+class AdmissionMiddleware:
+    """
+    Controle de admissão por classe de rota.
+    Rotas caras (bcrypt) ficam numa classe pequena e não consomem a capacidade das
+    rotas baratas. O bcrypt roda em thread (auth.utils), então o limite da classe é
+    quantas threads de hash ficam ocupadas; o event loop segue livre. Com a fila da classe cheia, responde 503 com Retry-After na hora,
+    em vez de acumular requisições no worker.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        classes: Dict[str, Dict[str, int]],
+        routes: Dict[str, str],
+        default_class: str = "default",
+        exempt_paths: Iterable[str] = (),
+        retry_after_seconds: int = 1,
+    ):
+        self.app = app
+        self.classes = {
+            name: RouteClass(name, int(limits["max_in_flight"]), int(limits["max_queue"]))
+            for name, limits in classes.items()
+        }
+        self.routes = {path.rstrip("/"): name for path, name in routes.items()}
+        self.default_class = default_class
+        self.exempt_paths = frozenset(p.rstrip("/") for p in exempt_paths)
+        self.retry_after = str(retry_after_seconds).encode("latin-1")
+
+    def _class_for(self, path: str):
+        path = path.rstrip("/")
+        if path in self.exempt_paths:
+            return None
+        return self.classes.get(self.routes.get(path, self.default_class))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route_class = self._class_for(scope["path"]) if scope["type"] == "http" else None
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await route_class.acquire():
+            logger.warning(
+                "Fila cheia na classe %s (%s)", route_class.name, scope["path"],
+                extra={"event": "admission.rejected"},
+            )
+            await self._reject(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release()
+
+    async def _reject(self, send: Send) -> None:
+        body = '{"detail":"Servidor ocupado, tente novamente em instantes"}'.encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", self.retry_after),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,62 @@
+# middleware/deadline.py
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import deadline
+from deadline import DeadlineExceeded
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DeadlineMiddleware:
+    """
+    Abre o prazo da requisição (ROUTE_BUDGETS / REQUEST_BUDGET_SECONDS) no contexto.
+    Estouros dentro das rotas viram 504 pelo exception handler (com headers CORS);
+    os que escapam de outros middlewares são respondidos aqui.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = deadline.budget_for(scope["path"])
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        token = deadline.start(budget)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except DeadlineExceeded as e:
+            if response_started:
+                raise
+            logger.warning(
+                "Prazo esgotado em %s (%s)", scope["path"], e.operation,
+                extra={"event": "deadline.exceeded"},
+            )
+            await self._send_timeout(send)
+        finally:
+            deadline.reset(token)
+
+    @staticmethod
+    async def _send_timeout(send: Send) -> None:
+        body = '{"detail":"Tempo limite da requisição excedido"}'.encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
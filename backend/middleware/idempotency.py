@@ -0,0 +1,221 @@
+# middleware/idempotency.py
+import asyncio
+import base64
+import hashlib
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import timedelta
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from middleware.csrf import _cookie_value
+from services.redis import redis_service
+from services.metrics import metrics
+from services import keys
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+# Headers da resposta que não são guardados nem repetidos
+UNSTORED_HEADERS = frozenset({b"set-cookie"})
+# request.state.<SESSION_USER_STATE>: usuário da sessão emitida pela rota (login)
+SESSION_USER_STATE = "session_user_id"
+POLL_INTERVAL = 0.05
+
+class IdempotencyMiddleware:
+    """
+    Suporte ao header Idempotency-Key nos POSTs configurados.
+    - A primeira requisição com a chave executa a rota; a resposta (exceto 5xx e 429) fica
+      no Redis por `ttl` e as repetições recebem a mesma resposta sem executar a rota.
+    - Duplicatas simultâneas aguardam o resultado da que está em andamento (no mesmo
+      worker por um Future, entre workers consultando o Redis) em vez de executar de novo.
+    - A chave vale por rota e por sessão (cookie de autenticação); reutilizá-la com outro
+      corpo retorna 422.
+    - Set-Cookie nunca é guardado: o token de sessão não fica no Redis. Se a rota emitiu
+      uma sessão (request.state.session_user_id), o registro guarda só o id do usuário e
+      a repetição recebe uma sessão nova de `session_issuer`.
+    - Sem Redis, a requisição segue normalmente.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        header_name: str,
+        paths: Iterable[str],
+        auth_cookie_name: str,
+        ttl_seconds: int,
+        lock_seconds: int,
+        wait_seconds: float,
+        session_issuer: Optional[Callable[[int], Awaitable[Optional[List[Tuple[bytes, bytes]]]]]] = None,
+    ):
+        self.app = app
+        self.header_name = header_name.lower().encode("latin-1")
+        self.paths = frozenset(p.rstrip("/") for p in paths)
+        self.auth_cookie_name = auth_cookie_name.encode("latin-1")
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.session_issuer = session_issuer
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"].rstrip("/") not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        idempotency_key = None
+        session = b""
+        for name, value in scope["headers"]:
+            if name == self.header_name:
+                idempotency_key = value
+            elif name == b"cookie":
+                session = _cookie_value(value, self.auth_cookie_name) or session
+
+        if idempotency_key is None or not redis_service._connected:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await self._send_json(send, 400, "Idempotency-Key inválida")
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        scope_hash = hashlib.sha256(b"\0".join([scope["path"].encode("utf-8"), session, idempotency_key])).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest()
+        record_key = keys.idempotency(scope_hash)
+
+        # Duplicata no mesmo worker: aguarda o Future da requisição original
+        in_flight = self._in_flight.get(record_key)
+        if in_flight is not None:
+            await self._replay_or_reject(send, await asyncio.shield(in_flight), fingerprint, "waited")
+            return
+
+        if not await redis_service.acquire_lock(record_key, "pending", self.lock_seconds):
+            record = await self._wait_for_record(record_key)
+            if record is None:
+                # Expirou ou a original falhou: executa normalmente
+                await self.app(scope, self._replay_receive(body, receive), send)
+                return
+            await self._replay_or_reject(send, record, fingerprint, "replayed")
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[record_key] = future
+        record = None
+        try:
+            record = await self._run_and_capture(scope, self._replay_receive(body, receive), send, fingerprint)
+        finally:
+            del self._in_flight[record_key]
+            if record is not None and record["status"] < 500 and record["status"] != 429:
+                await redis_service.set(record_key, record, expire=self.ttl)
+                metrics.increment("idempotency_requests_total", outcome="stored")
+            else:
+                # Falhou: libera a chave para que a repetição execute de novo
+                await redis_service.delete(record_key)
+                record = None
+            future.set_result(record)
+
+    async def _run_and_capture(self, scope: Scope, receive: Receive, send: Send, fingerprint: str) -> dict:
+        """Executa a rota repassando a resposta ao cliente e guardando uma cópia"""
+        record = {"fingerprint": fingerprint, "status": 500, "headers": [], "body": ""}
+        chunks: List[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                record["status"] = message["status"]
+                record["headers"] = [
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                    if name.lower() not in UNSTORED_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        state = scope.setdefault("state", {})
+        await self.app(scope, receive, send_wrapper)
+        record["body"] = base64.b64encode(b"".join(chunks)).decode("ascii")
+        if state.get(SESSION_USER_STATE) is not None:
+            record["session_user"] = state[SESSION_USER_STATE]
+        return record
+
+    async def _wait_for_record(self, record_key: str) -> Optional[dict]:
+        """Aguarda a requisição original (em outro worker) gravar a resposta"""
+        deadline = asyncio.get_running_loop().time() + self.wait_seconds
+        while True:
+            value = await redis_service.get(record_key)
+            if value is None or isinstance(value, dict):
+                return value
+            if asyncio.get_running_loop().time() >= deadline:
+                return {"pending": True}
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _replay_or_reject(self, send: Send, record: Optional[dict], fingerprint: str, outcome: str) -> None:
+        if record is None:
+            metrics.increment("idempotency_requests_total", outcome="original_failed")
+            await self._send_json(send, 409, "A requisição original falhou; tente novamente")
+            return
+        if record.get("pending"):
+            metrics.increment("idempotency_requests_total", outcome="in_progress")
+            await self._send_json(send, 409, "Requisição com esta Idempotency-Key ainda em processamento")
+            return
+        if record["fingerprint"] != fingerprint:
+            metrics.increment("idempotency_requests_total", outcome="mismatch")
+            await self._send_json(send, 422, "Idempotency-Key já usada com outro corpo")
+            return
+
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+        if record.get("session_user") is not None:
+            cookies = await self.session_issuer(record["session_user"]) if self.session_issuer else None
+            if cookies is None:
+                metrics.increment("idempotency_requests_total", outcome="session_revoked")
+                await self._send_json(send, 401, "Sessão não pode ser emitida novamente; faça login")
+                return
+            headers.extend(cookies)
+
+        metrics.increment("idempotency_requests_total", outcome=outcome)
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": record["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": base64.b64decode(record["body"])})
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> Optional[bytes]:
+        """Lê o corpo inteiro (necessário para a impressão digital); None se o cliente desconectou"""
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _replay_receive(body: bytes, receive: Receive) -> Receive:
+        """receive que entrega o corpo já lido e depois delega ao original"""
+        delivered = False
+
+        async def replay() -> Message:
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return replay
+
+    @staticmethod
+    async def _send_json(send: Send, status: int, detail: str) -> None:
+        body = ('{"detail":"%s"}' % detail).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,61 @@
+# middleware/profiler.py
+import asyncio
+import random
+import threading
+from starlette.types import ASGIApp, Receive, Scope, Send
+from profiler import RequestSampler, request_profiler, verify_profile_header
+from services.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ProfilerMiddleware:
+    """
+    Perfila uma amostra das requisições (ou as que trazem o header assinado).
+    Só é instalado com PROFILER_ENABLED; desligado não tem custo algum.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float, header_name: str, interval_ms: float):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.header_name = header_name.lower().encode("latin-1")
+        self.interval = interval_ms / 1000
+
+    def _should_profile(self, scope: Scope) -> bool:
+        requested = False
+        for name, value in scope["headers"]:
+            if name == self.header_name:
+                requested = verify_profile_header(value.decode("latin-1"))
+                break
+        if not requested and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return False
+        if not request_profiler.allow():
+            metrics.increment("profiler_skipped_total", reason="rate_limited")
+            return False
+        return True
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        coro = self.app(scope, receive, send)
+        sampler = RequestSampler(coro, threading.get_ident(), self.interval)
+        sampler.start()
+        try:
+            await coro
+        finally:
+            sampler.stop()
+            loop = asyncio.get_running_loop()
+            # Grava o arquivo fora do event loop
+            loop.run_in_executor(None, self._write, sampler, scope["method"], scope["path"])
+
+    @staticmethod
+    def _write(sampler: RequestSampler, method: str, path: str) -> None:
+        try:
+            target = request_profiler.write(sampler, method, path)
+            if target:
+                metrics.increment("profiler_profiles_total")
+                logger.info("🔬 Perfil gravado: %s (%.1f ms)", target, sampler.duration * 1000)
+        except Exception as e:
+            logger.error("Erro ao gravar perfil: %s", e, extra={"event": "profiler.write_error"})
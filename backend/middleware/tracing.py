@@ -0,0 +1,59 @@
+# middleware/tracing.py
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from tracing import tracer, NOOP_SPAN
+
+def _parse_traceparent(value: bytes):
+    """W3C traceparent: 00-<trace_id>-<parent_id>-<flags>"""
+    parts = value.decode("latin-1").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None, None
+    return parts[1], parts[2], parts[3] == "01"
+
+class TracingMiddleware:
+    """
+    Abre o span raiz de cada requisição HTTP (respeitando a amostragem) e
+    devolve o trace id no header X-Trace-Id das requisições amostradas.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = parent_id = sampled = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                trace_id, parent_id, sampled = _parse_traceparent(value)
+                break
+
+        span = tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            trace_id=trace_id,
+            parent_id=parent_id,
+            sampled=sampled,
+            method=scope["method"],
+            path=scope["path"],
+        )
+        if span is NOOP_SPAN:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("status_code", message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", span.trace_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            span.status = "error"
+            span.set_attribute("error", repr(e))
+            raise
+        finally:
+            tracer.end_span(span)
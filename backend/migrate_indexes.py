@@ -0,0 +1,432 @@
+"""
+Auditoria e migração online dos índices das tabelas de usuários e 2FA.
+
+Comandos:
+  audit                       Compara os índices do banco com os declarados nos modelos e
+                              com as consultas da aplicação (QUERY_PATTERNS): redundantes,
+                              sem uso, de baixa seletividade e consultas sem índice
+  apply [--dry-run] [--bench] Cria os índices declarados que faltam e remove os que não estão
+                              declarados, com DDL online (ALGORITHM=INPLACE, LOCK=NONE)
+                              e progresso via performance_schema
+  bench                       Custo de inserção (em tabelas de rascunho com os mesmos índices)
+                              e de busca (rode antes e depois do apply)
+
+Roda em todos os bancos de `engines` (cada shard). Os índices novos são criados antes
+das remoções, para que as chaves estrangeiras nunca fiquem sem índice.
+
+Ao mudar uma consulta em repositories/ ou services/, atualize QUERY_PATTERNS.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Adiciona o diretório atual ao path do Python
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import MetaData, inspect, insert, select, text, and_, func
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from database import engines, dispose_engines
+from models.user import User, TFABackupCode, TFAAttempt
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABLES = [User.__table__, TFABackupCode.__table__, TFAAttempt.__table__]
+
+# Índice com menos valores distintos que isso (relativo às linhas) é de baixa seletividade
+LOW_SELECTIVITY = 0.01
+
+@dataclass(frozen=True)
+class QueryPattern:
+    """
+    Consulta da aplicação: colunas comparadas por igualdade e a de faixa/ordenação.
+    Varreduras paginadas por chave (id > :last ... ORDER BY id LIMIT n) são range="id":
+    o plano segue a PK, e as demais condições são só filtro sobre as linhas lidas.
+    """
+    table: str
+    source: str
+    equality: Tuple[str, ...] = ()
+    range: Optional[str] = None
+
+# Consultas feitas pelo código (repositories/, services/, rebalance_shards.py)
+QUERY_PATTERNS = [
+    QueryPattern("users", "UserRepository.get_user_by_email", equality=("email",)),
+    QueryPattern("users", "UserRepository.get_user_by_id / update_user", equality=("id",)),
+    QueryPattern("users", "UserRepository.get_users_page (exportação)", range="id"),
+    QueryPattern("users", "get_users_page com created_from/created_to", range="created_at"),
+    QueryPattern("users", "RetentionService.purge_unverified_users (paginada por id)", range="id"),
+    QueryPattern("tfa_backup_codes", "RetentionService.purge_backup_codes (paginada por id)", range="id"),
+    QueryPattern("tfa_backup_codes", "setup_tfa: DELETE dos códigos do setup anterior", equality=("user_id",)),
+    QueryPattern("tfa_backup_codes", "rebalance_shards.py move / ON DELETE CASCADE", equality=("user_id",)),
+    QueryPattern("tfa_attempts", "RetentionService.purge_tfa_attempts (paginada por id)", range="id"),
+    QueryPattern("tfa_attempts", "rebalance_shards.py move / ON DELETE CASCADE", equality=("user_id",)),
+]
+
+@dataclass(frozen=True)
+class IndexInfo:
+    name: Optional[str]
+    columns: Tuple[str, ...]
+    unique: bool
+    primary: bool = False
+
+    @property
+    def signature(self) -> Tuple[Tuple[str, ...], bool]:
+        return self.columns, self.unique or self.primary
+
+    def describe(self) -> str:
+        kind = "PRIMARY" if self.primary else "UNIQUE" if self.unique else "INDEX"
+        return f"{kind} {self.name or '-'} ({', '.join(self.columns)})"
+
+# ===== ÍNDICES DECLARADOS E REAIS =====
+
+def declared_indexes(table) -> List[IndexInfo]:
+    """Índices que o modelo declara (PK, UNIQUE, Index e index=True)"""
+    result = [IndexInfo("PRIMARY", tuple(c.name for c in table.primary_key.columns), True, primary=True)]
+    for index in table.indexes:
+        result.append(IndexInfo(index.name, tuple(c.name for c in index.columns), bool(index.unique)))
+    for constraint in table.constraints:
+        if constraint.__class__.__name__ == "UniqueConstraint":
+            columns = tuple(c.name for c in constraint.columns)
+            name = constraint.name if isinstance(constraint.name, str) else None
+            result.append(IndexInfo(name or f"uq_{table.name}_{'_'.join(columns)}", columns, True))
+    return result
+
+def _inspect_table(sync_conn, table_name: str) -> List[IndexInfo]:
+    inspector = inspect(sync_conn)
+    pk = inspector.get_pk_constraint(table_name)
+    result = [IndexInfo("PRIMARY", tuple(pk["constrained_columns"]), True, primary=True)]
+    seen = set()
+    for index in inspector.get_indexes(table_name):
+        seen.add(index["name"])
+        result.append(IndexInfo(index["name"], tuple(index["column_names"]), bool(index["unique"])))
+    for constraint in inspector.get_unique_constraints(table_name):
+        if constraint["name"] not in seen:
+            result.append(IndexInfo(constraint["name"], tuple(constraint["column_names"]), True))
+    return result
+
+async def actual_indexes(eng: AsyncEngine) -> Dict[str, List[IndexInfo]]:
+    async with eng.connect() as conn:
+        return {
+            table.name: await conn.run_sync(_inspect_table, table.name)
+            for table in TABLES
+        }
+
+# ===== ANÁLISE =====
+
+def serves(index: IndexInfo, pattern: QueryPattern) -> bool:
+    """
+    O índice atende a consulta por completo: começa pelas colunas de igualdade e, se
+    houver faixa/ordenação, segue com essa coluna (ou é uma chave única já fixada).
+    """
+    equality = set(pattern.equality)
+    n = len(equality)
+    if set(index.columns[:n]) != equality:
+        # Chave única inteira entre as igualdades: no máximo uma linha
+        return bool(equality) and (index.unique or index.primary) and set(index.columns) <= equality
+    if pattern.range is None or ((index.unique or index.primary) and n == len(index.columns)):
+        return True
+    return len(index.columns) > n and index.columns[n] == pattern.range
+
+def uses(index: IndexInfo, pattern: QueryPattern) -> bool:
+    """O índice ajuda ao menos em parte (primeira coluna é de igualdade ou a de faixa)"""
+    return index.columns[0] in pattern.equality or index.columns[0] == pattern.range
+
+def _rank(index: IndexInfo) -> int:
+    return 2 if index.primary else 1 if index.unique else 0
+
+def redundant_with(index: IndexInfo, others: Sequence[IndexInfo]) -> Optional[str]:
+    """Motivo pelo qual o índice é dispensável (None = necessário)"""
+    if index.primary:
+        return None
+    for other in others:
+        if other is index:
+            continue
+        if other.columns == index.columns:
+            # Entre dois iguais fica a PK, depois o único, depois o de menor nome
+            if (_rank(other), index.name or "") > (_rank(index), other.name or ""):
+                return f"duplica {other.describe()}"
+            continue
+        if not index.unique and other.columns[:len(index.columns)] == index.columns:
+            return f"prefixo de {other.describe()}"
+        if (other.unique or other.primary) and index.columns[:len(other.columns)] == other.columns:
+            return f"começa pela chave única {other.describe()} (no máximo uma linha)"
+    return None
+
+def foreign_key_columns(table) -> List[str]:
+    return [fk.parent.name for fk in table.foreign_keys]
+
+async def selectivity(eng: AsyncEngine, table_name: str) -> Dict[str, float]:
+    """Valores distintos / linhas de cada índice (estatísticas do InnoDB; somente MySQL)"""
+    if eng.dialect.name != "mysql":
+        return {}
+    async with eng.connect() as conn:
+        rows = (await conn.execute(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"
+        ), {"t": table_name})).scalar() or 0
+        stats = await conn.execute(text(
+            "SELECT INDEX_NAME, MAX(CARDINALITY) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND SEQ_IN_INDEX = 1 "
+            "GROUP BY INDEX_NAME"
+        ), {"t": table_name})
+        return {name: (cardinality or 0) / rows for name, cardinality in stats if rows}
+
+def plan(table, declared: List[IndexInfo], actual: List[IndexInfo]) -> Tuple[List[IndexInfo], List[IndexInfo]]:
+    """Índices a criar (declarados que faltam) e a remover (existentes não declarados)"""
+    declared_signatures = {i.signature for i in declared}
+    actual_signatures = {i.signature for i in actual}
+    to_add = [i for i in declared if not i.primary and i.signature not in actual_signatures]
+    to_drop = [i for i in actual if not i.primary and i.signature not in declared_signatures]
+
+    # Não remove o único índice que cobre uma chave estrangeira
+    final = [i for i in actual if i not in to_drop] + to_add
+    for column in foreign_key_columns(table):
+        if not any(i.columns[0] == column for i in final):
+            keep = next((i for i in to_drop if i.columns[0] == column), None)
+            if keep is not None:
+                to_drop.remove(keep)
+                final.append(keep)
+    return to_add, to_drop
+
+async def audit(args):
+    for shard_id, eng in engines.items():
+        logger.info(f"📊 {shard_id}")
+        current = await actual_indexes(eng)
+        for table in TABLES:
+            actual = current[table.name]
+            patterns = [p for p in QUERY_PATTERNS if p.table == table.name]
+            ratios = await selectivity(eng, table.name)
+            fk_columns = foreign_key_columns(table)
+            print(f"\n{table.name}")
+            for index in actual:
+                notes = []
+                reason = redundant_with(index, actual)
+                if reason:
+                    notes.append(f"redundante: {reason}")
+                used_by = [p.source for p in patterns if uses(index, p)]
+                if not used_by and not index.primary and index.columns[0] not in fk_columns:
+                    notes.append("nenhuma consulta usa")
+                ratio = ratios.get(index.name)
+                if ratio is not None and ratio < LOW_SELECTIVITY and not index.unique and len(index.columns) == 1:
+                    notes.append(f"baixa seletividade ({ratio:.4f})")
+                print(f"  {index.describe():<60} {'; '.join(notes) or 'ok'}")
+            for pattern in patterns:
+                if not any(serves(index, pattern) for index in actual):
+                    print(f"  ⚠️  sem índice: {pattern.source} "
+                          f"(igualdade={list(pattern.equality)}, faixa={pattern.range})")
+            to_add, to_drop = plan(table, declared_indexes(table), actual)
+            for index in to_add:
+                print(f"  + criar   {index.describe()}")
+            for index in to_drop:
+                print(f"  - remover {index.describe()}")
+
+# ===== DDL ONLINE =====
+
+def _quote(eng: AsyncEngine, name: str) -> str:
+    return eng.dialect.identifier_preparer.quote(name)
+
+def add_statement(eng: AsyncEngine, table: str, index: IndexInfo) -> str:
+    columns = ", ".join(_quote(eng, c) for c in index.columns)
+    unique = "UNIQUE " if index.unique else ""
+    if eng.dialect.name == "mysql":
+        return (
+            f"ALTER TABLE {_quote(eng, table)} ADD {unique}INDEX {_quote(eng, index.name)} ({columns}), "
+            "ALGORITHM=INPLACE, LOCK=NONE"
+        )
+    return f"CREATE {unique}INDEX {_quote(eng, index.name)} ON {_quote(eng, table)} ({columns})"
+
+def drop_statement(eng: AsyncEngine, table: str, index: IndexInfo) -> str:
+    if eng.dialect.name == "mysql":
+        return f"ALTER TABLE {_quote(eng, table)} DROP INDEX {_quote(eng, index.name)}, ALGORITHM=INPLACE, LOCK=NONE"
+    return f"DROP INDEX {_quote(eng, index.name)}"
+
+async def _enable_progress(eng: AsyncEngine) -> bool:
+    """Liga os instrumentos de progresso de ALTER do InnoDB (requer privilégio em performance_schema)"""
+    if eng.dialect.name != "mysql":
+        return False
+    try:
+        async with eng.begin() as conn:
+            await conn.execute(text(
+                "UPDATE performance_schema.setup_instruments SET ENABLED = 'YES', TIMED = 'YES' "
+                "WHERE NAME LIKE 'stage/innodb/alter%'"
+            ))
+            await conn.execute(text(
+                "UPDATE performance_schema.setup_consumers SET ENABLED = 'YES' "
+                "WHERE NAME LIKE 'events_stages_%'"
+            ))
+        return True
+    except DBAPIError as e:
+        logger.warning(f"⚠️ Progresso indisponível (performance_schema): {e.orig}")
+        return False
+
+async def _report_progress(eng: AsyncEngine, label: str, interval: float) -> None:
+    async with eng.connect() as conn:
+        while True:
+            await asyncio.sleep(interval)
+            row = (await conn.execute(text(
+                "SELECT EVENT_NAME, WORK_COMPLETED, WORK_ESTIMATED "
+                "FROM performance_schema.events_stages_current "
+                "WHERE EVENT_NAME LIKE 'stage/innodb/alter%'"
+            ))).first()
+            await conn.commit()
+            if row and row[2]:
+                stage = row[0].rsplit("/", 1)[-1]
+                logger.info(f"📦 {label}: {100 * row[1] / row[2]:.0f}% ({stage})")
+
+async def run_ddl(eng: AsyncEngine, statement: str, label: str, args, progress: bool) -> None:
+    """Executa um ALTER online; tenta de novo se não conseguir o metadata lock a tempo"""
+    for attempt in range(1, args.retries + 1):
+        reporter = asyncio.create_task(_report_progress(eng, label, args.progress_interval)) if progress else None
+        started = time.perf_counter()
+        try:
+            async with eng.connect() as conn:
+                if eng.dialect.name == "mysql":
+                    # Sem isso, o ALTER esperando o metadata lock bloquearia as consultas da aplicação
+                    await conn.execute(text(f"SET SESSION lock_wait_timeout = {int(args.lock_wait_timeout)}"))
+                await conn.execute(text(statement))
+                await conn.commit()
+            logger.info(f"✅ {label} em {time.perf_counter() - started:.1f}s")
+            return
+        except DBAPIError as e:
+            if "Lock wait timeout" not in str(e.orig) or attempt == args.retries:
+                raise
+            logger.warning(f"⚠️ {label}: metadata lock ocupado, tentativa {attempt}/{args.retries}")
+            await asyncio.sleep(args.lock_wait_timeout)
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+
+async def apply(args):
+    if args.bench:
+        await bench(args)
+    for shard_id, eng in engines.items():
+        current = await actual_indexes(eng)
+        progress = not args.dry_run and await _enable_progress(eng)
+        for table in TABLES:
+            to_add, to_drop = plan(table, declared_indexes(table), current[table.name])
+            statements = [(add_statement(eng, table.name, i), f"{shard_id}: {table.name} + {i.name}") for i in to_add]
+            statements += [(drop_statement(eng, table.name, i), f"{shard_id}: {table.name} - {i.name}") for i in to_drop]
+            for statement, label in statements:
+                if args.dry_run:
+                    print(f"{statement};")
+                    continue
+                logger.info(f"🚚 {label}")
+                await run_ddl(eng, statement, label, args, progress)
+    if args.bench and not args.dry_run:
+        await bench(args)
+
+# ===== BENCHMARK =====
+
+async def _create_scratch(conn, table, name: str):
+    """
+    Tabela vazia com os mesmos índices de `table`, para medir inserções sem tocar na
+    tabela real (nem no seu AUTO_INCREMENT). No MySQL copia os índices existentes no banco;
+    nos demais, os declarados no modelo.
+    """
+    scratch = table.to_metadata(MetaData(), name=name)
+    if conn.dialect.name == "mysql":
+        await conn.execute(text(f"CREATE TABLE {_quote(conn, name)} LIKE {_quote(conn, table.name)}"))
+        return scratch
+    for constraint in list(scratch.foreign_key_constraints):
+        scratch.constraints.discard(constraint)
+    for index in scratch.indexes:
+        index.name = f"{name}_{index.name}"
+    await conn.run_sync(scratch.create)
+    return scratch
+
+async def bench(args):
+    """Inserções em tabelas de rascunho e buscas por email/varredura de retenção no primeiro banco"""
+    eng = next(iter(engines.values()))
+    users = User.__table__
+    run = uuid.uuid4().hex[:8]
+
+    scratch_names = []
+    try:
+        async with eng.begin() as conn:
+            scratch_users = await _create_scratch(conn, users, f"bench_users_{run}")
+            scratch_names.append(scratch_users.name)
+            scratch_codes = await _create_scratch(conn, TFABackupCode.__table__, f"bench_backup_codes_{run}")
+            scratch_names.append(scratch_codes.name)
+
+        async with eng.begin() as conn:
+            started = time.perf_counter()
+            for i in range(args.inserts):
+                await conn.execute(insert(scratch_users).values(
+                    email=f"bench-idx-{run}-{i}@voyeluxone.local", hashed_password="x",
+                    is_active=True, is_superuser=False, email_verified=False, tfa_enabled=False,
+                ))
+            user_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            for i in range(args.inserts):
+                await conn.execute(insert(scratch_codes).values(user_id=i + 1, code=f"{i:08d}", used=False))
+            code_seconds = time.perf_counter() - started
+    finally:
+        async with eng.begin() as conn:
+            for name in scratch_names:
+                await conn.execute(text(f"DROP TABLE {_quote(conn, name)}"))
+
+    async with eng.connect() as conn:
+        emails = [row[0] for row in await conn.execute(select(users.c.email).limit(1000))]
+        lookup_seconds = 0.0
+        if emails:
+            started = time.perf_counter()
+            for _ in range(args.lookups):
+                await conn.execute(select(users).where(and_(
+                    users.c.email == random.choice(emails), users.c.is_active == True
+                )))
+            lookup_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await conn.execute(
+            select(users.c.id)
+            .where(and_(
+                users.c.id > 0, users.c.email_verified == False, users.c.last_login.is_(None),
+                users.c.created_at < func.now(),
+            ))
+            .order_by(users.c.id).limit(500)
+        )
+        purge_seconds = time.perf_counter() - started
+        await conn.rollback()
+
+    logger.info(f"📊 users: {args.inserts / user_seconds:,.0f} inserções/s")
+    logger.info(f"📊 tfa_backup_codes: {args.inserts / code_seconds:,.0f} inserções/s")
+    if emails:
+        logger.info(f"📊 busca por email: {args.lookups / lookup_seconds:,.0f} consultas/s")
+    logger.info(f"📊 lote de retenção (não verificados): {purge_seconds * 1000:.1f} ms")
+
+COMMANDS = {"audit": audit, "apply": apply, "bench": bench}
+
+async def main(args):
+    try:
+        await COMMANDS[args.command](args)
+    except Exception as e:
+        logger.error(f"❌ Erro na migração de índices: {e}")
+        raise
+    finally:
+        await dispose_engines()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Auditoria e migração online de índices")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("audit", help="Compara índices reais, declarados e consultas")
+    apply_parser = sub.add_parser("apply", help="Aplica as mudanças com DDL online")
+    apply_parser.add_argument("--dry-run", action="store_true", help="Só imprime o DDL")
+    apply_parser.add_argument("--bench", action="store_true", help="Mede antes e depois")
+    apply_parser.add_argument("--lock-wait-timeout", type=float, default=5, help="Espera máxima pelo metadata lock (s)")
+    apply_parser.add_argument("--retries", type=int, default=5, help="Tentativas quando o metadata lock está ocupado")
+    apply_parser.add_argument("--progress-interval", type=float, default=5.0, help="Intervalo dos relatórios de progresso (s)")
+    for bench_parser in (apply_parser, sub.add_parser("bench", help="Custo de inserção e busca")):
+        bench_parser.add_argument("--inserts", type=int, default=2000, help="Linhas inseridas por tabela de rascunho")
+        bench_parser.add_argument("--lookups", type=int, default=5000, help="Buscas por email")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,113 @@
+"""
+Migra as chaves Redis do formato antigo (`tfa:code:42`) para o formato com hash tag
+(`tfa:code:{42}`, ver services/keys.py), inclusive de um Redis de nó único para um
+Redis Cluster/Sentinel (destino = REDIS_MODE configurado).
+
+Cada chave é copiada com DUMP/RESTORE mantendo o TTL restante; chaves que já existem
+no destino não são sobrescritas. Chaves de cooldown de email não são migradas (expiram
+em EMAIL_COOLDOWN_SECONDS). Rode logo após o deploy que passa a usar os nomes novos.
+
+Uso: python migrate_redis_keys.py [--source redis://antigo:6379/0] [--dry-run] [--keep-source]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório atual ao path do Python
+sys.path.append(str(Path(__file__).parent))
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+from config import get_settings
+from services import keys
+from services.redis import create_redis_client
+
+settings = get_settings()
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def migrate_prefix(source, target, prefix: str, args) -> dict:
+    """Migra todas as chaves antigas de um prefixo, em lotes de SCAN"""
+    stats = {"copied": 0, "existing": 0, "expired": 0}
+    async for batch in _scan_batches(source, f"{prefix}*", args.batch_size):
+        legacy = [key for key in batch if b"{" not in key]
+        if not legacy:
+            continue
+
+        pipe = source.pipeline(transaction=False)
+        for key in legacy:
+            pipe.dump(key)
+            pipe.pttl(key)
+        replies = await pipe.execute()
+
+        migrated = []
+        for i, key in enumerate(legacy):
+            payload, ttl_ms = replies[2 * i], replies[2 * i + 1]
+            if payload is None or ttl_ms == -2:
+                stats["expired"] += 1
+                continue
+            new_key = keys.migrate_legacy(key.decode("utf-8"))
+            if args.dry_run:
+                stats["copied"] += 1
+                continue
+            try:
+                # TTL 0 = sem expiração
+                await target.restore(new_key, max(ttl_ms, 0), payload)
+                stats["copied"] += 1
+            except ResponseError as e:
+                if "BUSYKEY" not in str(e):
+                    raise
+                stats["existing"] += 1
+            migrated.append(key)
+
+        if migrated and not args.keep_source:
+            await source.delete(*migrated)
+        if args.throttle:
+            await asyncio.sleep(args.throttle)
+    return stats
+
+async def _scan_batches(client, pattern: str, count: int):
+    cursor = 0
+    while True:
+        cursor, batch = await client.scan(cursor=cursor, match=pattern, count=count)
+        if batch:
+            yield batch
+        if cursor == 0:
+            return
+
+async def main(args):
+    source = redis.from_url(args.source or settings.REDIS_CONNECTION_URL)
+    target = create_redis_client(decode_responses=False)
+    started = time.perf_counter()
+    try:
+        await source.ping()
+        await target.ping()
+        for prefix in keys.LEGACY_PREFIXES:
+            stats = await migrate_prefix(source, target, prefix, args)
+            logger.info(
+                f"📦 {prefix}* -> {stats['copied']} migradas, "
+                f"{stats['existing']} já existiam, {stats['expired']} expiradas"
+            )
+        verb = "simulada" if args.dry_run else "concluída"
+        logger.info(f"✅ Migração {verb} em {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        logger.error(f"❌ Erro na migração de chaves: {e}")
+        raise
+    finally:
+        await source.close()
+        await target.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migração das chaves Redis para o formato com hash tag")
+    parser.add_argument("--source", help="URL do Redis de origem (padrão: REDIS_CONNECTION_URL)")
+    parser.add_argument("--batch-size", type=int, default=500, help="COUNT de cada SCAN")
+    parser.add_argument("--throttle", type=float, default=0.0, help="Pausa entre lotes (segundos)")
+    parser.add_argument("--keep-source", action="store_true", help="Não remove as chaves antigas")
+    parser.add_argument("--dry-run", action="store_true")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -1,20 +1,26 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index, ForeignKey
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, DateTime, Index, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
+from sharding import shard_router, install_id_encoding
+from services.breached_passwords import breached_password_checker
 from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator
 from datetime import datetime
 import re
-from typing import Optional, List
+from typing import Annotated, Optional, List
 
 # ========== SQLAlchemy Models ==========
 
+# Ids de usuário em 64 bits: com sharding cada id carrega o slot (passo de SLOT_COUNT).
+# No SQLite (ENVIRONMENT=inmemory) só INTEGER PRIMARY KEY é autoincrement.
+UserId = BigInteger().with_variant(Integer, "sqlite")
+
 class User(Base):
     """Modelo SQLAlchemy - tabela users"""
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
-    email = Column(String(255), unique=True, nullable=False, index=True)
+    id = Column(UserId, primary_key=True, autoincrement=True)
+    email = Column(String(255), unique=True, nullable=False)  # O índice único atende as buscas por email
     full_name = Column(String(255), nullable=True)
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
@@ -22,7 +28,11 @@ class User(Base):
     
     # ✅ NOVO: Campo para verificação de email
     email_verified = Column(Boolean, default=False, nullable=False)
-    
+    # Origem da conta: "register" (cadastro pelo site) ou "import" (import_users.py).
+    # NULL nas contas anteriores à coluna. Bancos existentes:
+    #   ALTER TABLE users ADD COLUMN signup_source VARCHAR(16) NULL;
+    signup_source = Column(String(16), nullable=True)
+
     # 2FA fields
     tfa_enabled = Column(Boolean, default=False, nullable=False)
     tfa_secret = Column(String(255), nullable=True)
@@ -35,32 +45,39 @@ class User(Base):
     tfa_codes = relationship("TFABackupCode", back_populates="user", cascade="all, delete-orphan")
     tfa_attempts = relationship("TFAAttempt", back_populates="user", cascade="all, delete-orphan")
     
+    # Índices conferidos contra as consultas por migrate_indexes.py (QUERY_PATTERNS)
     __table_args__ = (
-        Index('idx_users_email_active', 'email', 'is_active'),
         Index('idx_users_created', 'created_at'),
-        Index('idx_users_email_verified', 'email_verified'),  # ✅ NOVO índice
     )
     
     def __repr__(self):
         return f"<User {self.email}>"
 
+# Com sharding, o id de cada novo usuário codifica o slot do seu email
+if shard_router is not None:
+    install_id_encoding(User)
+
 class TFABackupCode(Base):
     __tablename__ = "tfa_backup_codes"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(UserId, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     code = Column(String(10), nullable=False)
     used = Column(Boolean, default=False)
     used_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="tfa_codes")
+    
+    __table_args__ = (
+        Index('idx_backup_codes_user_created', 'user_id', 'created_at'),  # Também cobre a FK
+    )
 
 class TFAAttempt(Base):
     __tablename__ = "tfa_attempts"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(UserId, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     code_entered = Column(String(10), nullable=True)
     success = Column(Boolean, nullable=True)
     ip_address = Column(String(45), nullable=True)
@@ -120,6 +137,8 @@ class RegisterRequest(BaseModel):
             raise ValueError('Senha deve conter pelo menos um número')
         if not re.search(r'[!@#$%^&*(),.?":{}|<>]', v):
             raise ValueError('Senha deve conter pelo menos um caractere especial')
+        if breached_password_checker.is_breached(v):
+            raise ValueError('Esta senha aparece em vazamentos de dados conhecidos. Escolha outra senha')
         return v
 
 class VerifyEmailRequest(BaseModel):
@@ -158,4 +177,10 @@ class TFALoginResponse(BaseModel):
 class TFACompleteLoginRequest(BaseModel):
     """Requisição para completar login 2FA"""
     tfa_token: str
-    code: str = Field(..., min_length=6, max_length=6)
\ No newline at end of file
+    code: str = Field(..., min_length=6, max_length=6)
+
+# ========== Introspecção (serviços internos) ==========
+
+class IntrospectRequest(BaseModel):
+    """Lote de tokens de sessão a validar (limite em INTROSPECTION_MAX_BATCH)"""
+    tokens: List[Annotated[str, Field(max_length=4096)]] = Field(..., min_length=1)
\ No newline at end of file
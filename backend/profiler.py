@@ -0,0 +1,170 @@
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Tuple
+from config import get_settings
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_PROFILE_KEY = hashlib.sha256(b"profile:" + settings.SECRET_KEY.encode("utf-8")).digest()
+
+def sign_profile_header(ttl_seconds: int = 300) -> str:
+    """Gera o valor do header de profiling assinado (válido por ttl_seconds)"""
+    expires = str(int(time.time()) + ttl_seconds)
+    signature = hmac.new(_PROFILE_KEY, expires.encode("ascii"), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+def verify_profile_header(value: str) -> bool:
+    """Valida assinatura e expiração do header de profiling"""
+    expires, sep, signature = value.partition(".")
+    if not sep or not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(_PROFILE_KEY, expires.encode("ascii"), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+class RequestSampler:
+    """
+    Amostra periodicamente a pilha de uma única requisição, incluindo o tempo em await.
+    - Se a corrotina da requisição está executando na thread do event loop, registra a
+      pilha real a partir da corrotina raiz (tempo de CPU).
+    - Se está suspensa, percorre a cadeia cr_await e registra onde ela está aguardando.
+    """
+
+    def __init__(self, coro, loop_thread_id: int, interval: float):
+        self.coro = coro
+        self.root_frame = coro.cr_frame
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.duration = time.perf_counter() - self.started
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            stack = self._sample()
+            if stack:
+                self.samples[stack] += 1
+
+    def _sample(self) -> Optional[Tuple[str, ...]]:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        running: List[str] = []
+        while frame is not None:
+            running.append(_frame_label(frame))
+            if frame is self.root_frame:
+                return tuple(reversed(running))
+            frame = frame.f_back
+
+        # Corrotina suspensa: segue a cadeia de awaits
+        awaiting: List[str] = []
+        current = self.coro
+        while current is not None:
+            frame = getattr(current, "cr_frame", None) or getattr(current, "gi_frame", None)
+            if frame is None:
+                awaiting.append(f"[await {type(current).__name__}]")
+                break
+            awaiting.append(_frame_label(frame))
+            current = getattr(current, "cr_await", None) or getattr(current, "gi_yieldfrom", None)
+        else:
+            awaiting.append("[await]")
+        return tuple(awaiting) if awaiting else None
+
+class RequestProfiler:
+    """Decide quais requisições perfilar (amostragem, header assinado, limite de rajada) e grava os perfis"""
+
+    def __init__(self):
+        self.output_dir = Path(settings.PROFILER_OUTPUT_DIR)
+        self._tokens = float(settings.PROFILER_MAX_PER_MINUTE)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Limite de perfis por minuto (token bucket)"""
+        with self._lock:
+            now = time.monotonic()
+            rate = settings.PROFILER_MAX_PER_MINUTE / 60.0
+            self._tokens = min(settings.PROFILER_MAX_PER_MINUTE, self._tokens + (now - self._last_refill) * rate)
+            self._last_refill = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def write(self, sampler: RequestSampler, method: str, path: str) -> Optional[Path]:
+        """Grava o perfil em collapsed stack ou speedscope"""
+        if not sampler.samples:
+            return None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        safe_path = path.strip("/").replace("/", "_") or "root"
+        base = f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{safe_path}-{os.getpid()}"
+
+        if settings.PROFILER_FORMAT == "collapsed":
+            target = self.output_dir / f"{base}.collapsed"
+            with open(target, "w", encoding="utf-8") as f:
+                for stack, count in sampler.samples.most_common():
+                    f.write(f"{';'.join(stack)} {count}\n")
+            return target
+
+        frames: List[dict] = []
+        index = {}
+        samples = []
+        weights = []
+        interval_ms = sampler.interval * 1000
+        for stack, count in sampler.samples.items():
+            ids = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                ids.append(index[label])
+            samples.append(ids)
+            weights.append(count * interval_ms)
+
+        target = self.output_dir / f"{base}.speedscope.json"
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump({
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": f"{method} {path}",
+                "exporter": "voyeluxone-profiler",
+                "shared": {"frames": frames},
+                "profiles": [{
+                    "type": "sampled",
+                    "name": f"{method} {path}",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }],
+            }, f)
+        return target
+
+# Instância global
+request_profiler = RequestProfiler()
+
+if __name__ == "__main__":
+    # Gera um header assinado: python profiler.py [ttl_segundos]
+    ttl = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print(f"{settings.PROFILER_HEADER}: {sign_profile_header(ttl)}")
@@ -0,0 +1,268 @@
+"""
+Manutenção dos shards de usuários (ver sharding.py).
+
+Comandos:
+  status                      Usuários e slots por shard
+  pin                         Grava o mapa atual em SHARD_MAP_PATH (antes de adicionar shards)
+  renumber                    Dá a usuários antigos (pré-sharding) um id no slot do seu email
+  move --slots 0-63 --to shard1
+                              Copia os usuários dos slots (com 2FA) para o shard de destino,
+                              atualiza o mapa e remove da origem
+
+Fluxo para adotar sharding num banco existente:
+  0. ids de usuário em BIGINT (cada id carrega o slot, então os valores crescem rápido):
+       ALTER TABLE tfa_backup_codes MODIFY user_id BIGINT NOT NULL;
+       ALTER TABLE tfa_attempts MODIFY user_id BIGINT NOT NULL;
+       ALTER TABLE users MODIFY id BIGINT NOT NULL AUTO_INCREMENT;
+     (com FOREIGN_KEY_CHECKS = 0 durante os ALTERs)
+  1. SHARD_URLS=<banco atual>            -> renumber, pin
+  2. SHARD_URLS=<banco atual>,<novo>     -> move --slots ... --to shard1
+
+O renumber troca o id dos usuários antigos: tokens de sessão e de 2FA emitidos antes
+carregam o id antigo em `sub` e deixam de valer (login de novo). Rode-o na mesma janela
+de manutenção da adoção, antes de liberar o tráfego.
+
+O move deve rodar com as escritas pausadas (janela de manutenção): o que for gravado na
+origem depois da cópia se perde. Ao final, reinicie os workers para carregar o novo mapa.
+Pode ser executado de novo após uma falha: usuários já copiados são ignorados.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Set
+
+# Adiciona o diretório atual ao path do Python
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import select, insert, update, delete, func, text
+from database import engines, dispose_engines
+from models.user import User, TFABackupCode, TFAAttempt
+from sharding import SLOT_COUNT, shard_router, slot_for_email, slot_for_user_id
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+users = User.__table__
+CHILD_TABLES = [TFABackupCode.__table__, TFAAttempt.__table__]
+
+def parse_slots(value: str) -> List[int]:
+    """Lista de slots: "0-63,100,200-210" """
+    slots: Set[int] = set()
+    for part in value.split(","):
+        start, _, end = part.strip().partition("-")
+        first, last = int(start), int(end or start)
+        if not 0 <= first <= last < SLOT_COUNT:
+            raise argparse.ArgumentTypeError(f"Faixa de slots inválida: {part}")
+        slots.update(range(first, last + 1))
+    return sorted(slots)
+
+def slot_of_id():
+    """Expressão SQL do slot codificado no id"""
+    return func.mod(users.c.id - 1, SLOT_COUNT)
+
+async def status(args):
+    for shard_id, eng in engines.items():
+        async with eng.connect() as conn:
+            total = (await conn.execute(select(func.count()).select_from(users))).scalar()
+        slots = shard_router.slots_of(shard_id)
+        logger.info(f"📊 {shard_id}: {total} usuários, {len(slots)} slots")
+
+async def pin(args):
+    shard_router.save()
+    logger.info(f"✅ Mapa gravado em {shard_router.map_path}")
+
+async def renumber(args):
+    """
+    Usuários criados antes do sharding têm ids fora do slot do email. Cada um recebe um
+    id novo acima do maior existente (id ≡ slot + 1), com as tabelas filhas atualizadas.
+    Tokens emitidos com o id antigo deixam de valer (o usuário faz login de novo).
+    Requer MySQL 8.0+ (o AUTO_INCREMENT acompanha ids alterados por UPDATE).
+    """
+    for shard_id, eng in engines.items():
+        async with eng.connect() as conn:
+            max_id = (await conn.execute(select(func.max(users.c.id)))).scalar() or 0
+        first_base = (max_id // SLOT_COUNT + 1) * SLOT_COUNT
+        # Próxima base livre de cada slot: cada usuário renumerado consome um único id
+        next_base: Dict[int, int] = defaultdict(lambda: first_base)
+        last_id = 0
+        renumbered = 0
+
+        while True:
+            async with eng.connect() as conn:
+                rows = (await conn.execute(
+                    select(users.c.id, users.c.email)
+                    .where(users.c.id > last_id, users.c.id <= max_id)
+                    .order_by(users.c.id)
+                    .limit(args.batch_size)
+                )).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            changes = []
+            for row in rows:
+                slot = slot_for_email(row.email)
+                if slot_for_user_id(row.id) != slot:
+                    changes.append((row.id, next_base[slot] + slot + 1))
+                    next_base[slot] += SLOT_COUNT
+            if not changes or args.dry_run:
+                renumbered += len(changes)
+                continue
+
+            async with eng.begin() as conn:
+                await conn.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+                try:
+                    for old_id, new_id in changes:
+                        for table in CHILD_TABLES:
+                            await conn.execute(
+                                update(table).where(table.c.user_id == old_id).values(user_id=new_id)
+                            )
+                        await conn.execute(update(users).where(users.c.id == old_id).values(id=new_id))
+                finally:
+                    await conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+            renumbered += len(changes)
+
+        verb = "seriam renumerados" if args.dry_run else "renumerados"
+        logger.info(f"✅ {shard_id}: {renumbered} usuários {verb}")
+        if renumbered and not args.dry_run:
+            logger.warning(f"⚠️ {shard_id}: sessões dos {renumbered} usuários renumerados foram invalidadas")
+
+async def _copy_page(source, target, user_rows) -> int:
+    """Copia usuários (ids preservados) e suas linhas filhas; ignora os que já existem no destino"""
+    ids = [row["id"] for row in user_rows]
+    async with target.connect() as conn:
+        existing = set((await conn.execute(select(users.c.id).where(users.c.id.in_(ids)))).scalars())
+    pending = [row for row in user_rows if row["id"] not in existing]
+    if not pending:
+        return 0
+
+    pending_ids = [row["id"] for row in pending]
+    children: Dict[str, List[dict]] = {}
+    async with source.connect() as conn:
+        for table in CHILD_TABLES:
+            result = await conn.execute(select(table).where(table.c.user_id.in_(pending_ids)))
+            # Ids das tabelas filhas são por shard: o destino gera novos
+            children[table.name] = [
+                {k: v for k, v in row._mapping.items() if k != "id"} for row in result
+            ]
+
+    async with target.begin() as conn:
+        await conn.execute(insert(users), pending)
+        for table in CHILD_TABLES:
+            if children[table.name]:
+                await conn.execute(insert(table), children[table.name])
+    return len(pending)
+
+async def _count_in_slots(eng, slots: List[int]) -> int:
+    async with eng.connect() as conn:
+        return (await conn.execute(
+            select(func.count()).select_from(users).where(slot_of_id().in_(slots))
+        )).scalar()
+
+async def move(args):
+    if args.to not in engines:
+        raise SystemExit(f"Shard de destino desconhecido: {args.to}")
+    if shard_router.map_path is None:
+        raise SystemExit("Defina SHARD_MAP_PATH para gravar o novo mapa")
+
+    by_source: Dict[str, List[int]] = {}
+    for slot in args.slots:
+        owner = shard_router.shard_for_slot(slot)
+        if owner != args.to:
+            by_source.setdefault(owner, []).append(slot)
+    if not by_source:
+        logger.info("Nada a mover: os slots já pertencem ao destino")
+        return
+
+    target = engines[args.to]
+    started = time.perf_counter()
+
+    # 1) Cópia (a origem continua servindo as leituras)
+    for source_id, slots in by_source.items():
+        source = engines[source_id]
+        expected = await _count_in_slots(source, slots)
+        logger.info(f"🚚 {source_id} -> {args.to}: {len(slots)} slots, {expected} usuários")
+        if args.dry_run:
+            continue
+
+        last_id = 0
+        copied = 0
+        while True:
+            async with source.connect() as conn:
+                page = [dict(row._mapping) for row in await conn.execute(
+                    select(users)
+                    .where(users.c.id > last_id, slot_of_id().in_(slots))
+                    .order_by(users.c.id)
+                    .limit(args.batch_size)
+                )]
+            if not page:
+                break
+            last_id = page[-1]["id"]
+            copied += await _copy_page(source, target, page)
+            logger.info(f"📦 {copied} usuários copiados de {source_id}")
+
+        found = await _count_in_slots(target, slots)
+        if found < expected:
+            raise SystemExit(f"❌ Cópia incompleta de {source_id}: {found}/{expected}; nada foi removido")
+
+    if args.dry_run:
+        return
+
+    # 2) Troca de dono dos slots (workers passam a usar o destino após reiniciar)
+    for slots in by_source.values():
+        for slot in slots:
+            shard_router.slot_map[slot] = args.to
+    shard_router.save()
+    logger.info(f"✅ Mapa atualizado em {shard_router.map_path}")
+
+    # 3) Remoção na origem (tabelas filhas saem por ON DELETE CASCADE)
+    for source_id, slots in by_source.items():
+        source = engines[source_id]
+        removed = 0
+        while True:
+            async with source.begin() as conn:
+                ids = (await conn.execute(
+                    select(users.c.id).where(slot_of_id().in_(slots)).limit(args.batch_size)
+                )).scalars().all()
+                if not ids:
+                    break
+                await conn.execute(delete(users).where(users.c.id.in_(ids)))
+            removed += len(ids)
+        logger.info(f"🧹 {removed} usuários removidos de {source_id}")
+
+    logger.info(f"✅ Rebalanceamento concluído em {time.perf_counter() - started:.1f}s; reinicie os workers")
+
+COMMANDS = {"status": status, "pin": pin, "renumber": renumber, "move": move}
+
+async def main(args):
+    if shard_router is None:
+        raise SystemExit("Sharding desabilitado: defina SHARD_URLS")
+    try:
+        await COMMANDS[args.command](args)
+    except Exception as e:
+        logger.error(f"❌ Erro no rebalanceamento: {e}")
+        raise
+    finally:
+        await dispose_engines()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Manutenção dos shards de usuários")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Usuários e slots por shard")
+    sub.add_parser("pin", help="Grava o mapa atual em SHARD_MAP_PATH")
+    renumber_parser = sub.add_parser("renumber", help="Ids de usuários antigos no slot do email")
+    renumber_parser.add_argument("--batch-size", type=int, default=500)
+    renumber_parser.add_argument("--dry-run", action="store_true")
+    move_parser = sub.add_parser("move", help="Move slots para outro shard")
+    move_parser.add_argument("--slots", type=parse_slots, required=True, help='Ex.: "0-63,128"')
+    move_parser.add_argument("--to", required=True, help="Shard de destino (ex.: shard1)")
+    move_parser.add_argument("--batch-size", type=int, default=500)
+    move_parser.add_argument("--dry-run", action="store_true")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -1,10 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, and_
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from models.user import User
-from auth.utils import get_password_hash, verify_password
+from auth.utils import get_password_hash_async, verify_password_async
+from services.breached_passwords import breached_password_checker
+from sharding import shard_router, slot_for_email, set_id_slot, reset_id_slot
+from itertools import groupby
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,7 +29,7 @@ class UserRepository:
         """
         try:
             # CRIPTOGRAFA a senha antes de salvar
-            hashed_password = get_password_hash(password)
+            hashed_password = await get_password_hash_async(password)
             
             user = User(
                 email=email.lower().strip(),
@@ -37,16 +41,98 @@ class UserRepository:
             await self.db.commit()
             await self.db.refresh(user)
             
-            logger.info(f"✅ Usuário criado: {email} (ID: {user.id})")
+            logger.info("✅ Usuário criado: %s (ID: %s)", email, user.id, extra={"event": "user.created"})
             return user
             
         except IntegrityError as e:
             await self.db.rollback()
             if "Duplicate entry" in str(e):
                 raise ValueError("Email já cadastrado")
-            logger.error(f"Erro ao criar usuário: {e}")
+            logger.error("Erro ao criar usuário: %s", e, extra={"event": "user.create_error"})
             raise e
     
+    async def bulk_insert_users(self, rows: List[Dict[str, Any]], on_duplicate: str = "skip") -> int:
+        """
+        Insere vários usuários em um único INSERT multi-linha.
+        As senhas já devem vir criptografadas (campo hashed_password).
+        
+        Args:
+            rows: Dicionários com email, hashed_password, full_name, email_verified, signup_source
+            on_duplicate: "skip" ignora emails existentes, "update" sobrescreve nome, senha e origem
+        
+        Returns:
+            Número de linhas afetadas
+        """
+        if not rows:
+            return 0
+        
+        if shard_router is not None:
+            affected = await self._bulk_insert_sharded(rows, on_duplicate)
+        else:
+            result = await self.db.execute(self._bulk_insert_statement(rows, on_duplicate))
+            affected = result.rowcount
+        await self.db.commit()
+        return affected
+    
+    @staticmethod
+    def _bulk_insert_statement(rows: List[Dict[str, Any]], on_duplicate: str):
+        stmt = mysql_insert(User).values(rows)
+        if on_duplicate == "update":
+            return stmt.on_duplicate_key_update(
+                full_name=stmt.inserted.full_name,
+                hashed_password=stmt.inserted.hashed_password,
+                signup_source=stmt.inserted.signup_source,
+                updated_at=datetime.now(),
+            )
+        return stmt.prefix_with("IGNORE")
+    
+    async def _bulk_insert_sharded(self, rows: List[Dict[str, Any]], on_duplicate: str) -> int:
+        """
+        Com sharding, cada INSERT precisa ir ao shard do email e gerar ids do mesmo slot:
+        agrupa as linhas por slot e emite um INSERT por grupo na conexão do shard.
+        """
+        affected = 0
+        keyed = sorted(rows, key=lambda row: slot_for_email(row["email"]))
+        for slot, group in groupby(keyed, key=lambda row: slot_for_email(row["email"])):
+            conn = await self.db.connection(
+                bind_arguments={"shard_id": shard_router.shard_for_slot(slot)}
+            )
+            await conn.run_sync(set_id_slot, slot)
+            try:
+                result = await conn.execute(self._bulk_insert_statement(list(group), on_duplicate))
+            finally:
+                # Os próximos INSERTs da conexão (outros slots, tabelas filhas) voltam ao padrão
+                await conn.run_sync(reset_id_slot)
+            affected += result.rowcount
+        return affected
+    
+    async def get_users_page(
+        self,
+        after_id: int,
+        limit: int,
+        columns: List[str],
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        email_verified: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Página de usuários ordenada por id (paginação por chave: id > after_id).
+        Retorna apenas as colunas pedidas; o id é sempre incluído para continuar a paginação.
+        """
+        selected = [User.id] + [getattr(User, c) for c in columns if c != "id"]
+        conditions = [User.id > after_id]
+        if created_from is not None:
+            conditions.append(User.created_at >= created_from)
+        if created_to is not None:
+            conditions.append(User.created_at < created_to)
+        if email_verified is not None:
+            conditions.append(User.email_verified == email_verified)
+        
+        result = await self.db.execute(
+            select(*selected).where(and_(*conditions)).order_by(User.id).limit(limit)
+        )
+        return [dict(row._mapping) for row in result]
+    
     async def get_user_by_email(self, email: str) -> Optional[User]:
         """Busca usuário por email"""
         result = await self.db.execute(
@@ -71,6 +157,25 @@ class UserRepository:
         )
         return result.scalar_one_or_none()
     
+    async def get_users_by_ids(self, user_ids: Iterable[int]) -> Dict[int, User]:
+        """
+        Busca vários usuários ativos por ID em uma única consulta (IN).
+        Com sharding, o IN vai só aos shards dos ids pedidos.
+        IDs inexistentes ou inativos ficam de fora do resultado.
+        """
+        ids = set(user_ids)
+        if not ids:
+            return {}
+        result = await self.db.execute(
+            select(User).where(
+                and_(
+                    User.id.in_(ids),
+                    User.is_active == True
+                )
+            )
+        )
+        return {user.id: user for user in result.scalars()}
+    
     async def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """
         Autentica usuário.
@@ -79,26 +184,28 @@ class UserRepository:
         user = await self.get_user_by_email(email)
         
         if not user:
-            logger.warning(f"Tentativa de login com email inexistente: {email}")
+            logger.warning("Tentativa de login com email inexistente: %s", email, extra={"event": "auth.login_unknown_email"})
             return None
         
         # VERIFICA se a senha corresponde ao HASH
-        if not verify_password(password, user.hashed_password):  # ✅ CORRETO: hashed_password
-            logger.warning(f"Senha incorreta para: {email}")
+        if not await verify_password_async(password, user.hashed_password):  # ✅ CORRETO: hashed_password
+            logger.warning("Senha incorreta para: %s", email, extra={"event": "auth.login_failed"})
             return None
         
         # Atualiza último login
         user.last_login = datetime.now()
         await self.db.commit()
         
-        logger.info(f"✅ Login bem-sucedido: {email}")
+        logger.info("✅ Login bem-sucedido: %s", email, extra={"event": "auth.login_success"})
         return user
     
     async def update_user(self, user_id: int, data: Dict[str, Any]) -> Optional[User]:
         """Atualiza dados do usuário"""
         if "password" in data:
+            if breached_password_checker.is_breached(data["password"]):
+                raise ValueError("Esta senha aparece em vazamentos de dados conhecidos")
             # CRIPTOGRAFA nova senha
-            hashed = get_password_hash(data["password"])
+            hashed = await get_password_hash_async(data["password"])
             data["hashed_password"] = hashed
             del data["password"]
         
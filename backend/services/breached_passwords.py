@@ -0,0 +1,117 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+from typing import Optional
+from config import get_settings
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Cabeçalho do arquivo: magic, número de bits (m), número de hashes (k)
+MAGIC = b"VYBLOOM1"
+HEADER = struct.Struct("<8sQI")
+
+def password_digest(password: str) -> bytes:
+    """SHA-1 da senha (mesmo formato das listas públicas de senhas vazadas)"""
+    return hashlib.sha1(password.encode("utf-8")).digest()
+
+def bloom_positions(digest: bytes, num_bits: int, num_hashes: int):
+    """Posições dos bits via double hashing sobre o SHA-1"""
+    h1 = int.from_bytes(digest[0:8], "little")
+    h2 = int.from_bytes(digest[8:16], "little") | 1
+    for i in range(num_hashes):
+        yield (h1 + i * h2) % num_bits
+
+def optimal_parameters(expected_items: int, false_positive_rate: float):
+    """Calcula m (bits) e k (hashes) ótimos para n itens e taxa de falso positivo p"""
+    if not 0 < false_positive_rate < 1:
+        raise ValueError("A taxa de falso positivo deve estar entre 0 e 1")
+    # Lista vazia: filtro mínimo (nenhuma senha marcada) em vez de divisão por zero
+    expected_items = max(1, expected_items)
+    num_bits = max(8, int(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2)))
+    num_hashes = max(1, round(num_bits / expected_items * math.log(2)))
+    return num_bits, num_hashes
+
+class BloomFilterWriter:
+    """Cria o filtro de Bloom diretamente em um arquivo mapeado em memória"""
+
+    def __init__(self, path: str, expected_items: int, false_positive_rate: float):
+        self.num_bits, self.num_hashes = optimal_parameters(expected_items, false_positive_rate)
+        self.path = path
+        size = HEADER.size + (self.num_bits + 7) // 8
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.num_bits, self.num_hashes))
+            f.truncate(size)
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+
+    def add_digest(self, digest: bytes) -> None:
+        mm = self._mm
+        for pos in bloom_positions(digest, self.num_bits, self.num_hashes):
+            offset = HEADER.size + (pos >> 3)
+            mm[offset] = mm[offset] | (1 << (pos & 7))
+
+    def close(self) -> None:
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+class BreachedPasswordChecker:
+    """
+    Verifica senhas contra um filtro de Bloom de senhas vazadas.
+    O arquivo é mapeado em memória (somente leitura), então os workers
+    compartilham as mesmas páginas do cache do sistema operacional.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._num_bits = 0
+        self._num_hashes = 0
+        self._loaded = False
+
+    def _load(self) -> None:
+        self._loaded = True
+        if not self.path:
+            return
+        mm = None
+        try:
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, num_bits, num_hashes = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                raise ValueError("arquivo não é um filtro de Bloom válido")
+            if not num_bits or not num_hashes or len(mm) < HEADER.size + (num_bits + 7) // 8:
+                raise ValueError("filtro de Bloom truncado ou com parâmetros inválidos")
+            self._mm, self._num_bits, self._num_hashes = mm, num_bits, num_hashes
+            logger.info(
+                "✅ Filtro de senhas vazadas carregado: %s (%d KB, k=%d)",
+                self.path, os.path.getsize(self.path) // 1024, num_hashes,
+            )
+        except Exception as e:
+            logger.error("❌ Erro ao carregar filtro de senhas vazadas: %s", e)
+            if mm is not None:
+                mm.close()
+            self._mm = None
+
+    @property
+    def enabled(self) -> bool:
+        if not self._loaded:
+            self._load()
+        return self._mm is not None
+
+    def is_breached(self, password: str) -> bool:
+        """Retorna True se a senha (provavelmente) consta em vazamentos conhecidos"""
+        if not self.enabled:
+            return False
+        mm = self._mm
+        for pos in bloom_positions(password_digest(password), self._num_bits, self._num_hashes):
+            if not mm[HEADER.size + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+# Instância global
+breached_password_checker = BreachedPasswordChecker(settings.BREACHED_PASSWORDS_FILTER_PATH)
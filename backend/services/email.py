@@ -1,17 +1,15 @@
 # services/email.py
-import resend
 import secrets
 import string
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from config import get_settings
+from services.resend_client import resend_client
+from deadline import DeadlineExceeded
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Configurar API key
-resend.api_key = settings.RESEND_API_KEY
-
 class EmailService:
     """Serviço de email usando Resend"""
     
@@ -87,12 +85,14 @@ class EmailService:
                 """,
             }
             
-            email_response = resend.Emails.send(params)
-            logger.info(f"✅ Email 2FA enviado para {email}: {email_response['id']}")
+            email_response = await resend_client.send(params)
+            logger.info("✅ Email 2FA enviado para %s: %s", email, email_response["id"], extra={"event": "email.tfa_sent"})
             return True
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"❌ Erro ao enviar email 2FA: {e}")
+            logger.error("❌ Erro ao enviar email 2FA: %s", e, extra={"event": "email.error"})
             return False
     
     @staticmethod
@@ -168,12 +168,14 @@ class EmailService:
                 """,
             }
             
-            email_response = resend.Emails.send(params)
-            logger.info(f"✅ Códigos de backup enviados para {email}")
+            email_response = await resend_client.send(params)
+            logger.info("✅ Códigos de backup enviados para %s", email, extra={"event": "email.backup_codes_sent"})
             return True
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"❌ Erro ao enviar códigos de backup: {e}")
+            logger.error("❌ Erro ao enviar códigos de backup: %s", e, extra={"event": "email.error"})
             return False
     
     @staticmethod
@@ -248,12 +250,33 @@ class EmailService:
                 """,
             }
             
-            email_response = resend.Emails.send(params)
-            logger.info(f"✅ Email de verificação enviado para {email}: {email_response['id']}")
+            email_response = await resend_client.send(params)
+            logger.info("✅ Email de verificação enviado para %s: %s", email, email_response["id"], extra={"event": "email.verification_sent"})
+            return True
+            
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error("❌ Erro ao enviar email de verificação: %s", e, extra={"event": "email.error"})
+            return False
+    
+    @staticmethod
+    async def send_batch(messages: List[Dict[str, Any]]) -> bool:
+        """
+        Envia vários emails de uma vez (API de batch do Resend)
+        
+        Args:
+            messages: Lista de parâmetros no mesmo formato de um envio individual
+        """
+        try:
+            results = await resend_client.send_batch(messages)
+            logger.info("✅ Lote de %d emails enviado", len(results), extra={"event": "email.batch_sent"})
             return True
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"❌ Erro ao enviar email de verificação: {e}")
+            logger.error("❌ Erro ao enviar lote de emails: %s", e, extra={"event": "email.error"})
             return False
     
     @staticmethod
@@ -0,0 +1,152 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+from config import get_settings
+from services.email import EmailService
+from services.redis import redis_service
+from services import keys
+from services.metrics import metrics
+from services.memory_redis import python_script
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# KEYS[1] = chave do código, KEYS[2] = chave de cooldown
+# ARGV[1] = código novo, ARGV[2] = TTL do código, ARGV[3] = cooldown
+# Retorna {deve_enviar, código}: reaproveita o código ainda válido e só
+# permite reenviá-lo depois do cooldown; código novo é sempre enviado.
+CODE_DISPATCH_SCRIPT = """
+local code = redis.call('GET', KEYS[1])
+if code then
+    if redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[3]) then
+        return {1, code}
+    end
+    return {0, code}
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('SET', KEYS[2], '1', 'EX', ARGV[3])
+return {1, ARGV[1]}
+"""
+
+@python_script(CODE_DISPATCH_SCRIPT)
+def _code_dispatch(client, keys, args):
+    """Equivalente do script para o Redis em memória (ENVIRONMENT=inmemory)"""
+    code = client._get(keys[0])
+    if code is not None:
+        return [1 if client._set(keys[1], "1", ex=args[2], nx=True) else 0, code]
+    client._set(keys[0], args[0], ex=args[1])
+    client._set(keys[1], "1", ex=args[2])
+    return [1, args[0]]
+
+@dataclass
+class DispatchResult:
+    code: str
+    sent: bool
+
+class EmailDispatcher:
+    """
+    Camada de envio de códigos na frente do EmailService.
+    - Envios simultâneos para o mesmo (destinatário, template) são unificados
+    - Cooldown por destinatário aplicado em uma única operação no Redis (chaves no mesmo slot)
+    - Se ainda existe um código válido, ele é reaproveitado em vez de gerar outro
+    """
+
+    SENDERS = {
+        "verification": EmailService.send_verification_code,
+        "tfa": EmailService.send_tfa_code,
+    }
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    async def send_code(
+        self,
+        template: str,
+        recipient: str,
+        code_key: str,
+        code_ttl: timedelta,
+        user_name: Optional[str] = None,
+    ) -> DispatchResult:
+        """
+        Garante que existe um código válido em `code_key` e o envia respeitando o cooldown.
+
+        Args:
+            template: "verification" ou "tfa"
+            recipient: Email do destinatário
+            code_key: Chave Redis onde o código fica armazenado
+            code_ttl: Validade do código
+            user_name: Nome do usuário (opcional)
+        """
+        flight_key = (template, recipient.lower())
+        while True:
+            in_flight = self._in_flight.get(flight_key)
+            if in_flight is None:
+                break
+            metrics.increment("email_dispatch_total", template=template, outcome="coalesced")
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise  # Esta requisição foi cancelada
+                # O envio compartilhado foi cancelado (ex: cliente de quem o iniciou
+                # desconectou): tenta de novo, possivelmente assumindo o envio
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[flight_key] = future
+        try:
+            result = await self._dispatch(template, recipient, code_key, code_ttl, user_name)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Evita "exception was never retrieved" quando ninguém aguardava
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[flight_key]
+            if not future.done():
+                # Cancelado (CancelledError não passa pelo except): libera quem aguardava
+                future.cancel()
+
+    async def _dispatch(
+        self,
+        template: str,
+        recipient: str,
+        code_key: str,
+        code_ttl: timedelta,
+        user_name: Optional[str],
+    ) -> DispatchResult:
+        new_code = EmailService.generate_verification_code()
+        cooldown_key = keys.email_cooldown(template, code_key)
+
+        reply = await redis_service.run_script(
+            CODE_DISPATCH_SCRIPT,
+            [code_key, cooldown_key],
+            [new_code, int(code_ttl.total_seconds()), settings.EMAIL_COOLDOWN_SECONDS],
+        )
+
+        if reply is None:
+            # Redis indisponível: mantém o comportamento anterior (código novo e envio)
+            should_send, code = True, new_code
+            await redis_service.set(code_key, code, expire=code_ttl)
+        else:
+            should_send, code = bool(int(reply[0])), reply[1]
+
+        if not should_send:
+            metrics.increment("email_dispatch_total", template=template, outcome="cooldown")
+            return DispatchResult(code=code, sent=False)
+
+        sent = False
+        try:
+            sent = await self.SENDERS[template](recipient, code, user_name)
+        finally:
+            if not sent:
+                # Envio falhou: libera o cooldown para que o usuário possa pedir de novo
+                await redis_service.delete(cooldown_key)
+        metrics.increment("email_dispatch_total", template=template, outcome="sent" if sent else "failed")
+        return DispatchResult(code=code, sent=sent)
+
+# Instância global
+email_dispatcher = EmailDispatcher()
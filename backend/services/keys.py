@@ -0,0 +1,122 @@
+"""
+Nomes das chaves Redis.
+
+O identificador (email, id do usuário, IP, sessão) vai entre chaves: `tfa:code:{42}`.
+Em Redis Cluster só o trecho entre {…} decide o slot, então todas as chaves de um mesmo
+usuário/email caem no mesmo nó e podem ser usadas juntas em scripts Lua e pipelines.
+Toda chave nova deve ser criada aqui (nunca com f-string solta no código).
+"""
+from typing import Union
+
+Ident = Union[int, str]
+
+def tag(value: Ident) -> str:
+    """Hash tag do identificador"""
+    return "{" + str(value) + "}"
+
+def email_tag(email: str) -> str:
+    return tag(email.strip().lower())
+
+def hash_tag(key: str) -> str:
+    """Hash tag presente em uma chave (ou a própria chave, se não houver)"""
+    start = key.find("{")
+    end = key.find("}", start + 1)
+    if start == -1 or end == -1:
+        return tag(key)
+    return key[start:end + 1]
+
+# ===== REGISTRO (por email / por IP) =====
+
+def register_pending(email: str) -> str:
+    return f"register:pending:{email_tag(email)}"
+
+def register_code(email: str) -> str:
+    return f"register:code:{email_tag(email)}"
+
+def register_verify(ip: str) -> str:
+    return f"register:verify:{tag(ip)}"
+
+def register_resend(ip: str) -> str:
+    return f"register:resend:{tag(ip)}"
+
+# ===== RATE LIMIT POR IP =====
+
+def ip_rate_limit(action: str, level: str, root_network: str, network: str) -> str:
+    """
+    Contador de `action` no nível `level` (ip, ipv4_24, ipv6_64, ipv6_48).
+    A hash tag é a rede mais larga do IP: todos os níveis ficam no mesmo slot.
+    """
+    return f"ratelimit:{action}:{level}:{tag(root_network)}:{network}"
+
+# ===== 2FA (por usuário) =====
+
+def tfa_code(user_id: Ident) -> str:
+    return f"tfa:code:{tag(user_id)}"
+
+def tfa_attempts(user_id: Ident) -> str:
+    return f"tfa:attempts:{tag(user_id)}"
+
+def tfa_block(user_id: Ident) -> str:
+    return f"tfa:block:{tag(user_id)}"
+
+def tfa_setup(user_id: Ident) -> str:
+    return f"tfa:setup:{tag(user_id)}"
+
+def tfa_session(session_id: str) -> str:
+    return f"tfa:session:{tag(session_id)}"
+
+# ===== EMAIL =====
+
+def email_cooldown(template: str, code_key: str) -> str:
+    """Cooldown de envio no mesmo slot da chave do código (usadas juntas no script do dispatcher)"""
+    return f"email:cooldown:{template}:{hash_tag(code_key)}"
+
+# ===== IDEMPOTÊNCIA =====
+
+def idempotency(scope_hash: str) -> str:
+    """Resposta guardada de uma Idempotency-Key (hash de rota + sessão + chave)"""
+    return f"idempotency:{tag(scope_hash)}"
+
+# ===== SCHEDULER =====
+
+SCHEDULER_LEADER = "scheduler:leader"
+
+# Prefixos que existiam sem hash tag (`<prefixo><identificador>`), usados por migrate_redis_keys.py.
+# Os contadores antigos de login/registro por IP (`login:attempts:`, `register:attempt:`)
+# não são migrados: foram substituídos por `ratelimit:` e expiram sozinhos em até 1 hora.
+LEGACY_PREFIXES = (
+    "register:pending:",
+    "register:code:",
+    "register:verify:",
+    "register:resend:",
+    "tfa:code:",
+    "tfa:attempts:",
+    "tfa:block:",
+    "tfa:setup:",
+    "tfa:session:",
+)
+
+def key_group(key: str) -> str:
+    """
+    Grupo de uma chave para relatórios: o trecho antes da hash tag
+    (`tfa:code:{42}` -> `tfa:code:`); chaves fixas (scheduler) são o próprio grupo.
+    """
+    start = key.find("{")
+    if start != -1:
+        return key[:start]
+    if key == SCHEDULER_LEADER:
+        return key
+    for prefix in LEGACY_PREFIXES:
+        if key.startswith(prefix):
+            return prefix + "(antigo)"
+    return "(outros)"
+
+def migrate_legacy(key: str) -> str:
+    """Nome novo de uma chave antiga (`tfa:code:42` -> `tfa:code:{42}`)"""
+    for prefix in LEGACY_PREFIXES:
+        if key.startswith(prefix):
+            ident = key[len(prefix):]
+            if prefix in ("register:pending:", "register:code:"):
+                return prefix + email_tag(ident)
+            return prefix + tag(ident)
+    raise ValueError(f"Chave sem formato conhecido: {key}")
@@ -0,0 +1,207 @@
+"""
+Redis em processo para ENVIRONMENT=inmemory (laptop, CI, benchmarks).
+
+Implementa o subconjunto de comandos usado pelo RedisService e pelos scripts de
+manutenção, com TTL, INCR, EXPIRE, pipelines e scripts. Lua não é interpretado: cada
+script usado pela aplicação registra seu equivalente em Python com @python_script,
+ao lado do próprio Lua.
+"""
+import fnmatch
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Texto do script Lua -> função equivalente (client, keys, args)
+_PY_SCRIPTS: Dict[str, Callable] = {}
+
+def python_script(lua: str):
+    """Registra a implementação Python de um script Lua"""
+    def register(fn: Callable) -> Callable:
+        _PY_SCRIPTS[lua] = fn
+        return fn
+    return register
+
+class InMemoryScript:
+    """Equivalente ao objeto de register_script do redis-py"""
+
+    def __init__(self, client: "InMemoryRedis", lua: str):
+        if lua not in _PY_SCRIPTS:
+            raise NotImplementedError("Script Lua sem equivalente Python registrado (@python_script)")
+        self.client = client
+        self.fn = _PY_SCRIPTS[lua]
+
+    async def __call__(self, keys: List[str] = (), args: List[Any] = ()):
+        return self.fn(self.client, list(keys), [str(a) for a in args])
+
+class InMemoryPipeline:
+    """Acumula comandos e executa em sequência (sem intercalação com outras tarefas)"""
+
+    def __init__(self, client: "InMemoryRedis"):
+        self.client = client
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        if not hasattr(InMemoryRedis, "_" + name):
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        return [getattr(self.client, "_" + name)(*args, **kwargs) for name, args, kwargs in commands]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._commands = []
+
+class InMemoryRedis:
+    """
+    Cliente assíncrono compatível (decode_responses=True) com dados num dicionário.
+    Expiração preguiçosa: a chave vencida some no próximo acesso.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, str] = {}
+        self._expires: Dict[str, float] = {}
+
+    # ----- Internos (síncronos; usados também por pipelines e scripts) -----
+
+    def _alive(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def _get(self, key: str) -> Optional[str]:
+        return self._data[key] if self._alive(key) else None
+
+    def _set(self, key: str, value: Any, ex: Optional[int] = None, px: Optional[int] = None,
+             nx: bool = False, xx: bool = False, keepttl: bool = False) -> Optional[bool]:
+        exists = self._alive(key)
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._data[key] = value if isinstance(value, str) else str(value)
+        if ex is not None:
+            self._expires[key] = time.monotonic() + int(ex)
+        elif px is not None:
+            self._expires[key] = time.monotonic() + int(px) / 1000
+        elif not keepttl:
+            self._expires.pop(key, None)
+        return True
+
+    def _setex(self, key: str, seconds: int, value: Any) -> bool:
+        return self._set(key, value, ex=seconds)
+
+    def _delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                del self._data[key]
+                self._expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def _exists(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._alive(key))
+
+    def _incr(self, key: str, amount: int = 1) -> int:
+        value = int(self._get(key) or 0) + amount
+        self._data[key] = str(value)
+        return value
+
+    def _incrby(self, key: str, amount: int) -> int:
+        return self._incr(key, amount)
+
+    def _expire(self, key: str, seconds: int, nx: bool = False) -> bool:
+        if not self._alive(key) or (nx and key in self._expires):
+            return False
+        self._expires[key] = time.monotonic() + int(seconds)
+        return True
+
+    def _ttl(self, key: str) -> int:
+        if not self._alive(key):
+            return -2
+        expires = self._expires.get(key)
+        return -1 if expires is None else max(0, int(round(expires - time.monotonic())))
+
+    def _pttl(self, key: str) -> int:
+        if not self._alive(key):
+            return -2
+        expires = self._expires.get(key)
+        return -1 if expires is None else max(0, int((expires - time.monotonic()) * 1000))
+
+    def _mget(self, *keys: str) -> List[Optional[str]]:
+        return [self._get(key) for key in keys]
+
+    def _keys(self, pattern: str = "*") -> List[str]:
+        return [key for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    # ----- API assíncrona (mesmos nomes do redis-py) -----
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        return None
+
+    async def aclose(self) -> None:
+        return None
+
+    async def flushdb(self) -> bool:
+        self._data.clear()
+        self._expires.clear()
+        return True
+
+    async def get(self, key: str):
+        return self._get(key)
+
+    async def set(self, key: str, value: Any, **kwargs):
+        return self._set(key, value, **kwargs)
+
+    async def setex(self, key: str, seconds: int, value: Any):
+        return self._setex(key, seconds, value)
+
+    async def delete(self, *keys: str) -> int:
+        return self._delete(*keys)
+
+    async def exists(self, *keys: str) -> int:
+        return self._exists(*keys)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return self._incr(key, amount)
+
+    async def incrby(self, key: str, amount: int) -> int:
+        return self._incrby(key, amount)
+
+    async def expire(self, key: str, seconds: int, nx: bool = False) -> bool:
+        return self._expire(key, seconds, nx=nx)
+
+    async def ttl(self, key: str) -> int:
+        return self._ttl(key)
+
+    async def pttl(self, key: str) -> int:
+        return self._pttl(key)
+
+    async def mget(self, *keys: str):
+        return self._mget(*keys)
+
+    async def keys(self, pattern: str = "*") -> List[str]:
+        return self._keys(pattern)
+
+    async def scan(self, cursor: int = 0, match: Optional[str] = None, count: int = 10, **kwargs):
+        """SCAN sobre um snapshot ordenado das chaves (cursor = posição)"""
+        names = sorted(self._keys(match or "*"))
+        batch = names[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(names) else 0
+        return next_cursor, batch
+
+    def pipeline(self, transaction: bool = True) -> InMemoryPipeline:
+        return InMemoryPipeline(self)
+
+    def register_script(self, lua: str) -> InMemoryScript:
+        return InMemoryScript(self, lua)
@@ -0,0 +1,76 @@
+import threading
+from typing import Dict, Tuple, Any
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas em memória (contadores, gauges e resumos).
+    Exposto em /metrics; sem dependência de coletor externo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._summaries: Dict[str, Dict[tuple, Dict[str, float]]] = {}
+        self._gauges: Dict[str, Dict[tuple, float]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Incrementa um contador"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, **labels) -> None:
+        """Define o valor atual de um gauge (ex: requisições em andamento)"""
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Registra uma observação (ex: duração em segundos)"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            summary = series.get(key)
+            if summary is None:
+                series[key] = {"count": 1, "sum": value, "min": value, "max": value}
+            else:
+                summary["count"] += 1
+                summary["sum"] += value
+                if value < summary["min"]:
+                    summary["min"] = value
+                if value > summary["max"]:
+                    summary["max"] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Retorna uma cópia das métricas atuais"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(k), "value": v} for k, v in series.items()]
+                for name, series in self._counters.items()
+            }
+            gauges = {
+                name: [{"labels": dict(k), "value": v} for k, v in series.items()]
+                for name, series in self._gauges.items()
+            }
+            summaries = {
+                name: [
+                    {
+                        "labels": dict(k),
+                        **s,
+                        "avg": s["sum"] / s["count"] if s["count"] else 0.0,
+                    }
+                    for k, s in series.items()
+                ]
+                for name, series in self._summaries.items()
+            }
+        return {"counters": counters, "gauges": gauges, "summaries": summaries}
+
+
+# Instância global
+metrics = MetricsRegistry()
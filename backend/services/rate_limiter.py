@@ -0,0 +1,177 @@
+"""
+Rate limiting por IP em níveis hierárquicos.
+
+Cada ação (login, registro) conta tentativas em vários níveis ao mesmo tempo:
+o endereço exato, a /24 (IPv4) e as /64 e /48 (IPv6), cada um com seu limite em
+IP_RATE_LIMITS. Quem troca de endereço dentro da mesma /64 continua no mesmo contador
+e não cria uma chave nova no Redis a cada tentativa.
+
+Todas as chaves de um IP usam a hash tag da rede mais larga (/24 ou /48), então ficam
+no mesmo slot e são lidas/incrementadas por um único script (uma ida ao Redis).
+"""
+import ipaddress
+from typing import Dict, List, Optional, Tuple, Union
+from fastapi import Request
+from config import get_settings
+from services.redis import redis_service
+from services.memory_redis import python_script
+from services.metrics import metrics
+from services import keys
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+# Níveis por família: (nome, prefixo); o último é a rede usada como hash tag
+IPV4_LEVELS = (("ip", 32), ("ipv4_24", 24))
+IPV6_LEVELS = (("ip", 128), ("ipv6_64", 64), ("ipv6_48", 48))
+
+# KEYS = contadores dos níveis
+# ARGV[1] = '1' incrementa / '0' apenas lê, ARGV[2] = janela (s), ARGV[3..] = limite de cada KEY
+# Retorna a posição (1..n) do primeiro nível que atingiu o limite, ou 0
+RATE_LIMIT_SCRIPT = """
+local blocked = 0
+for i, key in ipairs(KEYS) do
+    local count
+    if ARGV[1] == '1' then
+        count = redis.call('INCR', key)
+        if count == 1 then
+            redis.call('EXPIRE', key, ARGV[2])
+        end
+    else
+        count = tonumber(redis.call('GET', key) or '0')
+    end
+    if blocked == 0 and count >= tonumber(ARGV[i + 2]) then
+        blocked = i
+    end
+end
+return blocked
+"""
+
+@python_script(RATE_LIMIT_SCRIPT)
+def _rate_limit(client, keys, args):
+    """Equivalente do script para o Redis em memória (ENVIRONMENT=inmemory)"""
+    blocked = 0
+    for i, key in enumerate(keys):
+        if args[0] == "1":
+            count = client._incr(key)
+            if count == 1:
+                client._expire(key, args[1])
+        else:
+            count = int(client._get(key) or 0)
+        if blocked == 0 and count >= int(args[i + 2]):
+            blocked = i + 1
+    return blocked
+
+# ===== IP DO CLIENTE =====
+
+_trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in settings.TRUSTED_PROXIES]
+
+def _parse_ip(value: str) -> Optional[IPAddress]:
+    try:
+        address = ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+    # ::ffff:1.2.3.4 (socket dual-stack) conta como o IPv4
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+        return address.ipv4_mapped
+    return address
+
+def _is_trusted(address: IPAddress) -> bool:
+    return any(address in network for network in _trusted_proxies)
+
+def resolve_client_ip(request: Request) -> str:
+    """
+    IP real do cliente.
+    X-Forwarded-For só é considerado quando a conexão vem de um proxy em TRUSTED_PROXIES;
+    nesse caso a lista é percorrida da direita para a esquerda, pulando os proxies
+    confiáveis, e o primeiro endereço não confiável é o cliente.
+    """
+    peer = request.client.host if request.client else ""
+    address = _parse_ip(peer)
+    if address is None:
+        return peer
+    if not _is_trusted(address):
+        return str(address)
+
+    hops = ",".join(request.headers.getlist("x-forwarded-for")).split(",")
+    for hop in reversed(hops):
+        hop_address = _parse_ip(hop)
+        if hop_address is None:
+            break
+        address = hop_address
+        if not _is_trusted(address):
+            break
+    return str(address)
+
+def ip_levels(ip: str) -> List[Tuple[str, str]]:
+    """Níveis (nome, rede) de um IP, do mais específico ao mais largo"""
+    address = _parse_ip(ip)
+    if address is None:
+        return [("ip", ip)]
+    levels = IPV4_LEVELS if address.version == 4 else IPV6_LEVELS
+    return [
+        (name, str(ipaddress.ip_network(f"{address}/{prefix}", strict=False)))
+        for name, prefix in levels
+    ]
+
+# ===== LIMITADOR =====
+
+class IpRateLimiter:
+    """Contadores hierárquicos por IP para as ações de IP_RATE_LIMITS"""
+
+    def __init__(self, limits: Dict[str, Dict[str, int]]):
+        self.limits = limits
+
+    def _keys_and_limits(self, action: str, ip: str) -> Tuple[List[str], List[str], List[int]]:
+        config = self.limits[action]
+        levels = [(name, network) for name, network in ip_levels(ip) if name in config]
+        root = levels[-1][1] if levels else ip
+        return (
+            [keys.ip_rate_limit(action, name, root, network) for name, network in levels],
+            [name for name, _ in levels],
+            [config[name] for name, _ in levels],
+        )
+
+    async def _run(self, action: str, ip: str, increment: bool) -> Optional[str]:
+        counter_keys, names, limits = self._keys_and_limits(action, ip)
+        if not counter_keys:
+            return None
+        blocked = await redis_service.run_script(
+            RATE_LIMIT_SCRIPT,
+            counter_keys,
+            ["1" if increment else "0", self.limits[action]["window_seconds"], *limits],
+        )
+        # Sem Redis o limite não é aplicado (mesmo comportamento de antes)
+        if not blocked:
+            return None
+        return names[int(blocked) - 1]
+
+    async def check(self, action: str, ip: str) -> Optional[str]:
+        """Nível que já atingiu o limite (None = liberado); não conta tentativa"""
+        level = await self._run(action, ip, increment=False)
+        if level is not None:
+            metrics.increment("rate_limit_blocked_total", action=action, level=level)
+            logger.warning(
+                "Limite de %s atingido no nível %s (%s)", action, level, ip,
+                extra={"event": "rate_limit.blocked"},
+            )
+        return level
+
+    async def hit(self, action: str, ip: str) -> Optional[str]:
+        """Conta uma tentativa em todos os níveis; retorna o nível que atingiu o limite"""
+        return await self._run(action, ip, increment=True)
+
+    async def reset(self, action: str, ip: str) -> None:
+        """
+        Zera apenas o contador do endereço (ex: login bem-sucedido).
+        Os contadores de rede continuam: uma conta válida não libera a /64 inteira.
+        """
+        counter_keys, names, _ = self._keys_and_limits(action, ip)
+        if "ip" in names:
+            await redis_service.delete(counter_keys[names.index("ip")])
+
+# Instância global
+ip_rate_limiter = IpRateLimiter(settings.IP_RATE_LIMITS)
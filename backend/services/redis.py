@@ -1,32 +1,95 @@
 import redis.asyncio as redis
-from typing import Optional, Any
+from redis.asyncio.cluster import RedisCluster, ClusterNode
+from redis.asyncio.sentinel import Sentinel
+from typing import Optional, Any, List, Tuple
 import json
 from datetime import timedelta
 from config import get_settings
+from tracing import traced
+from deadline import DeadlineExceeded, bounded
+from services.memory_redis import InMemoryRedis, python_script
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Renova o lock apenas se ainda pertencer a quem o adquiriu
+RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Libera o lock apenas se ainda pertencer a quem o adquiriu
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Equivalentes para o Redis em memória (ENVIRONMENT=inmemory)
+@python_script(RENEW_LOCK_SCRIPT)
+def _renew_lock(client, keys, args):
+    if client._get(keys[0]) == args[0]:
+        return int(client._expire(keys[0], args[1]))
+    return 0
+
+@python_script(RELEASE_LOCK_SCRIPT)
+def _release_lock(client, keys, args):
+    if client._get(keys[0]) == args[0]:
+        return client._delete(keys[0])
+    return 0
+
+def _parse_nodes(nodes: List[str]) -> List[Tuple[str, int]]:
+    """Converte "host:port" em (host, port)"""
+    parsed = []
+    for node in nodes:
+        host, _, port = node.rpartition(":")
+        parsed.append((host, int(port)))
+    return parsed
+
+def create_redis_client(decode_responses: bool = True):
+    """Cliente conforme REDIS_MODE (nó único, Redis Cluster ou master via Sentinel)"""
+    if settings.IN_MEMORY:
+        return InMemoryRedis()
+    if settings.REDIS_MODE == "cluster":
+        nodes = settings.REDIS_CLUSTER_NODES or [f"{settings.REDIS_HOST}:{settings.REDIS_PORT}"]
+        return RedisCluster(
+            startup_nodes=[ClusterNode(host, port) for host, port in _parse_nodes(nodes)],
+            password=settings.REDIS_PASSWORD,
+            decode_responses=decode_responses,
+        )
+    if settings.REDIS_MODE == "sentinel":
+        sentinel = Sentinel(
+            _parse_nodes(settings.REDIS_SENTINELS),
+            password=settings.REDIS_PASSWORD,
+            db=settings.REDIS_DB,
+            decode_responses=decode_responses,
+        )
+        return sentinel.master_for(settings.REDIS_SENTINEL_MASTER)
+    return redis.from_url(settings.REDIS_CONNECTION_URL, decode_responses=decode_responses)
+
 class RedisService:
     """Serviço de cache com Redis"""
     
     def __init__(self):
         self.client = None
         self._connected = False
+        self._scripts = {}
     
     async def connect(self):
         """Conecta ao Redis"""
         try:
-            self.client = await redis.from_url(
-                settings.REDIS_CONNECTION_URL,
-                decode_responses=True
-            )
+            self.client = create_redis_client()
+            # Scripts registrados ficam presos ao cliente que os criou
+            self._scripts = {}
             await self.client.ping()
             self._connected = True
-            logger.info("✅ Conectado ao Redis")
+            logger.info(f"✅ Conectado ao Redis ({'em memória' if settings.IN_MEMORY else settings.REDIS_MODE})")
         except Exception as e:
-            logger.error(f"❌ Erro ao conectar ao Redis: {e}")
+            logger.error("❌ Erro ao conectar ao Redis: %s", e, extra={"event": "redis.connect_error"})
             self._connected = False
     
     async def disconnect(self):
@@ -36,6 +99,7 @@ class RedisService:
             self._connected = False
             logger.info("✅ Desconectado do Redis")
     
+    @traced("redis.set")
     async def set(self, key: str, value: Any, expire: Optional[timedelta] = None):
         """Armazena valor no Redis"""
         if not self._connected:
@@ -46,75 +110,136 @@ class RedisService:
                 value = json.dumps(value)
             
             if expire:
-                await self.client.setex(key, int(expire.total_seconds()), value)
+                await bounded(self.client.setex(key, int(expire.total_seconds()), value), "redis.setex")
             else:
-                await self.client.set(key, value)
+                await bounded(self.client.set(key, value), "redis.set")
             return True
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Erro ao setar {key}: {e}")
+            logger.error("Erro ao setar %s: %s", key, e, extra={"event": "redis.error"})
             return False
     
+    @traced("redis.get")
     async def get(self, key: str) -> Optional[Any]:
         """Recupera valor do Redis"""
         if not self._connected:
             return None
         
         try:
-            value = await self.client.get(key)
+            value = await bounded(self.client.get(key), "redis.get")
             if value and value.startswith(('{', '[')):
                 try:
                     return json.loads(value)
                 except:
                     pass
             return value
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Erro ao get {key}: {e}")
+            logger.error("Erro ao get %s: %s", key, e, extra={"event": "redis.error"})
             return None
     
+    @traced("redis.delete")
     async def delete(self, key: str) -> bool:
         """Remove chave do Redis"""
         if not self._connected:
             return False
         
         try:
-            await self.client.delete(key)
+            await bounded(self.client.delete(key), "redis.delete")
             return True
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Erro ao deletar {key}: {e}")
+            logger.error("Erro ao deletar %s: %s", key, e, extra={"event": "redis.error"})
             return False
     
+    @traced("redis.exists")
     async def exists(self, key: str) -> bool:
         """Verifica se chave existe"""
         if not self._connected:
             return False
         
         try:
-            return await self.client.exists(key) > 0
+            return await bounded(self.client.exists(key), "redis.exists") > 0
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Erro ao verificar {key}: {e}")
+            logger.error("Erro ao verificar %s: %s", key, e, extra={"event": "redis.error"})
             return False
     
+    @traced("redis.increment")
     async def increment(self, key: str) -> int:
         """Incrementa contador"""
         if not self._connected:
             return 0
         
         try:
-            return await self.client.incr(key)
+            return await bounded(self.client.incr(key), "redis.incr")
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Erro ao incrementar {key}: {e}")
+            logger.error("Erro ao incrementar %s: %s", key, e, extra={"event": "redis.error"})
             return 0
     
+    @traced("redis.expire")
     async def expire(self, key: str, seconds: int) -> bool:
         """Define expiração"""
         if not self._connected:
             return False
         
         try:
-            return await self.client.expire(key, seconds)
+            return await bounded(self.client.expire(key, seconds), "redis.expire")
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error("Erro ao setar expire %s: %s", key, e, extra={"event": "redis.error"})
+            return False
+    
+    @traced("redis.run_script")
+    async def run_script(self, script: str, keys: List[str], args: List[Any]) -> Any:
+        """Executa script Lua (registrado uma vez e chamado via EVALSHA)"""
+        if not self._connected:
+            return None
+        
+        try:
+            registered = self._scripts.get(script)
+            if registered is None:
+                registered = self.client.register_script(script)
+                self._scripts[script] = registered
+            return await bounded(registered(keys=keys, args=args), "redis.run_script")
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error("Erro ao executar script em %s: %s", keys, e, extra={"event": "redis.error"})
+            return None
+    
+    @traced("redis.acquire_lock")
+    async def acquire_lock(self, key: str, token: str, ttl_seconds: int) -> bool:
+        """Adquire lock distribuído (SET NX EX)"""
+        if not self._connected:
+            return False
+        
+        try:
+            return bool(await bounded(self.client.set(key, token, nx=True, ex=ttl_seconds), "redis.set"))
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Erro ao setar expire {key}: {e}")
+            logger.error("Erro ao adquirir lock %s: %s", key, e, extra={"event": "redis.error"})
             return False
+    
+    @traced("redis.renew_lock")
+    async def renew_lock(self, key: str, token: str, ttl_seconds: int) -> bool:
+        """Renova lock distribuído se ainda for o dono"""
+        result = await self.run_script(RENEW_LOCK_SCRIPT, [key], [token, ttl_seconds])
+        return bool(result)
+    
+    @traced("redis.release_lock")
+    async def release_lock(self, key: str, token: str) -> bool:
+        """Libera lock distribuído se ainda for o dono"""
+        result = await self.run_script(RELEASE_LOCK_SCRIPT, [key], [token])
+        return bool(result)
 
 # Instância global
 redis_service = RedisService()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import random
+import uuid
+from typing import Any, Dict, List, Optional
+import httpx
+from config import get_settings
+from tracing import traced
+import deadline
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 409: outra tentativa com a mesma Idempotency-Key ainda está em processamento
+RETRY_STATUS = {409, 429, 500, 502, 503, 504}
+
+class ResendError(Exception):
+    """Falha definitiva ao chamar a API do Resend"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CapturingTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte para ENVIRONMENT=inmemory: nenhum email sai do processo.
+    Cada email enviado fica em `outbox` (útil em testes para ler o código de verificação).
+    """
+
+    def __init__(self):
+        self.outbox: List[Dict[str, Any]] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        payload = json.loads(request.content or b"null")
+        messages = payload if isinstance(payload, list) else [payload]
+        results = []
+        for message in messages:
+            message = dict(message, id=str(uuid.uuid4()))
+            self.outbox.append(message)
+            results.append({"id": message["id"]})
+        body = {"data": results} if isinstance(payload, list) else results[0]
+        return httpx.Response(200, json=body, request=request)
+
+class ResendClient:
+    """
+    Cliente HTTP assíncrono para a API do Resend.
+    Mantém um pool de conexões keep-alive (HTTP/2 quando disponível), com
+    timeout por chamada e retentativas em 429/5xx e falhas de rede. Toda chamada leva
+    uma Idempotency-Key fixa entre as tentativas: se uma tentativa expirou depois de o
+    Resend aceitar o email, a repetição não gera um segundo envio.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.api_key = api_key or settings.RESEND_API_KEY
+        self.base_url = (base_url or settings.RESEND_API_URL).rstrip("/")
+        self.max_connections = max_connections or settings.RESEND_MAX_CONNECTIONS
+        self.max_retries = settings.RESEND_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or settings.RESEND_TIMEOUT_SECONDS
+        self._client: Optional[httpx.AsyncClient] = None
+        # Emails capturados em memória (somente com ENVIRONMENT=inmemory)
+        self.transport: Optional[CapturingTransport] = CapturingTransport() if settings.IN_MEMORY else None
+
+    async def start(self):
+        """Cria o pool de conexões"""
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=HTTP2_AVAILABLE and self.transport is None,
+            transport=self.transport,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60,
+            ),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+        )
+        if self.transport is not None:
+            logger.info("📦 Cliente Resend em memória: emails capturados, nada é enviado")
+        else:
+            logger.info(f"✅ Cliente Resend pronto ({'HTTP/2' if HTTP2_AVAILABLE else 'HTTP/1.1'})")
+
+    async def close(self):
+        """Fecha o pool de conexões"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), settings.RESEND_MAX_BACKOFF_SECONDS)
+                except ValueError:
+                    pass
+        backoff = min(settings.RESEND_MAX_BACKOFF_SECONDS, 0.25 * (2 ** attempt))
+        return random.uniform(backoff / 2, backoff)
+
+    async def _post(
+        self,
+        path: str,
+        payload: Any,
+        timeout: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Any:
+        if self._client is None:
+            await self.start()
+        headers = {"Idempotency-Key": idempotency_key or str(uuid.uuid4())}
+
+        last_error: Optional[str] = None
+        last_status: Optional[int] = None
+        for attempt in range(self.max_retries + 1):
+            response = None
+            # Timeout da tentativa limitado ao que resta do prazo da requisição
+            attempt_timeout = deadline.timeout_for("email.send", timeout or self.timeout)
+            try:
+                response = await self._client.post(path, json=payload, headers=headers, timeout=attempt_timeout)
+                if response.status_code < 300:
+                    return response.json()
+                last_status = response.status_code
+                last_error = response.text
+                if response.status_code not in RETRY_STATUS:
+                    break
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                last_error = repr(e)
+
+            if attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                left = deadline.remaining()
+                if left is not None and delay >= left:
+                    # Não há tempo para outra tentativa dentro do prazo
+                    raise deadline.exceeded("email.send")
+                await asyncio.sleep(delay)
+
+        left = deadline.remaining()
+        if left is not None and left <= 0:
+            raise deadline.exceeded("email.send")
+        raise ResendError(f"Falha ao chamar Resend {path}: {last_status} {last_error}", last_status)
+
+    @traced("email.send")
+    async def send(
+        self,
+        params: Dict[str, Any],
+        timeout: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Envia um email (POST /emails); retorna a resposta com o id"""
+        return await self._post("/emails", params, timeout, idempotency_key)
+
+    @traced("email.send_batch")
+    async def send_batch(
+        self,
+        messages: List[Dict[str, Any]],
+        timeout: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Envia vários emails (POST /emails/batch, até 100 por chamada; uma chave por lote)"""
+        results: List[Dict[str, Any]] = []
+        for i in range(0, len(messages), 100):
+            chunk_key = f"{idempotency_key}:{i // 100}" if idempotency_key else None
+            response = await self._post("/emails/batch", messages[i:i + 100], timeout, chunk_key)
+            results.extend(response.get("data", []) if isinstance(response, dict) else response)
+        return results
+
+# Instância global
+resend_client = ResendClient()
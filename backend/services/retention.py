@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable, List
+from sqlalchemy import select, delete, func, and_, or_
+from config import get_settings
+from database import shard_session_factories
+from models.user import User, TFABackupCode, TFAAttempt
+from services.metrics import metrics
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class RetentionService:
+    """
+    Expurgo de dados expirados (tentativas 2FA, códigos de backup e cadastros não verificados).
+    Remove em lotes pequenos paginados por chave (id), com pausa entre lotes
+    para não competir com o tráfego normal.
+    """
+
+    async def _purge_in_chunks(self, model, build_conditions: Callable[[datetime], List], label: str) -> int:
+        """
+        Remove registros de `model` que atendem às condições, em lotes paginados por id.
+        Com sharding, cada shard é percorrido em separado (ids das tabelas filhas são por shard).
+
+        `build_conditions` recebe o now() do próprio shard: os cortes de retenção usam o
+        mesmo relógio (e fuso da sessão) do server_default dos created_at.
+
+        Returns:
+            Total de registros removidos
+        """
+        batch_size = settings.RETENTION_BATCH_SIZE
+        max_rows = settings.RETENTION_MAX_ROWS_PER_RUN
+        total = 0
+
+        for factory in shard_session_factories().values():
+            async with factory() as session:
+                now = (await session.execute(select(func.now()))).scalar_one()
+            last_id = 0
+            while total < max_rows:
+                async with factory() as session:
+                    result = await session.execute(
+                        select(model.id)
+                        .where(and_(model.id > last_id, *build_conditions(now)))
+                        .order_by(model.id)
+                        .limit(min(batch_size, max_rows - total))
+                    )
+                    ids = result.scalars().all()
+                    if not ids:
+                        break
+
+                    await session.execute(delete(model).where(model.id.in_(ids)))
+                    await session.commit()
+
+                total += len(ids)
+                last_id = ids[-1]
+                metrics.increment("retention_rows_deleted_total", len(ids), table=label)
+
+                if len(ids) < batch_size:
+                    break
+                await asyncio.sleep(settings.RETENTION_THROTTLE_SECONDS)
+
+        return total
+
+    async def purge_tfa_attempts(self) -> int:
+        """Remove tentativas 2FA mais antigas que a retenção"""
+        retention = timedelta(days=settings.RETENTION_TFA_ATTEMPTS_DAYS)
+        return await self._purge_in_chunks(
+            TFAAttempt,
+            lambda now: [TFAAttempt.created_at < now - retention],
+            "tfa_attempts",
+        )
+
+    async def purge_backup_codes(self) -> int:
+        """
+        Remove códigos de backup usados após a retenção.
+        Os códigos de um setup anterior já são apagados pelo próprio /tfa/setup.
+        """
+        retention = timedelta(days=settings.RETENTION_BACKUP_CODES_DAYS)
+        return await self._purge_in_chunks(
+            TFABackupCode,
+            lambda now: [TFABackupCode.used == True, TFABackupCode.used_at < now - retention],
+            "tfa_backup_codes",
+        )
+
+    async def purge_unverified_users(self) -> int:
+        """
+        Remove cadastros abandonados: email nunca verificado, nenhum login e conta que
+        não veio de importação (import_users.py --unverified grava signup_source="import").
+        Contas importadas antes da coluna signup_source têm NULL: marque-as antes de ligar
+        o job (UPDATE users SET signup_source = 'import' WHERE ...) ou reimporte o arquivo
+        com --on-duplicate update.
+        """
+        retention = timedelta(days=settings.RETENTION_UNVERIFIED_USERS_DAYS)
+        return await self._purge_in_chunks(
+            User,
+            lambda now: [
+                User.email_verified == False,
+                User.last_login.is_(None),
+                or_(User.signup_source.is_(None), User.signup_source != "import"),
+                User.created_at < now - retention,
+            ],
+            "users",
+        )
+
+def register_retention_jobs(scheduler) -> None:
+    """Registra os jobs de expurgo no scheduler"""
+    interval = settings.RETENTION_INTERVAL_SECONDS
+    scheduler.add_job("purge_tfa_attempts", interval, retention_service.purge_tfa_attempts)
+    scheduler.add_job("purge_backup_codes", interval, retention_service.purge_backup_codes)
+    scheduler.add_job("purge_unverified_users", interval, retention_service.purge_unverified_users)
+
+# Instância global
+retention_service = RetentionService()
@@ -0,0 +1,120 @@
+import asyncio
+import random
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+from config import get_settings
+from services.redis import redis_service
+from services import keys
+from services.metrics import metrics
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """Job periódico executado apenas pelo líder"""
+    name: str
+    interval_seconds: float
+    func: Callable[[], Awaitable[Optional[int]]]
+
+
+class JobScheduler:
+    """
+    Agendador de jobs em processo.
+    Um único worker por cluster (o líder, eleito via lock no Redis) executa os jobs.
+    """
+
+    LOCK_KEY = keys.SCHEDULER_LEADER
+
+    def __init__(self):
+        self._jobs: List[Job] = []
+        self._tasks: List[asyncio.Task] = []
+        self._token = secrets.token_hex(16)
+        self._is_leader = False
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def add_job(self, name: str, interval_seconds: float, func: Callable[[], Awaitable[Optional[int]]]):
+        """Registra um job periódico"""
+        self._jobs.append(Job(name=name, interval_seconds=interval_seconds, func=func))
+
+    async def start(self):
+        """Inicia a eleição de líder e os loops dos jobs"""
+        if not settings.SCHEDULER_ENABLED:
+            logger.info("⏸️ Scheduler desabilitado")
+            return
+
+        self._tasks.append(asyncio.create_task(self._leader_loop(), name="scheduler:leader"))
+        for job in self._jobs:
+            self._tasks.append(asyncio.create_task(self._job_loop(job), name=f"scheduler:{job.name}"))
+        logger.info("✅ Scheduler iniciado com %d jobs", len(self._jobs))
+
+    async def stop(self):
+        """Para os jobs e libera a liderança"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        if self._is_leader:
+            await redis_service.release_lock(self.LOCK_KEY, self._token)
+            self._is_leader = False
+
+    async def _leader_loop(self):
+        """Adquire ou renova o lock de liderança periodicamente"""
+        ttl = settings.SCHEDULER_LOCK_TTL_SECONDS
+        while True:
+            try:
+                if self._is_leader:
+                    self._is_leader = await redis_service.renew_lock(self.LOCK_KEY, self._token, ttl)
+                    if not self._is_leader:
+                        logger.warning("⚠️ Liderança do scheduler perdida")
+                else:
+                    self._is_leader = await redis_service.acquire_lock(self.LOCK_KEY, self._token, ttl)
+                    if self._is_leader:
+                        logger.info("👑 Este worker é o líder do scheduler")
+            except Exception as e:
+                logger.error("Erro na eleição de líder: %s", e, extra={"event": "scheduler.leader_error"})
+                self._is_leader = False
+
+            await asyncio.sleep(ttl / 3)
+
+    async def _job_loop(self, job: Job):
+        """Executa o job no intervalo configurado enquanto for líder"""
+        # Jitter inicial para não disparar todos os jobs ao mesmo tempo
+        await asyncio.sleep(random.uniform(0, min(job.interval_seconds, 30)))
+        while True:
+            if self._is_leader:
+                await self.run_job(job)
+            await asyncio.sleep(job.interval_seconds)
+
+    async def run_job(self, job: Job) -> Optional[int]:
+        """Executa um job uma vez, registrando duração e status"""
+        started = time.perf_counter()
+        status = "ok"
+        result = None
+        try:
+            result = await job.func()
+            return result
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as e:
+            status = "error"
+            logger.error("❌ Erro no job %s: %s", job.name, e, extra={"event": "scheduler.job_error"})
+            return None
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.observe("scheduler_job_duration_seconds", elapsed, job=job.name)
+            metrics.increment("scheduler_job_runs_total", job=job.name, status=status)
+            if status == "ok":
+                logger.info("🧹 Job %s concluído em %.2fs (%d registros)", job.name, elapsed, result or 0)
+
+# Instância global
+scheduler = JobScheduler()
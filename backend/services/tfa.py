@@ -3,9 +3,11 @@ import secrets
 import string
 from datetime import datetime, timedelta
 from typing import Tuple, List, Optional, Dict
-from jose import jwt, JWTError
 from config import get_settings
 from services.redis import redis_service
+from services import keys
+from tracing import traced
+from auth.tokens import TokenError, issue, token_codec
 import logging
 
 settings = get_settings()
@@ -14,12 +16,6 @@ logger = logging.getLogger(__name__)
 class TFAService:
     """Serviço de Two-Factor Authentication com Redis"""
     
-    # Prefixos para chaves Redis
-    CODE_PREFIX = "tfa:code:"
-    ATTEMPTS_PREFIX = "tfa:attempts:"
-    BLOCK_PREFIX = "tfa:block:"
-    SESSION_PREFIX = "tfa:session:"
-    
     @staticmethod
     def generate_secret() -> str:
         """Gera um segredo TOTP para o usuário"""
@@ -49,7 +45,7 @@ class TFAService:
             totp = pyotp.TOTP(secret)
             return totp.verify(code)
         except Exception as e:
-            logger.error(f"Erro ao verificar TOTP: {e}")
+            logger.error("Erro ao verificar TOTP: %s", e, extra={"event": "tfa.totp_error"})
             return False
     
     @staticmethod
@@ -58,34 +54,28 @@ class TFAService:
         return ''.join(secrets.choice(string.digits) for _ in range(6))
     
     @staticmethod
-    def create_tfa_token(user_id: int, email: str) -> str:
+    def create_tfa_token(user_id: int) -> str:
         """Cria token temporário para segunda etapa do 2FA"""
-        expire = datetime.utcnow() + timedelta(minutes=settings.TFA_TOKEN_EXPIRE_MINUTES)
-        to_encode = {
-            "sub": str(user_id),
-            "email": email,
-            "type": "tfa_temp",
-            "exp": expire
-        }
-        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return issue("tfa_temp", str(user_id), settings.TFA_TOKEN_EXPIRE_MINUTES * 60)
     
     @staticmethod
+    @traced("tfa.verify_token")
     def verify_tfa_token(token: str) -> Optional[dict]:
         """Verifica token temporário do 2FA"""
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            payload = token_codec.decode(token)
             if payload.get("type") != "tfa_temp":
                 return None
             return payload
-        except JWTError as e:
-            logger.error(f"Erro ao verificar token TFA: {e}")
+        except TokenError as e:
+            logger.warning("Erro ao verificar token TFA: %s", e, extra={"event": "tfa.invalid_token"})
             return None
     
     async def store_tfa_code(self, user_id: int, code: str) -> bool:
         """
         Armazena código 2FA no Redis com expiração
         """
-        key = f"{self.CODE_PREFIX}{user_id}"
+        key = keys.tfa_code(user_id)
         return await redis_service.set(
             key, 
             code, 
@@ -96,21 +86,21 @@ class TFAService:
         """
         Recupera código 2FA do Redis
         """
-        key = f"{self.CODE_PREFIX}{user_id}"
+        key = keys.tfa_code(user_id)
         return await redis_service.get(key)
     
     async def delete_tfa_code(self, user_id: int) -> bool:
         """
         Remove código 2FA após uso
         """
-        key = f"{self.CODE_PREFIX}{user_id}"
+        key = keys.tfa_code(user_id)
         return await redis_service.delete(key)
     
     async def record_attempt(self, user_id: int, success: bool, ip: str) -> int:
         """
         Registra tentativa de 2FA e retorna número de tentativas
         """
-        key = f"{self.ATTEMPTS_PREFIX}{user_id}"
+        key = keys.tfa_attempts(user_id)
         
         # Incrementa contador
         attempts = await redis_service.increment(key)
@@ -129,7 +119,7 @@ class TFAService:
         """
         Bloqueia usuário após muitas tentativas
         """
-        key = f"{self.BLOCK_PREFIX}{user_id}"
+        key = keys.tfa_block(user_id)
         return await redis_service.set(
             key,
             "blocked",
@@ -140,7 +130,7 @@ class TFAService:
         """
         Verifica se usuário está bloqueado
         """
-        key = f"{self.BLOCK_PREFIX}{user_id}"
+        key = keys.tfa_block(user_id)
         return await redis_service.exists(key)
     
     async def create_session(self, user_id: int, data: Dict) -> str:
@@ -148,7 +138,7 @@ class TFAService:
         Cria sessão temporária no Redis
         """
         session_id = secrets.token_urlsafe(32)
-        key = f"{self.SESSION_PREFIX}{session_id}"
+        key = keys.tfa_session(session_id)
         
         session_data = {
             "user_id": user_id,
@@ -168,14 +158,14 @@ class TFAService:
         """
         Recupera sessão do Redis
         """
-        key = f"{self.SESSION_PREFIX}{session_id}"
+        key = keys.tfa_session(session_id)
         return await redis_service.get(key)
     
     async def delete_session(self, session_id: str) -> bool:
         """
         Remove sessão
         """
-        key = f"{self.SESSION_PREFIX}{session_id}"
+        key = keys.tfa_session(session_id)
         return await redis_service.delete(key)
 
 # Instância global
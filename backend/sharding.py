@@ -0,0 +1,213 @@
+"""
+Roteamento de shards do MySQL (opcional, ligado por SHARD_URLS).
+
+- O espaço é dividido em SLOT_COUNT slots fixos. O slot de um usuário vem do email
+  normalizado (crc32) e fica codificado no próprio id: id ≡ slot + 1 (mod SLOT_COUNT),
+  via auto_increment_increment/auto_increment_offset da sessão MySQL no INSERT.
+  Assim tanto email quanto id levam ao shard com uma única consulta.
+- O mapa slot -> shard é padrão (slot % N) e pode ser sobrescrito pelo arquivo JSON
+  SHARD_MAP_PATH, que é o que rebalance_shards.py altera ao mover slots.
+- O evento de INSERT ajusta o AUTO_INCREMENT da conexão, então cada flush deve inserir
+  um usuário por vez (como create_user); inserts em massa usam bulk_insert_users.
+  O ajuste é desfeito logo após o INSERT (e, se ele falhar, quando a conexão volta ao
+  pool), para que as tabelas filhas e os próximos usos da conexão tenham ids sequenciais.
+- Tabelas filhas (tfa_backup_codes, tfa_attempts) seguem o shard do user_id.
+"""
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, ColumnElement
+from config import get_settings
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SLOT_COUNT = 1024
+
+# Colunas (tabela, coluna) que identificam o shard num WHERE
+_USER_ID_COLUMNS = {("users", "id"), ("tfa_backup_codes", "user_id"), ("tfa_attempts", "user_id")}
+_EMAIL_COLUMNS = {("users", "email")}
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def slot_for_email(email: str) -> int:
+    """Slot determinístico do email normalizado"""
+    return zlib.crc32(normalize_email(email).encode("utf-8")) % SLOT_COUNT
+
+def slot_for_user_id(user_id: int) -> int:
+    """Slot codificado no id (id ≡ slot + 1 mod SLOT_COUNT)"""
+    return (int(user_id) - 1) % SLOT_COUNT
+
+def shard_name(index: int) -> str:
+    return f"shard{index}"
+
+class ShardRouter:
+    """Mapa slot -> shard, com as funções de escolha usadas pelo ShardedSession"""
+
+    def __init__(self, shard_ids: List[str], map_path: Optional[str] = None):
+        self.shard_ids = shard_ids
+        self.map_path = Path(map_path) if map_path else None
+        self.slot_map: List[str] = [shard_ids[slot % len(shard_ids)] for slot in range(SLOT_COUNT)]
+        if self.map_path and self.map_path.exists():
+            self.load()
+
+    # ----- Mapa de slots -----
+
+    def load(self) -> None:
+        """Aplica o mapa do arquivo JSON ({"slots": {"<slot>": "<shard>"}})"""
+        with open(self.map_path, "r", encoding="utf-8") as f:
+            slots = json.load(f).get("slots", {})
+        for slot, shard_id in slots.items():
+            if shard_id not in self.shard_ids:
+                raise ValueError(f"Shard desconhecido no mapa de slots: {shard_id}")
+            self.slot_map[int(slot)] = shard_id
+        logger.info(f"✅ Mapa de shards carregado: {len(slots)} slots de {self.map_path}")
+
+    def save(self) -> None:
+        """
+        Grava o mapa completo de forma atômica. Com o arquivo presente, adicionar uma
+        URL em SHARD_URLS não muda o dono de nenhum slot até que ele seja movido.
+        """
+        self.map_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.map_path.with_suffix(self.map_path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "slot_count": SLOT_COUNT,
+                "slots": {str(slot): shard_id for slot, shard_id in enumerate(self.slot_map)},
+            }, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.map_path)
+
+    def shard_for_slot(self, slot: int) -> str:
+        return self.slot_map[slot]
+
+    def shard_for_email(self, email: str) -> str:
+        return self.slot_map[slot_for_email(email)]
+
+    def shard_for_user_id(self, user_id: int) -> str:
+        return self.slot_map[slot_for_user_id(user_id)]
+
+    def slots_of(self, shard_id: str) -> List[int]:
+        return [slot for slot, owner in enumerate(self.slot_map) if owner == shard_id]
+
+    # ----- Choosers do ShardedSession -----
+
+    def shard_chooser(self, mapper, instance, clause=None) -> str:
+        """Shard onde um objeto novo é gravado"""
+        if instance is not None:
+            if mapper.local_table.name == "users":
+                return self.shard_for_email(instance.email)
+            user_id = getattr(instance, "user_id", None)
+            if user_id is not None:
+                return self.shard_for_user_id(user_id)
+        return self.shard_ids[0]
+
+    def identity_chooser(self, mapper, primary_key, *, lazy_loaded_from=None, **kw) -> List[str]:
+        """Shards candidatos para session.get() / carregamento por chave primária"""
+        if lazy_loaded_from is not None:
+            return [lazy_loaded_from.identity_token]
+        if mapper.local_table.name == "users":
+            return [self.shard_for_user_id(primary_key[0])]
+        return self.shard_ids
+
+    def execute_chooser(self, orm_context) -> List[str]:
+        """
+        Shards de um SELECT/UPDATE/DELETE: se o WHERE fixa id/email do usuário (ou user_id
+        das tabelas filhas) com = ou IN no nível do AND, vai só aos shards desses valores;
+        caso contrário consulta todos e junta os resultados.
+        """
+        whereclause = getattr(orm_context.statement, "whereclause", None)
+        shards = self._shards_from_criteria(whereclause) if whereclause is not None else set()
+        return sorted(shards) if shards else self.shard_ids
+
+    def _shards_from_criteria(self, clause: ColumnElement) -> Set[str]:
+        for criterion in _conjuncts(clause):
+            if not isinstance(criterion, BinaryExpression):
+                continue
+            column, value = criterion.left, criterion.right
+            table = getattr(getattr(column, "table", None), "name", None)
+            key = (table, getattr(column, "name", None))
+            if not isinstance(value, BindParameter):
+                continue
+            if criterion.operator is operators.eq:
+                values = [value.effective_value]
+            elif criterion.operator is operators.in_op:
+                values = list(value.effective_value or [])
+            else:
+                continue
+            if key in _USER_ID_COLUMNS:
+                return {self.shard_for_user_id(v) for v in values}
+            if key in _EMAIL_COLUMNS:
+                return {self.shard_for_email(v) for v in values}
+        return set()
+
+def _conjuncts(clause: ColumnElement) -> Iterable[ColumnElement]:
+    """Critérios do nível superior de um AND (OR nunca restringe o shard)"""
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        for child in clause.clauses:
+            yield from _conjuncts(child)
+    else:
+        yield clause
+
+# Marca, no registro da conexão do pool, que a sessão MySQL está com o slot ajustado
+_ID_SLOT_FLAG = "shard_id_slot"
+_RESET_ID_SLOT_SQL = "SET SESSION auto_increment_increment = 1, auto_increment_offset = 1"
+
+def set_id_slot(connection, slot: int) -> None:
+    """Faz o próximo AUTO_INCREMENT desta conexão cair no slot informado (desfazer com reset_id_slot)"""
+    connection.exec_driver_sql(
+        f"SET SESSION auto_increment_increment = {SLOT_COUNT}, auto_increment_offset = {slot + 1}"
+    )
+    connection.info[_ID_SLOT_FLAG] = True
+
+def reset_id_slot(connection) -> None:
+    """Volta o AUTO_INCREMENT da conexão ao padrão (1 em 1)"""
+    if connection.info.pop(_ID_SLOT_FLAG, False):
+        connection.exec_driver_sql(_RESET_ID_SLOT_SQL)
+
+def install_id_encoding(user_cls) -> None:
+    """Registra os eventos que codificam o slot do email no id de cada novo usuário"""
+
+    @event.listens_for(user_cls, "before_insert")
+    def _encode_slot(mapper, connection, target):
+        if target.id is None:
+            set_id_slot(connection, slot_for_email(target.email))
+
+    @event.listens_for(user_cls, "after_insert")
+    def _reset_slot(mapper, connection, target):
+        reset_id_slot(connection)
+
+def install_id_slot_reset(engine) -> None:
+    """
+    Rede de segurança do pool: se o INSERT falhou (ex: email duplicado) o after_insert
+    não roda, e a conexão voltaria ao pool ainda com o slot ajustado.
+    """
+
+    @event.listens_for(engine.sync_engine.pool, "reset")
+    def _reset_on_return(dbapi_connection, connection_record, reset_state):
+        if not connection_record.info.pop(_ID_SLOT_FLAG, False):
+            return
+        if reset_state.terminate_only or not reset_state.asyncio_safe:
+            return  # A conexão será descartada
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(_RESET_ID_SLOT_SQL)
+        finally:
+            cursor.close()
+
+def build_router() -> Optional[ShardRouter]:
+    """Router a partir das settings (None quando SHARD_URLS está vazio)"""
+    if not settings.SHARD_URLS:
+        return None
+    shard_ids = [shard_name(i) for i in range(len(settings.SHARD_URLS))]
+    return ShardRouter(shard_ids, settings.SHARD_MAP_PATH)
+
+# Instância global (None = banco único)
+shard_router = build_router()
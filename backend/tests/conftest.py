@@ -0,0 +1,18 @@
+"""
+Os testes rodam no perfil ENVIRONMENT=inmemory (SQLite, Redis em processo e emails
+capturados): nenhum serviço externo é necessário.
+
+Uso (dentro de backend/): python -m pytest -q
+"""
+import os
+import sys
+from pathlib import Path
+
+# Antes de qualquer import da aplicação: as settings são lidas na importação
+os.environ.setdefault("ENVIRONMENT", "inmemory")
+os.environ.setdefault("MYSQL_ECHO", "false")
+# Os expurgos são chamados pelos testes; jobs em segundo plano disputariam a conexão SQLite
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+# Adiciona o diretório do backend ao path do Python
+sys.path.insert(0, str(Path(__file__).parent.parent))
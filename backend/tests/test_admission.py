@@ -0,0 +1,55 @@
+"""
+bcrypt roda em thread (auth.utils): enquanto logins estão em andamento, rotas baratas
+continuam respondendo sem esperar os hashes.
+"""
+import asyncio
+import statistics
+import time
+import httpx
+import main
+from database import AsyncSessionLocal
+from repositories.user_repository import UserRepository
+
+EMAIL = "admissao@voyeluxone.local"
+PASSWORD = "Senha@Forte123"
+CONCURRENT_LOGINS = 4
+
+async def _health_latencies(client: httpx.AsyncClient, samples: int) -> list:
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        response = await client.get("/health")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return latencies
+
+async def _run() -> tuple:
+    async with main.lifespan(main.app):
+        async with AsyncSessionLocal() as session:
+            await UserRepository(session).create_user(EMAIL, PASSWORD, "Admissão")
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            baseline = await _health_latencies(client, 20)
+
+            # Senha errada: o custo é o mesmo checkpw de um login válido
+            started = time.perf_counter()
+            logins = [
+                asyncio.create_task(client.post("/auth/login", data={"username": EMAIL, "password": "Errada@123"}))
+                for _ in range(CONCURRENT_LOGINS)
+            ]
+            await asyncio.sleep(0.01)
+            under_load = await _health_latencies(client, 20)
+            responses = await asyncio.gather(*logins)
+            login_seconds = time.perf_counter() - started
+    return baseline, under_load, responses, login_seconds
+
+def test_health_stays_responsive_while_bcrypt_runs():
+    baseline, under_load, responses, login_seconds = asyncio.run(_run())
+
+    assert all(response.status_code == 401 for response in responses)
+    # Os /health medidos sob carga terminaram antes dos logins (não ficaram na fila do loop)
+    assert sum(under_load) < login_seconds
+    # Um único checkpw (custo 12) leva centenas de ms; se bloqueasse o loop, apareceria aqui
+    assert max(under_load) < 0.1, f"/health sob carga: max {max(under_load) * 1000:.0f} ms"
+    assert statistics.median(under_load) < statistics.median(baseline) + 0.02
@@ -0,0 +1,91 @@
+"""
+Filtro de senhas vazadas: lista vazia, linhas malformadas na compilação e arquivos
+inválidos na carga (o mmap é fechado).
+"""
+import hashlib
+import mmap
+from types import SimpleNamespace
+import pytest
+import build_breached_filter
+from services import breached_passwords
+from services.breached_passwords import (
+    HEADER, MAGIC, BloomFilterWriter, BreachedPasswordChecker, optimal_parameters,
+)
+
+def _sha1(password: str) -> str:
+    return hashlib.sha1(password.encode("utf-8")).hexdigest().upper()
+
+def _build(tmp_path, lines) -> tuple:
+    source = tmp_path / "hashes.txt"
+    source.write_text("\n".join(lines) + "\n")
+    output = tmp_path / "filtro.bloom"
+    build_breached_filter.build_filter(SimpleNamespace(
+        source=str(source), output=str(output), fp_rate=0.001, expected=None, plain=False,
+    ))
+    return BreachedPasswordChecker(str(output)), output
+
+def test_optimal_parameters_accepts_empty_input():
+    num_bits, num_hashes = optimal_parameters(0, 0.001)
+    assert num_bits >= 8 and num_hashes >= 1
+
+@pytest.mark.parametrize("rate", [0, 1, -0.1])
+def test_optimal_parameters_rejects_invalid_rate(rate):
+    with pytest.raises(ValueError):
+        optimal_parameters(1000, rate)
+
+def test_empty_list_builds_an_empty_filter(tmp_path):
+    checker, _ = _build(tmp_path, [])
+
+    assert checker.enabled
+    assert not checker.is_breached("Senha@Forte123")
+
+def test_malformed_lines_are_skipped_and_counted(tmp_path, caplog):
+    lines = [
+        f"{_sha1('password')}:3861493",
+        "nao-e-hex:12",
+        "ABC",                      # hex válido, mas não é um SHA-1
+        f"{_sha1('123456')}",
+        "ZZ" * 20 + ":1",
+    ]
+    with caplog.at_level("WARNING"):
+        checker, _ = _build(tmp_path, lines)
+
+    assert checker.is_breached("password")
+    assert checker.is_breached("123456")
+    assert "3 linhas inválidas ignoradas" in caplog.text
+
+class _TrackedMmap(mmap.mmap):
+    opened = []
+
+    def __new__(cls, *args, **kwargs):
+        instance = super().__new__(cls, *args, **kwargs)
+        cls.opened.append(instance)
+        return instance
+
+@pytest.mark.parametrize("content", [
+    b"NOTBLOOM" + b"\0" * 32,                                  # magic errado
+    HEADER.pack(MAGIC, 1 << 20, 7) + b"\0" * 16,               # truncado
+    HEADER.pack(MAGIC, 0, 7) + b"\0" * 16,                     # m = 0
+    b"VY",                                                     # menor que o cabeçalho
+])
+def test_invalid_file_disables_checker_and_closes_mmap(tmp_path, monkeypatch, content):
+    monkeypatch.setattr(breached_passwords.mmap, "mmap", _TrackedMmap)
+    _TrackedMmap.opened = []
+    path = tmp_path / "invalido.bloom"
+    path.write_bytes(content)
+
+    checker = BreachedPasswordChecker(str(path))
+
+    assert not checker.enabled
+    assert not checker.is_breached("password")
+    assert len(_TrackedMmap.opened) == 1 and _TrackedMmap.opened[0].closed
+
+def test_valid_filter_stays_mapped(tmp_path):
+    writer = BloomFilterWriter(str(tmp_path / "ok.bloom"), 10, 0.01)
+    writer.add_digest(hashlib.sha1(b"password").digest())
+    writer.close()
+
+    checker = BreachedPasswordChecker(str(tmp_path / "ok.bloom"))
+
+    assert checker.is_breached("password")
+    assert not checker._mm.closed
@@ -0,0 +1,74 @@
+"""
+Idempotency-Key em /auth/login/complete: a repetição recebe a mesma resposta com uma
+sessão nova, e o registro no Redis não guarda o cookie de sessão.
+"""
+import asyncio
+import hashlib
+import httpx
+from sqlalchemy import update
+import main
+from auth.tokens import token_codec
+from config import get_settings
+from database import AsyncSessionLocal
+from models.user import User
+from repositories.user_repository import UserRepository
+from services import keys
+from services.redis import redis_service
+
+settings = get_settings()
+PASSWORD = "Senha@Forte123"
+PATH = "/auth/login/complete"
+
+def _record_key(idempotency_key: str) -> str:
+    return keys.idempotency(hashlib.sha256(b"\0".join([PATH.encode(), b"", idempotency_key.encode()])).hexdigest())
+
+async def _login_complete_twice(email: str, idempotency_key: str, deactivate_before_replay: bool = False) -> tuple:
+    async with main.lifespan(main.app):
+        async with AsyncSessionLocal() as session:
+            user = await UserRepository(session).create_user(email, PASSWORD)
+            await session.execute(update(User).where(User.id == user.id).values(email_verified=True, tfa_enabled=True))
+            await session.commit()
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            login = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+            body = {"tfa_token": login.json()["tfa_token"], "code": await redis_service.get(keys.tfa_code(user.id))}
+            headers = {settings.IDEMPOTENCY_HEADER: idempotency_key}
+
+            first = await client.post(PATH, json=body, headers=headers)
+            record = await redis_service.get(_record_key(idempotency_key))
+            if deactivate_before_replay:
+                async with AsyncSessionLocal() as session:
+                    await session.execute(update(User).where(User.id == user.id).values(is_active=False))
+                    await session.commit()
+            client.cookies.clear()
+            replay = await client.post(PATH, json=body, headers=headers)
+    return user.id, first, replay, record
+
+def test_replayed_login_issues_a_fresh_session_without_storing_the_cookie():
+    user_id, first, replay, record = asyncio.run(
+        _login_complete_twice("idempotente@voyeluxone.local", "login-complete-1")
+    )
+
+    assert first.status_code == 200, first.text
+    assert replay.status_code == 200, replay.text
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert replay.json() == first.json()
+
+    # O registro guarda o usuário, não o cookie
+    assert record["session_user"] == user_id
+    assert all(name.lower() != "set-cookie" for name, _ in record["headers"])
+    assert first.cookies[settings.COOKIE_NAME] not in str(record)
+
+    session_token = replay.cookies[settings.COOKIE_NAME]
+    assert token_codec.decode(session_token)["sub"] == str(user_id)
+    assert settings.CSRF_COOKIE_NAME in replay.cookies
+
+def test_replay_for_deactivated_user_is_rejected():
+    _, first, replay, _ = asyncio.run(
+        _login_complete_twice("desativado@voyeluxone.local", "login-complete-2", deactivate_before_replay=True)
+    )
+
+    assert first.status_code == 200, first.text
+    assert replay.status_code == 401
+    assert settings.COOKIE_NAME not in replay.cookies
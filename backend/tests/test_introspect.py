@@ -0,0 +1,48 @@
+"""
+POST /auth/introspect: um token que falha ao decodificar fica {"active": false} sem
+derrubar o restante do lote.
+"""
+import asyncio
+import httpx
+import pytest
+import main
+from auth import routes, tokens
+from auth.dependencies import settings as dependency_settings
+from database import AsyncSessionLocal
+from repositories.user_repository import UserRepository
+
+SERVICE_TOKEN = "gateway-test-token"
+AUTH = {"Authorization": f"Bearer {SERVICE_TOKEN}"}
+
+@pytest.fixture
+def gateway(monkeypatch):
+    monkeypatch.setitem(dependency_settings.INTROSPECTION_TOKENS, "gateway", SERVICE_TOKEN)
+
+async def _introspect(build_tokens) -> httpx.Response:
+    async with main.lifespan(main.app):
+        async with AsyncSessionLocal() as session:
+            user = await UserRepository(session).create_user("introspect@voyeluxone.local", "Senha@Forte123")
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/auth/introspect", json={"tokens": build_tokens(user.id)}, headers=AUTH)
+
+def test_decode_failure_marks_only_that_token_inactive(gateway, monkeypatch):
+    decode = routes.token_codec.decode
+
+    def flaky_decode(token):
+        if token == "explode":
+            raise RuntimeError("falha inesperada")
+        return decode(token)
+
+    monkeypatch.setattr(routes.token_codec, "decode", flaky_decode)
+    response = asyncio.run(_introspect(lambda user_id: [
+        tokens.issue("access", str(user_id), 60),
+        "explode",
+        tokens.issue("access", "²", 60),   # isdigit() aceita, int() não
+        "garbage",
+    ]))
+
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert results[0]["active"] is True
+    assert results[1:] == [{"active": False}] * 3
@@ -0,0 +1,22 @@
+"""
+RateLimitFilter: o mapa de chaves é limitado (LRU) e logs com template compartilham o limite.
+"""
+import logging
+from logging_config import RateLimitFilter
+
+def _record(msg: str, *args) -> logging.LogRecord:
+    return logging.LogRecord("teste", logging.INFO, __file__, 1, msg, args, None)
+
+def test_buckets_are_bounded_by_max_keys():
+    limiter = RateLimitFilter(rate_per_second=5, burst=2, sample_rates={}, max_keys=10)
+    for i in range(1000):
+        assert limiter.filter(_record(f"✅ Email enviado para user{i}@voyeluxone.local"))
+    assert len(limiter._buckets) == 10
+    # As chaves mais recentes ficam
+    assert ("teste", "✅ Email enviado para user999@voyeluxone.local") in limiter._buckets
+
+def test_template_shares_one_bucket():
+    limiter = RateLimitFilter(rate_per_second=0.001, burst=2, sample_rates={}, max_keys=10)
+    allowed = [limiter.filter(_record("✅ Email enviado para %s", f"user{i}@voyeluxone.local")) for i in range(5)]
+    assert allowed == [True, True, False, False, False]
+    assert len(limiter._buckets) == 1
@@ -0,0 +1,171 @@
+"""
+ResendClient contra um servidor HTTP local no lugar da API do Resend: retentativas em
+429/5xx, timeout, Idempotency-Key estável entre tentativas e lotes de até 100 emails.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+import pytest
+from services.resend_client import ResendClient, ResendError
+
+class StandInResend:
+    """
+    Servidor local com respostas roteirizadas: cada requisição consome a próxima
+    (status, corpo, atraso, headers) de `script`; sem roteiro, responde 200 com ids.
+    """
+
+    def __init__(self):
+        self.script: List[tuple] = []
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stand_in._lock:
+                    stand_in.requests.append({
+                        "path": self.path,
+                        "idempotency_key": self.headers.get("Idempotency-Key"),
+                        "body": body,
+                    })
+                    scripted = stand_in.script.pop(0) if stand_in.script else None
+                status, payload, delay, headers = scripted or (200, None, 0, {})
+                if payload is None:
+                    ids = [{"id": f"email-{i}"} for i in range(len(body))] if isinstance(body, list) else None
+                    payload = {"data": ids} if ids is not None else {"id": "email-1"}
+                time.sleep(delay)
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # O cliente desistiu (timeout)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stand_in():
+    server = StandInResend()
+    yield server
+    server.close()
+
+def _run(stand_in: StandInResend, call, max_retries: int = 3, timeout: float = 2.0):
+    async def run():
+        client = ResendClient(api_key="re_test", base_url=stand_in.url, max_retries=max_retries, timeout=timeout)
+        client.transport = None  # Rede de verdade, mesmo com ENVIRONMENT=inmemory
+        try:
+            return await call(client)
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+MESSAGE = {"from": "noreply@voyeluxone.local", "to": ["a@voyeluxone.local"], "subject": "Código", "html": "123456"}
+
+def test_retries_429_and_5xx_with_the_same_idempotency_key(stand_in):
+    stand_in.script = [
+        (429, {"message": "rate limited"}, 0, {"Retry-After": "0"}),
+        (503, {"message": "unavailable"}, 0, {"Retry-After": "0"}),
+        (500, {"message": "boom"}, 0, {}),
+    ]
+
+    result = _run(stand_in, lambda client: client.send(MESSAGE))
+
+    assert result == {"id": "email-1"}
+    assert len(stand_in.requests) == 4
+    keys = {request["idempotency_key"] for request in stand_in.requests}
+    assert len(keys) == 1 and None not in keys
+
+def test_explicit_idempotency_key_is_sent(stand_in):
+    _run(stand_in, lambda client: client.send(MESSAGE, idempotency_key="tfa:42:abc"))
+
+    assert stand_in.requests[0]["idempotency_key"] == "tfa:42:abc"
+
+def test_each_call_gets_its_own_idempotency_key(stand_in):
+    async def twice(client):
+        await client.send(MESSAGE)
+        await client.send(MESSAGE)
+
+    _run(stand_in, twice)
+
+    first, second = stand_in.requests
+    assert first["idempotency_key"] != second["idempotency_key"]
+
+def test_client_error_is_not_retried(stand_in):
+    stand_in.script = [(422, {"message": "invalid"}, 0, {})]
+
+    with pytest.raises(ResendError) as error:
+        _run(stand_in, lambda client: client.send(MESSAGE))
+
+    assert error.value.status_code == 422
+    assert len(stand_in.requests) == 1
+
+def test_gives_up_after_max_retries(stand_in):
+    stand_in.script = [(503, {"message": "unavailable"}, 0, {"Retry-After": "0"})] * 3
+
+    with pytest.raises(ResendError) as error:
+        _run(stand_in, lambda client: client.send(MESSAGE), max_retries=2)
+
+    assert error.value.status_code == 503
+    assert len(stand_in.requests) == 3
+
+def test_timed_out_attempt_is_retried_with_the_same_key(stand_in):
+    stand_in.script = [(200, {"id": "late"}, 0.5, {})]
+
+    started = time.perf_counter()
+    result = _run(stand_in, lambda client: client.send(MESSAGE), timeout=0.2)
+    elapsed = time.perf_counter() - started
+
+    assert result == {"id": "email-1"}
+    assert len(stand_in.requests) == 2
+    assert stand_in.requests[0]["idempotency_key"] == stand_in.requests[1]["idempotency_key"]
+    assert elapsed < 2
+
+def test_persistent_timeout_raises(stand_in):
+    stand_in.script = [(200, {"id": "late"}, 0.5, {})] * 2
+
+    with pytest.raises(ResendError):
+        _run(stand_in, lambda client: client.send(MESSAGE), max_retries=1, timeout=0.2)
+
+    assert len(stand_in.requests) == 2
+
+def test_batch_is_sent_in_chunks_of_100(stand_in):
+    messages = [dict(MESSAGE, to=[f"user{i}@voyeluxone.local"]) for i in range(250)]
+
+    results = _run(stand_in, lambda client: client.send_batch(messages, idempotency_key="digest-7"))
+
+    assert len(results) == 250
+    assert [request["path"] for request in stand_in.requests] == ["/emails/batch"] * 3
+    assert [len(request["body"]) for request in stand_in.requests] == [100, 100, 50]
+    assert [request["body"][0]["to"] for request in stand_in.requests] == [
+        ["user0@voyeluxone.local"], ["user100@voyeluxone.local"], ["user200@voyeluxone.local"],
+    ]
+    assert [request["idempotency_key"] for request in stand_in.requests] == ["digest-7:0", "digest-7:1", "digest-7:2"]
+
+def test_batch_chunk_retry_keeps_its_key(stand_in):
+    messages = [dict(MESSAGE) for _ in range(150)]
+    stand_in.script = [(200, None, 0, {}), (502, {"message": "bad gateway"}, 0, {"Retry-After": "0"})]
+
+    results = _run(stand_in, lambda client: client.send_batch(messages, idempotency_key="digest-8"))
+
+    assert len(results) == 150
+    assert [request["idempotency_key"] for request in stand_in.requests] == ["digest-8:0", "digest-8:1", "digest-8:1"]
+    assert [len(request["body"]) for request in stand_in.requests] == [100, 50, 50]
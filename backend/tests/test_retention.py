@@ -0,0 +1,88 @@
+"""
+Expurgos de retenção: só cadastros abandonados somem, contas importadas ficam, e um
+novo /tfa/setup substitui os códigos de backup do anterior.
+"""
+import asyncio
+from datetime import timedelta
+import httpx
+from sqlalchemy import func, select
+import main
+from auth.utils import get_password_hash_async
+from config import get_settings
+from database import AsyncSessionLocal
+from models.user import User, TFABackupCode
+from services.retention import retention_service
+
+settings = get_settings()
+PASSWORD = "Senha@Forte123"
+
+async def _add_users(rows: list) -> dict:
+    async with AsyncSessionLocal() as session:
+        users = [User(hashed_password="x", **row) for row in rows]
+        session.add_all(users)
+        await session.commit()
+        return {user.email: user.id for user in users}
+
+async def _remaining_emails(emails) -> set:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(User.email).where(User.email.in_(list(emails))))
+        return set(result.scalars().all())
+
+async def _run_purge_users() -> tuple:
+    async with main.lifespan(main.app):
+        async with AsyncSessionLocal() as session:
+            now = (await session.execute(select(func.now()))).scalar_one()
+        old = now - timedelta(days=settings.RETENTION_UNVERIFIED_USERS_DAYS + 1)
+        ids = await _add_users([
+            {"email": "abandonado@voyeluxone.local", "created_at": old, "signup_source": "register"},
+            {"email": "legado@voyeluxone.local", "created_at": old},
+            {"email": "parceiro@voyeluxone.local", "created_at": old, "signup_source": "import"},
+            {"email": "ja-logou@voyeluxone.local", "created_at": old, "last_login": old},
+            {"email": "recente@voyeluxone.local", "created_at": now},
+            {"email": "verificado@voyeluxone.local", "created_at": old, "email_verified": True},
+        ])
+        await retention_service.purge_unverified_users()
+        return await _remaining_emails(ids)
+
+def test_purge_unverified_users_keeps_imported_and_active_accounts():
+    remaining = asyncio.run(_run_purge_users())
+
+    assert remaining == {
+        "parceiro@voyeluxone.local",
+        "ja-logou@voyeluxone.local",
+        "recente@voyeluxone.local",
+        "verificado@voyeluxone.local",
+    }
+
+async def _run_setup_twice() -> tuple:
+    email = "tfa-setup@voyeluxone.local"
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            csrf = (await client.get("/auth/csrf")).json()["csrf_token"]
+            headers = {settings.CSRF_HEADER_NAME: csrf}
+            async with AsyncSessionLocal() as session:
+                session.add(User(
+                    email=email, hashed_password=await get_password_hash_async(PASSWORD), email_verified=True,
+                ))
+                await session.commit()
+            response = await client.post("/auth/login", data={"username": email, "password": PASSWORD}, headers=headers)
+            assert response.status_code == 200, response.text
+            # O login renova o token CSRF
+            headers = {settings.CSRF_HEADER_NAME: client.cookies[settings.CSRF_COOKIE_NAME]}
+
+            first = (await client.post("/auth/tfa/setup", headers=headers)).json()["backup_codes"]
+            second = (await client.post("/auth/tfa/setup", headers=headers)).json()["backup_codes"]
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(TFABackupCode.code).join(User).where(User.email == email)
+            )
+            stored = result.scalars().all()
+    return first, second, stored
+
+def test_tfa_setup_replaces_previous_backup_codes():
+    first, second, stored = asyncio.run(_run_setup_twice())
+
+    assert sorted(stored) == sorted(second)
+    assert not set(first) & set(stored)
@@ -0,0 +1,95 @@
+"""
+Tokens malformados viram TokenError (401), nunca 500: headers com kid/alg de tipos
+inesperados e segmentos base64url não canônicos.
+"""
+import asyncio
+import time
+import httpx
+import orjson
+import pytest
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+import main
+from auth.jws import ALGORITHMS, TokenError, b64url_decode, b64url_encode
+from auth.jwks_client import JWKSClient
+from auth.tokens import TokenCodec
+from config import get_settings
+
+settings = get_settings()
+KID = "test-1"
+
+@pytest.fixture(scope="module")
+def codec():
+    return TokenCodec("EdDSA", {KID: Ed25519PrivateKey.generate()}, KID)
+
+def _access_token(codec: TokenCodec) -> str:
+    return codec.encode({"sub": "1", "exp": int(time.time()) + 60, "t": "a"})
+
+def _with_header(token: str, header: dict) -> str:
+    return ".".join([b64url_encode(orjson.dumps(header)).decode("ascii")] + token.split(".")[1:])
+
+def _jwks_client(codec: TokenCodec) -> JWKSClient:
+    jwk = ALGORITHMS["EdDSA"].public_jwk(codec.keys[KID], KID)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"keys": [jwk]}))
+    return JWKSClient("http://jwks.test/.well-known/jwks.json", http_client=httpx.AsyncClient(transport=transport))
+
+@pytest.mark.parametrize("segment", [b"YQ=", b"YQ==", b"YR", b"Y+Q", b"Y/Q", b"YQ!!", b"Y"])
+def test_b64url_decode_rejects_non_canonical_input(segment):
+    with pytest.raises(ValueError):
+        b64url_decode(segment)
+
+def test_b64url_decode_round_trips():
+    for size in range(8):
+        data = bytes(range(250, 250 - size, -1))
+        assert b64url_decode(b64url_encode(data)) == data
+
+def test_appended_junk_is_rejected(codec):
+    token = _access_token(codec)
+    assert codec.decode(token)["sub"] == "1"
+    for junk in ("!!", "=", "A"):
+        with pytest.raises(TokenError):
+            codec.decode(token + junk)
+
+@pytest.mark.parametrize("header", [
+    {"alg": "EdDSA", "kid": [KID]},
+    {"alg": "EdDSA", "kid": {"k": KID}},
+    {"alg": "EdDSA", "kid": None},
+    {"alg": ["EdDSA"], "kid": KID},
+    {"alg": {"x": 1}, "kid": KID},
+])
+def test_unhashable_header_values_are_token_errors(codec, header):
+    token = _with_header(_access_token(codec), header)
+    with pytest.raises(TokenError):
+        codec.decode(token)
+
+    async def verify():
+        verifier = _jwks_client(codec)
+        try:
+            await verifier.verify(token)
+        finally:
+            await verifier.close()
+
+    with pytest.raises(TokenError):
+        asyncio.run(verify())
+
+def test_jwks_client_accepts_valid_token(codec):
+    async def verify():
+        verifier = _jwks_client(codec)
+        try:
+            return await verifier.verify(_access_token(codec))
+        finally:
+            await verifier.close()
+
+    assert asyncio.run(verify())["type"] == "access"
+
+def test_me_with_list_kid_is_unauthorized():
+    header = b64url_encode(orjson.dumps({"alg": "HS256", "kid": ["x"]})).decode("ascii")
+    token = f"{header}.e30.c2ln"
+
+    async def call():
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                client.cookies.set(settings.COOKIE_NAME, token)
+                return await client.get("/auth/me")
+
+    assert asyncio.run(call()).status_code == 401
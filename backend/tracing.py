@@ -0,0 +1,255 @@
+import json
+import queue
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, List, Optional
+import inspect
+from config import get_settings
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class Span:
+    """Trecho de trabalho medido dentro de um trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "_perf", "duration", "attributes", "status", "_token")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self._perf = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.status = "ok"
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    """Span usado quando a requisição não foi amostrada (custo mínimo)"""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class MemoryExporter:
+    """Mantém os spans mais recentes em um buffer circular"""
+
+    def __init__(self, size: int):
+        self._buffer: deque = deque(maxlen=size)
+
+    def export(self, span: Span) -> None:
+        self._buffer.append(span.to_dict())
+
+    def recent(self, limit: int = 200) -> List[Dict[str, Any]]:
+        return list(self._buffer)[-limit:]
+
+class FileExporter(MemoryExporter):
+    """Grava spans em JSONL por uma thread separada (e mantém o buffer em memória)"""
+
+    def __init__(self, path: str, size: int):
+        super().__init__(size)
+        self.path = path
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._writer, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        data = span.to_dict()
+        self._buffer.append(data)
+        self._queue.put(data)
+
+    def _writer(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                data = self._queue.get()
+                f.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+                while not self._queue.empty():
+                    f.write(json.dumps(self._queue.get(), ensure_ascii=False, default=str) + "\n")
+                f.flush()
+
+class _SpanScope:
+    """Context manager (sync e async) que abre e fecha um span"""
+
+    __slots__ = ("_tracer", "_name", "_attributes", "_span")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._span = None
+
+    def __enter__(self):
+        self._span = self._tracer.start_span(self._name, **self._attributes)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self._span is not NOOP_SPAN:
+            self._span.status = "error"
+            self._span.set_attribute("error", repr(exc))
+        self._tracer.end_span(self._span)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+class Tracer:
+    """
+    Tracing por spans com propagação via contextvars.
+    Um trace só é registrado quando a requisição é amostrada (start_trace);
+    fora de um trace amostrado todos os spans são no-op.
+    """
+
+    def __init__(self, enabled: bool, sample_rate: float, exporter: Optional[MemoryExporter]):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    def start_trace(
+        self,
+        name: str,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        sampled: Optional[bool] = None,
+        **attributes,
+    ):
+        """Abre o span raiz de uma requisição, decidindo a amostragem"""
+        if not self.enabled:
+            return NOOP_SPAN
+        if sampled is None:
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return NOOP_SPAN
+        span = Span(trace_id or secrets.token_hex(16), parent_id, name, attributes)
+        span._token = _current_span.set(span)
+        return span
+
+    def start_span(self, name: str, **attributes):
+        """Abre um span filho do span atual (no-op se não houver trace amostrado)"""
+        parent = _current_span.get()
+        if parent is None:
+            return NOOP_SPAN
+        span = Span(parent.trace_id, parent.span_id, name, attributes)
+        span._token = _current_span.set(span)
+        return span
+
+    def end_span(self, span) -> None:
+        """Fecha o span, restaura o pai e exporta"""
+        if span is NOOP_SPAN:
+            return
+        span.duration = time.perf_counter() - span._perf
+        if span._token is not None:
+            try:
+                _current_span.reset(span._token)
+            except ValueError:
+                # Encerrado em outro contexto (ex: eventos do SQLAlchemy): só remove se ainda for o atual
+                if _current_span.get() is span:
+                    _current_span.set(None)
+            span._token = None
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.error("Erro ao exportar span: %s", e, extra={"event": "tracing.export_error"})
+
+    def span(self, name: str, **attributes) -> _SpanScope:
+        """Uso: `with tracer.span("x"):` ou `async with tracer.span("x"):`"""
+        return _SpanScope(self, name, attributes)
+
+    def current_span(self):
+        return _current_span.get() or NOOP_SPAN
+
+    def recent_spans(self, limit: int = 200) -> List[Dict[str, Any]]:
+        return self.exporter.recent(limit) if self.exporter else []
+
+def traced(name: str):
+    """Decorator que envolve a função (sync ou async) em um span"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with tracer.span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument_engine(engine) -> None:
+    """Cria um span por statement SQL via eventos do engine do SQLAlchemy"""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current_span.get() is None:
+            return
+        span = tracer.start_span("sql.execute", statement=statement[:200])
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            span = spans.pop()
+            span.set_attribute("rowcount", getattr(cursor, "rowcount", None))
+            tracer.end_span(span)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            span.status = "error"
+            span.set_attribute("error", repr(exception_context.original_exception))
+            tracer.end_span(span)
+
+def _build_exporter() -> Optional[MemoryExporter]:
+    if not settings.TRACING_ENABLED:
+        return None
+    if settings.TRACING_EXPORTER == "file":
+        return FileExporter(settings.TRACING_FILE_PATH, settings.TRACING_BUFFER_SIZE)
+    return MemoryExporter(settings.TRACING_BUFFER_SIZE)
+
+# Instância global
+tracer = Tracer(settings.TRACING_ENABLED, settings.TRACING_SAMPLE_RATE, _build_exporter())
@@ -13,7 +13,13 @@ export const api = axios.create({
 });
 
 // ✅ INTERCEPTOR DE REQUISIÇÃO (único)
-api.interceptors.request.use(config => {
+const readCsrfCookie = () =>
+  document.cookie
+    .split('; ')
+    .find(row => row.startsWith('csrf_token='))
+    ?.split('=')[1];
+
+api.interceptors.request.use(async config => {
   console.log('🚀 Enviando requisição:', {
     method: config.method,
     url: config.url,
@@ -24,21 +30,18 @@ api.interceptors.request.use(config => {
   // ✅ Adicionar token CSRF apenas para métodos que modificam dados
   if (config.method && !['get', 'head', 'options'].includes(config.method.toLowerCase())) {
     // Tenta pegar o token CSRF do cookie
-    const csrfToken = document.cookie
-      .split('; ')
-      .find(row => row.startsWith('csrf_token='))
-      ?.split('=')[1];
+    let csrfToken = readCsrfCookie();
+    
+    if (!csrfToken) {
+      // Sem cookie ainda (ex: verificação de email): o backend emite um em /auth/csrf
+      console.warn('⚠️ Token CSRF não encontrado nos cookies, solicitando um novo');
+      await axios.get(`${API_URL}/auth/csrf`, { withCredentials: true });
+      csrfToken = readCsrfCookie();
+    }
     
     if (csrfToken) {
       config.headers['X-CSRFToken'] = csrfToken;
       console.log('🔐 Token CSRF adicionado');
-    } else {
-      console.warn('⚠️ Token CSRF não encontrado nos cookies');
-      
-      // Para registro, podemos tentar continuar mesmo sem CSRF
-      if (config.url?.includes('/auth/register')) {
-        console.log('📝 Registro sem CSRF token - pode causar erro 500 se o backend exigir');
-      }
     }
   }
   